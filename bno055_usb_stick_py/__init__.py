@@ -1,4 +1,4 @@
 name = "bno055_usb_stick_py"
 version = "0.9.5"
 from bno055_usb_stick_py.bno055_usb_stick import BnoUsbStick
-from bno055_usb_stick_py.bno055 import BNO055
\ No newline at end of file
+from bno055_usb_stick_py.bno055 import BNO055, BNO055Sample
\ No newline at end of file
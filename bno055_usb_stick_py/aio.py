@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import asyncio
+import time
+from collections import deque
+
+from bno055_usb_stick_py.bno055 import BNO055Sample
+from bno055_usb_stick_py.bno055_usb_stick import BnoUsbStick, BnoException
+from bno055_usb_stick_py.decoding import DEFAULT_LAYOUT, StreamLayout
+from bno055_usb_stick_py.framing import PacketFramer, is_stream_frame
+
+
+class AsyncBnoUsbStick:
+    """
+    asyncio interface of the BNO055 USB Stick.
+
+    The serial file descriptor is registered with the event loop through
+    `loop.add_reader`, no threads are involved. Received streaming frames are
+    queued as samples while streaming is active, any other packet completes
+    the pending command. Commands are serialized
+    by a lock, so register access is safe next to an active stream.
+
+    Usage:
+        async with AsyncBnoUsbStick() as stick:
+            await stick.activate_streaming()
+            async for sample in stick.stream():
+                ...
+    """
+
+    def __init__(self, port=None, maxsize: int = 1024, timeout: float = 0.1):
+        """
+        :param port: serial port name, autodetected if None
+        :param maxsize: number of samples buffered for `stream`, the oldest are dropped on overrun
+        :param timeout: time to wait for a command response, seconds
+        """
+        self.bno_usb_stick = BnoUsbStick(port=port)
+        self.timeout = timeout
+        self.packet_framer = PacketFramer()
+        self.samples = deque(maxlen=maxsize)
+        self.overruns = 0
+        self.streaming = False
+        self.loop = None
+        self.error = None
+        self._lock = None
+        self._response = None
+        self._sample_waiter = None
+
+    @property
+    def port(self):
+        """serial port of the stick, `open` replaces it after `close`"""
+        return self.bno_usb_stick.port
+
+    @property
+    def frame_len(self) -> int:
+        return self.bno_usb_stick.layout.frame_len
+
+    async def open(self):
+        """start watching the serial port on the running event loop"""
+        if self.loop is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._lock = asyncio.Lock()
+        self.bno_usb_stick.connect()
+        self.packet_framer = PacketFramer()
+        self.error = None
+        try:
+            self.loop.add_reader(self.port.fileno(), self._on_readable)
+        except NotImplementedError:
+            raise BnoException("Event loop does not support add_reader, use a selector event loop!")
+
+    async def close(self):
+        """stop streaming, unregister the port from the event loop and close it"""
+        if self.loop is None:
+            return
+        if self.streaming and self.error is None:
+            await self.deactivate_streaming()
+        self.loop.remove_reader(self.port.fileno())
+        self.loop = None
+        self.bno_usb_stick.disconnect()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _on_readable(self):
+        try:
+            data = self.port.read(self.bno_usb_stick.buffer_size)
+        except Exception as e:
+            self._fail(e)
+            return
+        timestamp_ns = time.monotonic_ns()
+        metrics = self.bno_usb_stick.metrics
+        metrics.read_calls += 1
+        metrics.bytes_read += len(data)
+        frames = []
+        for packet in self.packet_framer.feed(data):
+            if self.streaming and is_stream_frame(packet, self.frame_len):
+                frames.append(packet)
+            elif self._response is not None and not self._response.done():
+                self._response.set_result(packet)
+        if not frames:
+            return
+        for frame, *timing in self.bno_usb_stick.timed_frames(frames, timestamp_ns,
+                                                              len(data) >= self.bno_usb_stick.buffer_size):
+            metrics.frames_decoded += 1
+            if len(self.samples) == self.samples.maxlen:
+                self.overruns += 1
+                metrics.frames_dropped += 1
+            self.samples.append(BNO055Sample(self.bno_usb_stick.layout.unpack(frame), *timing))
+        if self._sample_waiter is not None and not self._sample_waiter.done():
+            self._sample_waiter.set_result(None)
+
+    def _fail(self, error: Exception):
+        """reading the port failed (e.g. stick unplugged), wake everybody up with the error"""
+        self.error = error
+        self.loop.remove_reader(self.port.fileno())
+        for future in (self._response, self._sample_waiter):
+            if future is not None and not future.done():
+                future.set_exception(error)
+
+    def _command(self, name: str, **values) -> bytes:
+        """command `name` from bno055.json with params filled from `values`"""
+        return self.bno_usb_stick.commands[name].build(**values)
+
+    async def _transaction(self, command: bytes, recv_required=True):
+        """send `command` and wait for its response, one transaction at a time"""
+        if self.loop is None:
+            await self.open()
+        if self.error is not None:
+            raise self.error
+        async with self._lock:
+            self._response = self.loop.create_future()
+            metrics = self.bno_usb_stick.metrics
+            t_start = time.perf_counter_ns()
+            try:
+                if self.port.write(command) != len(command):
+                    raise BnoException("Sending packet failed!")
+                return await asyncio.wait_for(self._response, self.timeout)
+            except asyncio.TimeoutError:
+                if recv_required:
+                    raise BnoException("Receiving packet failed!")
+                return None
+            finally:
+                self._response = None
+                metrics.commands += 1
+                metrics.command.observe(time.perf_counter_ns() - t_start)
+
+    def _decode(self, packet: bytes, decoder, *args):
+        self.bno_usb_stick.buffer = packet
+        return decoder(*args)
+
+    async def read_register(self, reg_addr):
+        """read single register of the BNO"""
+        packet = await self._transaction(self._command('read_register', reg_addr=reg_addr))
+        return self._decode(packet, self.bno_usb_stick.decode_register_read)
+
+    async def write_register(self, reg_addr, reg_value):
+        """writing single register of the BNO"""
+        packet = await self._transaction(self._command('write_register', reg_addr=reg_addr, reg_val=reg_value))
+        return self._decode(packet, self.bno_usb_stick.decode_register_write, reg_addr, reg_value)
+
+    async def burst_read(self, start_reg_addr, num_bytes):
+        """read `num_bytes` registers starting at `start_reg_addr`"""
+        command = self._command('burst_read', start_reg_addr=start_reg_addr,
+                                num_bytes_msb=(num_bytes >> 8) & 0xFF, num_bytes_lsb=num_bytes & 0xFF)
+        packet = await self._transaction(command)
+        return self._decode(packet, self.bno_usb_stick.decode_burst_read, start_reg_addr, num_bytes)
+
+    async def activate_streaming(self, rate_hz: float = None, channels=None):
+        """see BnoUsbStick.activate_streaming"""
+        stick = self.bno_usb_stick
+        interval_ms = None if rate_hz is None else stick.stream_interval_ms(rate_hz)
+        stick.set_stream_layout(DEFAULT_LAYOUT if channels is None else StreamLayout(channels))
+        stick.stream_config = (stick.layout, interval_ms)
+        commands_sequence = stick.streaming_sequence(stick.bno_config['start_streaming'], interval_ms)
+        stick.reset_timing(interval_ms)
+        for idx, command in enumerate(commands_sequence):
+            if idx == len(commands_sequence) - 1:
+                self.streaming = True
+            await self._transaction(command, recv_required=False)
+
+    async def deactivate_streaming(self):
+        self.streaming = False
+        for command in self.bno_usb_stick.bno_config['stop_streaming']:
+            await self._transaction(command, recv_required=False)
+        self.samples.clear()
+
+    async def stream(self, num_packets=-1):
+        """
+        Asynchronous generator of streamed samples.
+        :param num_packets: number of packets to receive. If -1 (default), receive forever
+        :return: BNO055Sample stamped with its host arrival time
+        """
+        if self.loop is None:
+            await self.open()
+        packets_received = 0
+        while num_packets == -1 or packets_received < num_packets:
+            while not self.samples:
+                if self.error is not None:
+                    raise self.error
+                self._sample_waiter = self.loop.create_future()
+                try:
+                    await self._sample_waiter
+                finally:
+                    self._sample_waiter = None
+            yield self.samples.popleft()
+            packets_received += 1
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import numpy as np
+
+from bno055_usb_stick_py.bno055 import BNO055
+from bno055_usb_stick_py.decoding import STREAMING_DATA_OFFSET, DEFAULT_LAYOUT, StreamLayout
+
+# (name, number of axes, resolution) in the order of the streamed registers
+VECTOR_CHANNELS = (
+    ('a', 3, BNO055.acceleration_resolution),
+    ('m', 3, BNO055.magnetometer_resolution),
+    ('g', 3, BNO055.gyroscope_resolution),
+    ('euler', 3, BNO055.euler_resolution),
+    ('quaternion', 4, BNO055.quaternion_resolution),
+    ('lin_a', 3, BNO055.linear_acceleration_resolution),
+    ('gravity', 3, BNO055.gravity_resolution),
+)
+STATUS_CHANNELS = ('temp', 'calib_stat', 'st_result', 'int_sta', 'sys_clk_status', 'sys_status')
+
+NUM_VECTOR_VALUES = sum(width for _, width, _ in VECTOR_CHANNELS)
+
+# decoded sample, resolution applied, one field per channel of BNO055,
+# followed by host arrival time, sample time and flags of the timing engine (timing.py)
+SAMPLE_DTYPE = np.dtype(
+    [(name, '<f4', (width,)) for name, width, _ in VECTOR_CHANNELS] +
+    [('temp', 'i1')] + [(name, 'u1') for name in STATUS_CHANNELS[1:]] +
+    [('timestamp_ns', '<i8'), ('sample_time_ns', '<i8'), ('flags', 'u1')]
+)
+
+
+class FramePlan:
+    """
+    numpy layout of the raw frames of a StreamLayout: the int16 values of the
+    vector channels in the window as one 'data' field, followed by the status
+    registers; header and stop bytes are skipped.
+    """
+
+    def __init__(self, layout: StreamLayout):
+        self.vectors = [(name, width) for name, width, _ in VECTOR_CHANNELS if name in layout.channels]
+        self.statuses = [name for name in STATUS_CHANNELS[:-1] if name in layout.channels]
+        num_values = sum(width for _, width in self.vectors)
+        names, formats, offsets = [], [], []
+        if self.vectors:
+            names.append('data')
+            formats.append(('<i2', (num_values,)))
+            offsets.append(STREAMING_DATA_OFFSET)
+        for idx, name in enumerate(self.statuses):
+            names.append(name)
+            formats.append('i1' if name == 'temp' else 'u1')
+            offsets.append(STREAMING_DATA_OFFSET + 2 * num_values + idx)
+        self.dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                               'itemsize': layout.frame_len})
+        self.scale = np.concatenate([np.full(width, resolution, dtype=np.float32)
+                                     for name, width, resolution in VECTOR_CHANNELS if name in layout.channels] or
+                                    [np.empty(0, dtype=np.float32)])
+
+
+_plans = {}
+
+
+def frame_plan(layout: StreamLayout) -> FramePlan:
+    plan = _plans.get(layout)
+    if plan is None:
+        plan = _plans[layout] = FramePlan(layout)
+    return plan
+
+
+# layout of a raw streaming frame of the default 0x38-byte layout
+FRAME_DTYPE = frame_plan(DEFAULT_LAYOUT).dtype
+SCALE = frame_plan(DEFAULT_LAYOUT).scale
+
+
+def decode_streaming_frames(frames, layout: StreamLayout = DEFAULT_LAYOUT) -> np.ndarray:
+    """
+    Decode many concatenated streaming frames at once.
+    :param frames: bytes-like object holding N complete frames of `layout` (0x38 bytes each by default)
+    :param layout: stream layout of the frames, channels outside of its window are zero
+    :return: structured array of N samples with SAMPLE_DTYPE,
+    resolution applied with the same factors as `BNO055.apply_resolution`,
+    timing fields are left zero
+    """
+    plan = frame_plan(layout)
+    raw = np.frombuffer(frames, dtype=plan.dtype)
+    samples = np.zeros(len(raw), dtype=SAMPLE_DTYPE)
+    if plan.vectors:
+        scaled = np.multiply(raw['data'], plan.scale, dtype=np.float32)
+        col = 0
+        for name, width in plan.vectors:
+            samples[name] = scaled[:, col:col + width]
+            col += width
+    for name in plan.statuses:
+        samples[name] = raw[name]
+    # SYS_STAT (0x39) lies outside of the streamed register window
+    return samples
+
+
+def samples_to_batch(samples) -> np.ndarray:
+    """
+    Collect BNO055Sample objects (e.g. from `recv_streaming_generator`) into one array.
+    :return: structured array with SAMPLE_DTYPE, the same values as `decode_streaming_frames`
+    """
+    samples = list(samples)
+    batch = np.zeros(len(samples), dtype=SAMPLE_DTYPE)
+    if not samples:
+        return batch
+    num_values = NUM_VECTOR_VALUES + len(STATUS_CHANNELS) - 1
+    raw = np.array([sample.raw[:num_values] for sample in samples], dtype=np.int32)
+    scaled = np.multiply(raw[:, :NUM_VECTOR_VALUES], SCALE, dtype=np.float32)
+    col = 0
+    for name, width, _ in VECTOR_CHANNELS:
+        batch[name] = scaled[:, col:col + width]
+        col += width
+    for idx, name in enumerate(STATUS_CHANNELS[:-1]):
+        batch[name] = raw[:, NUM_VECTOR_VALUES + idx]
+    batch['sys_status'] = [sample.raw[num_values] if len(sample.raw) > num_values else 0 for sample in samples]
+    batch['timestamp_ns'] = [sample.timestamp_ns or 0 for sample in samples]
+    batch['sample_time_ns'] = [(sample.timestamp_ns or 0) if sample.sample_time_ns is None else sample.sample_time_ns
+                               for sample in samples]
+    batch['flags'] = [sample.flags for sample in samples]
+    return batch
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+"""
+Benchmarks of the driver hot paths, written to JSON for comparison between runs.
+
+Runs against the emulated stick (Linux) or a real one (--port), streaming
+frames for the offline benchmarks come from a recording (--recording) or
+are synthesized:
+
+    python -m bno055_usb_stick_py.benchmark --output bench.json --compare previous.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from bno055_usb_stick_py.framing import StreamFramer
+from bno055_usb_stick_py.stats import percentiles
+
+
+def synthetic_frames(num_frames: int) -> List[bytes]:
+    """streaming frames of the emulator, 100 Hz time base"""
+    from bno055_usb_stick_py.emulator import BnoEmulator
+    emulator = BnoEmulator()
+    try:
+        return [emulator.streaming_frame(idx * 0.01) for idx in range(num_frames)]
+    finally:
+        emulator.close()
+
+
+def recorded_frames(path: str, num_frames: int) -> List[bytes]:
+    from bno055_usb_stick_py.recorder import ReplayStick
+    replay = ReplayStick(path, speed=None)
+    try:
+        return [replay.recv_streaming_frame() for _ in range(min(num_frames, len(replay)))]
+    finally:
+        replay.close()
+
+
+# run in a fresh interpreter: import time of the package and the heavy modules it pulled in
+IMPORT_PROBE = '''
+import sys, time
+t_start = time.perf_counter()
+import bno055_usb_stick_py
+elapsed = time.perf_counter() - t_start
+print(elapsed, *[name for name in ('serial', 'pyudev', 'numpy', 'json') if name in sys.modules])
+'''
+
+
+def bench_startup(port: str, repeat=5) -> Dict:
+    """
+    cold import time of the package in milliseconds, and construction time of a stick,
+    with the config parsed (cold) and taken from the module level cache (warm)
+    """
+    from bno055_usb_stick_py import bno055_usb_stick
+    import_ms = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], capture_output=True, check=True, text=True)
+        elapsed, *loaded = output.stdout.split()
+        import_ms.append(float(elapsed) * 1e3)
+    results = {'import_ms': percentiles(import_ms), 'modules_loaded_on_import': loaded}
+    for name, clear_cache in (('construct_cold_ms', True), ('construct_warm_ms', False)):
+        latencies = []
+        for _ in range(repeat):
+            if clear_cache:
+                bno055_usb_stick._config_cache.clear()
+            t_start = time.perf_counter_ns()
+            bno_usb_stick = bno055_usb_stick.BnoUsbStick(port=port)
+            latencies.append((time.perf_counter_ns() - t_start) / 1e6)
+            bno_usb_stick.disconnect()
+        results[name] = percentiles(latencies)
+    return results
+
+
+def bench_decode_streaming(bno_usb_stick, frames: List[bytes]) -> Dict[str, float]:
+    t_start = time.perf_counter_ns()
+    for frame in frames:
+        bno_usb_stick.buffer = frame
+        bno_usb_stick.decode_streaming()
+    result = {'ns_per_frame': (time.perf_counter_ns() - t_start) / len(frames)}
+    try:
+        from bno055_usb_stick_py.batch import decode_streaming_frames
+    except ImportError:
+        return result
+    data = b''.join(frames)
+    t_start = time.perf_counter_ns()
+    decode_streaming_frames(data)
+    result['batch_ns_per_frame'] = (time.perf_counter_ns() - t_start) / len(frames)
+    return result
+
+
+def bench_apply_resolution(bno_usb_stick, frames: List[bytes]) -> Dict[str, float]:
+    samples = []
+    for frame in frames:
+        bno_usb_stick.buffer = frame
+        samples.append(bno_usb_stick.decode_streaming().to_bno055())
+    t_start = time.perf_counter_ns()
+    for sample in samples:
+        sample.apply_resolution()
+    return {'ns_per_sample': (time.perf_counter_ns() - t_start) / len(samples)}
+
+
+def bench_pipeline(frames: List[bytes], block_size=100) -> Dict[str, float]:
+    """processing stages of pipeline.py over decoded blocks, per input sample"""
+    try:
+        from bno055_usb_stick_py.batch import decode_streaming_frames
+        from bno055_usb_stick_py.pipeline import Pipeline
+    except ImportError:
+        return {}
+    data = decode_streaming_frames(b''.join(frames))
+    blocks = [data[idx:idx + block_size] for idx in range(0, len(data), block_size)]
+    t_start = time.perf_counter_ns()
+    for _ in Pipeline(blocks).normalized().euler().remove_gravity().decimate(4).rolling(25):
+        pass
+    return {'ns_per_sample': (time.perf_counter_ns() - t_start) / len(data), 'block_size': block_size}
+
+
+def bench_decode_burst_read(bno_usb_stick, start_reg_addr=0x00, num_bytes=0x40, repeat=10000) -> Dict[str, float]:
+    bno_usb_stick.burst_read(start_reg_addr, num_bytes)
+    t_start = time.perf_counter_ns()
+    for _ in range(repeat):
+        bno_usb_stick.decode_burst_read(start_reg_addr, num_bytes)
+    return {'ns_per_decode': (time.perf_counter_ns() - t_start) / repeat, 'num_bytes': num_bytes}
+
+
+def bench_framing(frames: List[bytes], chunk_size=1024) -> Dict[str, float]:
+    data = b''.join(frames)
+    chunks = [data[idx:idx + chunk_size] for idx in range(0, len(data), chunk_size)]
+    framer = StreamFramer()
+    t_start = time.perf_counter()
+    for chunk in chunks:
+        framer.feed(chunk)
+    elapsed = time.perf_counter() - t_start
+    return {'mb_per_s': len(data) / elapsed / 1e6, 'frames': framer.frames, 'chunk_size': chunk_size}
+
+
+def bench_register_round_trip(bno_usb_stick, repeat=200, reg_addr=0x3D) -> Dict[str, Dict[str, float]]:
+    """read_register / write_register latency in microseconds, the register is written with its current value"""
+    reg_value = bno_usb_stick.read_register(reg_addr)
+    results = {}
+    for name, call in (('read_register_us', lambda: bno_usb_stick.read_register(reg_addr)),
+                       ('write_register_us', lambda: bno_usb_stick.write_register(reg_addr, reg_value))):
+        latencies = []
+        for _ in range(repeat):
+            t_start = time.perf_counter_ns()
+            call()
+            latencies.append((time.perf_counter_ns() - t_start) / 1e3)
+        results[name] = percentiles(latencies)
+    return results
+
+
+def bench_polling(bno_usb_stick, num_polls=1000) -> Dict:
+    """round trip percentiles and achievable rate of polled acquisition, see SamplePoller.latency_probe"""
+    from bno055_usb_stick_py.polling import SamplePoller
+    return SamplePoller(bno_usb_stick).latency_probe(num_polls)
+
+
+def bench_streaming(bno_usb_stick, duration=2.0) -> Dict[str, float]:
+    """activation wall time and sustained `recv_streaming_generator` throughput"""
+    results = {'activate_streaming_s': bno_usb_stick.activate_streaming()}
+    bno_usb_stick.deactivate_streaming()
+    results['activate_streaming_fast_s'] = bno_usb_stick.activate_streaming(fast=True)
+    num_samples = 0
+    t_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    for _ in bno_usb_stick.recv_streaming_generator():
+        num_samples += 1
+        if time.perf_counter() - t_start >= duration:
+            break
+    cpu = time.thread_time() - cpu_start
+    elapsed = time.perf_counter() - t_start
+    bno_usb_stick.deactivate_streaming()
+    results['samples_per_s'] = num_samples / elapsed
+    results['cpu_us_per_sample'] = cpu / max(num_samples, 1) * 1e6
+    return results
+
+
+def run_benchmarks(port: str = None, recording: str = None, num_frames=20000, duration=2.0,
+                   emulator_rate_hz: float = 1000.) -> Dict:
+    """
+    :param port: serial port of a real stick, if None an emulated stick is used
+    :param recording: recording (see recorder.py) to take the frames of the offline benchmarks from
+    :param num_frames: number of frames of the offline benchmarks
+    :param duration: seconds of end-to-end streaming
+    :param emulator_rate_hz: streaming rate of the emulated stick
+    :return: benchmark results
+    """
+    from bno055_usb_stick_py.bno055_usb_stick import BnoUsbStick
+    frames = recorded_frames(recording, num_frames) if recording else synthetic_frames(num_frames)
+    emulator = None
+    if port is None:
+        from bno055_usb_stick_py.emulator import BnoEmulator
+        emulator = BnoEmulator(rate_hz=emulator_rate_hz).start()
+        port = emulator.port_name
+    startup = bench_startup(port)
+    bno_usb_stick = BnoUsbStick(port=port)
+    try:
+        results = {
+            'startup': startup,
+            'decode_streaming': bench_decode_streaming(bno_usb_stick, frames),
+            'apply_resolution': bench_apply_resolution(bno_usb_stick, frames),
+            'pipeline': bench_pipeline(frames),
+            'decode_burst_read': bench_decode_burst_read(bno_usb_stick),
+            'framing': bench_framing(frames),
+            'register_round_trip': bench_register_round_trip(bno_usb_stick),
+            'polling': bench_polling(bno_usb_stick),
+            'streaming': bench_streaming(bno_usb_stick, duration),
+        }
+    finally:
+        bno_usb_stick.disconnect()
+        if emulator is not None:
+            emulator.close()
+    return {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'port': 'emulator' if emulator else port,
+                 'frames': recording or 'synthetic', 'num_frames': len(frames)},
+        'results': results,
+    }
+
+
+def flatten(results: Dict, prefix='') -> Dict[str, float]:
+    flat = {}
+    for key, val in results.items():
+        if isinstance(val, dict):
+            flat.update(flatten(val, f"{prefix}{key}."))
+        elif isinstance(val, (int, float)):
+            flat[prefix + key] = val
+    return flat
+
+
+def compare(previous: Dict, current: Dict):
+    """print the relative change of every metric to a previous run"""
+    before = flatten(previous['results'])
+    for key, val in flatten(current['results']).items():
+        if before.get(key):
+            print(f"{key:55s} {before[key]:14.3f} -> {val:14.3f} ({(val / before[key] - 1) * 100:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', help='serial port of a real stick, emulated stick if omitted')
+    parser.add_argument('--recording', help='recording to take the frames of the offline benchmarks from')
+    parser.add_argument('--num-frames', type=int, default=20000)
+    parser.add_argument('--duration', type=float, default=2.0, help='seconds of end-to-end streaming')
+    parser.add_argument('--rate', type=float, default=1000., help='streaming rate of the emulated stick')
+    parser.add_argument('--output', help='JSON file to write the results to, stdout if omitted')
+    parser.add_argument('--compare', help='JSON file of a previous run')
+    args = parser.parse_args(argv)
+    report = run_benchmarks(args.port, args.recording, args.num_frames, args.duration, args.rate)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
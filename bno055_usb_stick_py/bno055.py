@@ -4,7 +4,9 @@
 # License: MIT
 
 from dataclasses import dataclass
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
+
+from bno055_usb_stick_py.timing import SAMPLE_GAP, SAMPLE_DUPLICATE
 
 
 @dataclass
@@ -68,3 +70,116 @@ class BNO055:
         self.gravity = tuple(el * self.gravity_resolution for el in self.gravity_raw)
         self.euler = tuple(el * self.euler_resolution for el in self.euler_raw)
 
+
+
+def _raw_field(start: int, stop: int):
+    return property(lambda self: self.raw[start:stop])
+
+
+def _scaled_field(start: int, stop: int, resolution: float):
+    return property(lambda self: tuple([el * resolution for el in self.raw[start:stop]]))
+
+
+def _status_field(idx: int):
+    return property(lambda self: self.raw[idx] if len(self.raw) > idx else 0)
+
+
+class BNO055Sample:
+    """
+    Compact, immutable streaming sample.
+
+    Holds only the tuple of raw register values as decoded from a streaming
+    frame (a, m, g, euler, quaternion, lin_a, gravity, temp, calib_stat,
+    st_result, int_sta, sys_clk_status[, sys_status]) and the host
+    `time.monotonic_ns()` arrival timestamp, if known. Streamed samples also
+    carry the sampling time recovered by the timing engine (timing.py) and
+    its gap / duplicate flags. Provides the same fields as BNO055, scaled
+    fields are computed on access.
+    """
+    __slots__ = ('raw', 'timestamp_ns', 'sample_time_ns', 'flags')
+
+    quaternion_resolution = BNO055.quaternion_resolution
+    acceleration_resolution = BNO055.acceleration_resolution
+    magnetometer_resolution = BNO055.magnetometer_resolution
+    gyroscope_resolution = BNO055.gyroscope_resolution
+    linear_acceleration_resolution = BNO055.linear_acceleration_resolution
+    gravity_resolution = BNO055.gravity_resolution
+    euler_resolution = BNO055.euler_resolution
+
+    fields = ('a_raw', 'g_raw', 'm_raw', 'euler_raw', 'quaternion_raw', 'lin_a_raw', 'gravity_raw',
+              'a', 'g', 'm', 'euler', 'quaternion', 'lin_a', 'gravity',
+              'temp', 'calib_stat', 'st_result', 'int_sta', 'sys_clk_status', 'sys_status')
+
+    def __init__(self, raw: Tuple[int, ...], timestamp_ns: Optional[int] = None,
+                 sample_time_ns: Optional[int] = None, flags: int = 0):
+        object.__setattr__(self, 'raw', raw)
+        object.__setattr__(self, 'timestamp_ns', timestamp_ns)
+        object.__setattr__(self, 'sample_time_ns', sample_time_ns)
+        object.__setattr__(self, 'flags', flags)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return type(self), (self.raw, self.timestamp_ns, self.sample_time_ns, self.flags)
+
+    def __eq__(self, other):
+        if not isinstance(other, BNO055Sample):
+            return NotImplemented
+        return self.raw == other.raw and self.timestamp_ns == other.timestamp_ns and \
+            self.sample_time_ns == other.sample_time_ns and self.flags == other.flags
+
+    def __hash__(self):
+        return hash((self.raw, self.timestamp_ns, self.sample_time_ns))
+
+    def __repr__(self):
+        values = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.fields)
+        return f"{type(self).__name__}({values}, timestamp_ns={self.timestamp_ns!r}, " \
+               f"sample_time_ns={self.sample_time_ns!r}, flags={self.flags!r})"
+
+    @property
+    def gap(self) -> bool:
+        """samples were lost right before this one"""
+        return bool(self.flags & SAMPLE_GAP)
+
+    @property
+    def duplicate(self) -> bool:
+        """surplus sample, more samples arrived than the device can produce"""
+        return bool(self.flags & SAMPLE_DUPLICATE)
+
+    # raw sensor data from BNO, resolution not applied
+    a_raw = _raw_field(0, 3)
+    m_raw = _raw_field(3, 6)
+    g_raw = _raw_field(6, 9)
+    # fusion output from BNO, resolution not applied
+    euler_raw = _raw_field(9, 12)
+    quaternion_raw = _raw_field(12, 16)
+    lin_a_raw = _raw_field(16, 19)
+    gravity_raw = _raw_field(19, 22)
+    # raw sensor data from BNO, resolution applied
+    a = _scaled_field(0, 3, acceleration_resolution)
+    m = _scaled_field(3, 6, magnetometer_resolution)
+    g = _scaled_field(6, 9, gyroscope_resolution)
+    # fusion output from BNO, resolution applied
+    euler = _scaled_field(9, 12, euler_resolution)
+    quaternion = _scaled_field(12, 16, quaternion_resolution)
+    lin_a = _scaled_field(16, 19, linear_acceleration_resolution)
+    gravity = _scaled_field(19, 22, gravity_resolution)
+    # temperature and status registers
+    temp = _status_field(22)
+    calib_stat = _status_field(23)
+    st_result = _status_field(24)
+    int_sta = _status_field(25)
+    sys_clk_status = _status_field(26)
+    sys_status = _status_field(27)
+
+    def apply_resolution(self):
+        """kept for compatibility with BNO055, resolution is applied on access"""
+
+    def to_bno055(self) -> BNO055:
+        """mutable BNO055 dataclass with the same content"""
+        bno_data = BNO055()
+        for name in self.fields[:7] + self.fields[14:]:
+            setattr(bno_data, name, getattr(self, name))
+        bno_data.apply_resolution()
+        return bno_data
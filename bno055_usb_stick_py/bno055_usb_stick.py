@@ -3,16 +3,30 @@
 # Author: Dr. Konstantin Selyunin
 # License: MIT
 
-import json
 import os
 import os.path
-import re
-import serial
-import platform
+import select
+import sys
+import threading
 import time
-from typing import Tuple
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from bno055_usb_stick_py.bno055 import BNO055
+from bno055_usb_stick_py.bno055 import BNO055Sample
+from bno055_usb_stick_py.calibration import CALIBRATION_LEN, CALIBRATION_START, FROM_CONFIG_DELAY, \
+    OPR_MODE_CONFIG, OPR_MODE_NDOF, TO_CONFIG_DELAY, CalibrationProfile, ProfileStore
+from bno055_usb_stick_py.commands import CommandTemplate, is_stream_config, stream_config_command, stream_interval
+from bno055_usb_stick_py.decoding import BOARD_INFO_STRUCT, BOARD_INFO_OFFSET, BURST_READ_DATA_OFFSET, \
+    DEFAULT_LAYOUT, StreamLayout
+from bno055_usb_stick_py.framing import StreamFramer, PacketFramer, START_BYTE, STOP_BYTES, is_stream_frame
+from bno055_usb_stick_py.hotplug import device_cache, start_hotplug_watcher
+from bno055_usb_stick_py.metrics import StickMetrics
+from bno055_usb_stick_py.reader import StreamReader, DROP_OLDEST
+from bno055_usb_stick_py.registers import RegisterMap
+from bno055_usb_stick_py.timing import TimingEngine
+
+# parsed JSON configs by absolute path: (mtime in ns, config), shared by all sticks of the process
+_config_cache = {}
 
 
 class BnoException(Exception):
@@ -23,6 +37,12 @@ class BnoException(Exception):
 class BnoUsbStick:
     """BNO055 USB Stick"""
 
+    # configuration registers, which only change when written
+    shadow_registers = ('PAGE_ID', 'UNIT_SEL', 'DATA_SELECT', 'OPR_MODE', 'PWR_MODE', 'TEMP_SOURCE',
+                        'AXIS_MAP_CONFIG', 'AXIS_MAP_SIGN')
+    # RST_SYS bit of SYS_TRIGGER register
+    rst_sys_bit = 1 << 5
+
     def __init__(self, *args, **kwargs):
         self.port = None
         self.port_name = ''
@@ -32,25 +52,90 @@ class BnoUsbStick:
         self.buffer = None
         self.payload = None
         self.bno_udev_config = self.bno_config['udev']
+        self.register_maps = {0: RegisterMap(self.bno_config['bno055_page_0']),
+                              1: RegisterMap(self.bno_config['bno055_page_1'])}
+        self.commands = {name: CommandTemplate(self.bno_config[name]['command'], self.bno_config[name]['params'])
+                         for name in ('board_information', 'read_register', 'write_register', 'burst_read')}
+        # serializes bus transactions (command, response, decoding of self.buffer)
+        self.lock = threading.RLock()
+        self.shadow = None
+        self.page = 0
+        self.shadow_addrs = {self.register_maps[0].addr(reg_name) for reg_name in self.shadow_registers}
+        self.page_id_addr = self.register_maps[0].addr('PAGE_ID')
+        self.sys_trigger_addr = self.register_maps[0].addr('SYS_TRIGGER')
+        self.opr_mode_addr = self.register_maps[0].addr('OPR_MODE')
+        self.calib_stat_addr = self.register_maps[0].addr('CALIB_STAT')
         self.buffer_size = 1024
+        self.layout = DEFAULT_LAYOUT
+        # (layout, interval in ms) of the last activation, None: interval of bno055.json
+        self.stream_config = (DEFAULT_LAYOUT, None)
+        self.framer = StreamFramer(self.layout.frame_len)
+        # received streaming frames: (frame, arrival time, sample time, flags), see `timed_frames`
+        self.frames = deque()
+        self.frame_timing = (None, None, 0)
+        self.timing = TimingEngine()
+        self.reader = None
+        # thread which reads the port in the background (reader thread, shared memory publisher),
+        # commands of other threads are rejected while it runs
+        self.port_owner = None
+        self.poller = None
+        self.activation_time = None
+        self.metrics = StickMetrics()
+        # identity of the stick for reconnects: serial number and stable port path
+        self.serial_number = None
+        self.device_path = None
+        self.streaming = False
+        # seconds to wait for a lost stick, None: auto reconnect disabled
+        self.reconnect_timeout = None
+        self.outage_time = None
+        # register writes to restore after a reconnect: (page, address) -> (sequence number, value),
+        # in the order written; writes up to `stream_seq` happened before streaming was activated
+        self.register_journal = {}
+        self.journal_page = 0
+        self.journal_seq = 0
+        # register writes are not journaled while paused, e.g. those of `write_calibration`
+        self.journal_paused = False
+        self.stream_seq = 0
+        # calibration profile written by `write_calibration`, written again after a reconnect
+        self.calibration_profile = None
         if kwargs.get('port') is not None:
             self.port_name = kwargs.get('port')
         else:
             self.autodetect()
         self.connect()
+        # restore the calibration profile of the stick: True for the default ProfileStore, or a ProfileStore
+        calibration = kwargs.get('calibration')
+        if calibration:
+            self.restore_calibration(None if calibration is True else calibration)
 
     def __del__(self):
+        self.stop_reader()
         if self.port is not None and self.port.is_open:
             self.deactivate_streaming()
         self.disconnect()
 
     @staticmethod
     def read_bno_json_config(file):
+        """
+        Parsed config `file`, read once per process and re-read only when the file was modified.
+        The config is shared by all sticks and must not be modified.
+        """
         if not file:
             raise BnoException("BNO JSON config file not specified!")
         current_dir = os.path.dirname(os.path.abspath(__file__))
         bno_file_abspath = os.path.join(current_dir, file)
-        with open(bno_file_abspath) as f:
+        mtime_ns = os.stat(bno_file_abspath).st_mtime_ns
+        cached = _config_cache.get(bno_file_abspath)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        config = BnoUsbStick.parse_bno_json_config(bno_file_abspath)
+        _config_cache[bno_file_abspath] = (mtime_ns, config)
+        return config
+
+    @staticmethod
+    def parse_bno_json_config(path):
+        import json
+        with open(path) as f:
             config = json.load(f)
         for section in config:
             if section in ['bno055_page_0', 'bno055_page_1']:
@@ -61,14 +146,8 @@ class BnoUsbStick:
                     config[section][idx] = bytes([int(el, 16) for el in command])
         return config
 
-    @staticmethod
-    def find_entry_idx(params, description):
-        reg_addr_entry = next(filter(lambda x: x['description'] == description, params))
-        return params.index(reg_addr_entry)
-
     def autodetect(self):
-        system = platform.system().lower()
-        if system == 'windows':
+        if sys.platform == 'win32':
             self.autodetect_windows()
         else:
             self.autodetect_linux()
@@ -79,34 +158,139 @@ class BnoUsbStick:
         for port in com_ports:
             if port.vid == 5418 and port.pid == 32961:
                 self.port_name = port.name
+                self.serial_number = port.serial_number
                 return True
         else:
             raise BnoException('BNO USB Stick not detected!')
 
     def autodetect_linux(self):
-        import pyudev
-        context = pyudev.Context()
-        for device in context.list_devices(subsystem='tty'):
-            device_udev_values = {}
-            for key, val in self.bno_udev_config.items():
-                device_udev_values[key] = device.get(key)
-            if device_udev_values == self.bno_udev_config:
-                self.port_name = device.device_node
-                return True
-        else:
+        """first stick of the device cache, udev is only enumerated if the cache is empty or outdated"""
+        device = device_cache.find()
+        if device is None:
             raise BnoException("BNO USB Stick not detected!")
+        self.serial_number, self.device_path, self.port_name = device
+        return True
 
     def connect(self):
         if self.port is None or not self.port.is_open:
+            import serial
             self.port = serial.Serial()
             self.port.port = self.port_name
             for key, value in self.bno_config['serial'].items():
                 setattr(self.port, key, value)
             self.port.open()
+            self.poller = None
+            if hasattr(select, 'poll'):
+                self.poller = select.poll()
+                self.poller.register(self.port.fileno(), select.POLLIN)
 
     def disconnect(self):
         if self.port is not None and self.port.is_open:
             self.port.close()
+        self.poller = None
+
+    def enable_auto_reconnect(self, timeout: float = 5.0, watch: bool = True):
+        """
+        When the port fails while streaming (the stick dropped off USB), wait up to
+        `timeout` seconds for the stick to come back, reopen it and restore register
+        writes and streaming, see `reconnect`. Consumers see a sample flagged as gap.
+        :param timeout: maximal outage in seconds, None disables auto reconnect
+        :param watch: start the udev hotplug watcher (Linux), otherwise the port path is polled
+        :raises: BnoException on Windows, where a returning stick cannot be found by its serial number
+        """
+        if timeout is not None and sys.platform == 'win32':
+            raise BnoException("Automatic reconnect is not supported on Windows!")
+        self.reconnect_timeout = timeout
+        if timeout is None:
+            return
+        if watch:
+            start_hotplug_watcher()
+        self.identify()
+
+    def identify(self) -> str:
+        """
+        identity of the stick: its USB serial number, looked up through udev if the
+        port was given explicitly, or the port name if the serial number is unknown
+        """
+        if self.serial_number is None and sys.platform != 'win32':
+            try:
+                device = device_cache.identify(self.port_name)
+            except ImportError:
+                device = None
+            if device is not None:
+                self.serial_number, self.device_path, _ = device
+        return self.serial_number or self.port_name
+
+    def reconnect(self, error: Exception):
+        """
+        Recover from a failed port: wait for the stick (by serial number, or its port path),
+        reopen it, replay the register writes of `register_journal` and restart streaming with
+        the last rate and channels. The timing engine flags the next sample as gap.
+        :param error: the error of the port
+        :raises: `error` if auto reconnect is disabled, BnoException if the stick did not come back in time
+        """
+        if self.reconnect_timeout is None:
+            raise error
+        with self.lock:
+            t_start = time.monotonic()
+            deadline = t_start + self.reconnect_timeout
+            try:
+                self.disconnect()
+            except OSError:
+                self.port = None
+            while True:
+                remaining = deadline - time.monotonic()
+                path = None if remaining <= 0 else \
+                    device_cache.wait_for(self.serial_number, self.device_path or self.port_name, remaining)
+                if path is None:
+                    raise BnoException(f"Stick {self.port_name} did not come back within "
+                                       f"{self.reconnect_timeout} s") from error
+                try:
+                    self.port_name = path
+                    self.connect()
+                    self.restore_state()
+                    break
+                except (OSError, BnoException):
+                    try:
+                        self.disconnect()
+                    except OSError:
+                        self.port = None
+                    time.sleep(min(0.1, max(deadline - time.monotonic(), 0.)))
+            self.outage_time = time.monotonic() - t_start
+            self.metrics.reconnects += 1
+
+    def restore_state(self):
+        """
+        replay the journaled register writes, restarting streaming (if it was active)
+        between the writes made before and after its activation
+        """
+        self.framer.reset()
+        self.shadow_invalidate()
+        journal = list(self.register_journal.items())
+        stream_seq = self.stream_seq
+        self.replay_writes([(key, reg_value) for key, (seq, reg_value) in journal if seq <= stream_seq])
+        if self.streaming:
+            timing = self.timing
+            self.start_stream(*self.stream_config, fast=True)
+            self.timing = timing
+            timing.restart()
+        self.replay_writes([(key, reg_value) for key, (seq, reg_value) in journal if seq > stream_seq])
+        if self.calibration_profile is not None:
+            self.write_calibration(self.calibration_profile)
+        if self.shadow is not None and self.page is None:
+            # learn PAGE_ID once, the shadow cache stays bypassed while the page is unknown
+            self.read_registers([self.page_id_addr])
+
+    def replay_writes(self, writes):
+        """:param writes: list of ((page, register address), value)"""
+        page = 0
+        for (reg_page, reg_addr), reg_value in writes:
+            if reg_page != page:
+                self.select_page(reg_page)
+                page = reg_page
+            self.write_register(reg_addr, reg_value)
+        if page != 0:
+            self.select_page(0)
 
     def __enter__(self):
         self.connect()
@@ -115,35 +299,100 @@ class BnoUsbStick:
         self.deactivate_streaming()
         self.disconnect()
 
-    def send(self, command: bytearray, params: dict = {}) -> bool:
-        command_to_send = command.copy()
+    def check_port_access(self):
+        """:raises: BnoException if another thread reads the port in the background"""
+        owner = self.port_owner
+        if owner is not None and owner is not threading.current_thread() and owner.is_alive():
+            raise BnoException(f"Port is read by thread {owner.name}, stop it before sending commands!")
+
+    def send(self, command: bytes, params: dict = {}) -> bool:
+        self.check_port_access()
         if len(params) > 0:
+            command = bytearray(command)
             for entry in params:
-                command_to_send[entry['idx']] = entry['val']
-        bytes_sent = self.port.write(command_to_send)
-        return bytes_sent == len(command_to_send)
+                command[entry['idx']] = entry['val']
+        bytes_sent = self.port.write(command)
+        return bytes_sent == len(command)
+
+    def read_available(self, timeout: float, max_bytes: int = None) -> bytes:
+        """
+        Sleep until the port is readable or `timeout` seconds passed,
+        then read the bytes which are available.
+        :param timeout: maximal time to wait, seconds
+        :param max_bytes: maximal number of bytes to read, defaults to self.buffer_size
+        :return: received bytes, empty on timeout
+        """
+        max_bytes = max_bytes or self.buffer_size
+        metrics = self.metrics
+        if self.poller is not None:
+            if not self.poller.poll(max(timeout, 0.) * 1000.):
+                return bytes()
+            data = self.port.read(max_bytes)
+            metrics.read_calls += 1
+            metrics.bytes_read += len(data)
+            return data
+        # no poll for serial handles (Windows): block on the first byte
+        self.port.timeout = max(timeout, 0.)
+        try:
+            data = self.port.read(1)
+        finally:
+            self.port.timeout = 0
+        metrics.read_calls += 1
+        if data and max_bytes > 1:
+            data += self.port.read(min(self.port.in_waiting, max_bytes - 1))
+            metrics.read_calls += 1
+        metrics.bytes_read += len(data)
+        return data
 
     def recv(self, timeout=0.1):
-        ok = False
-        time_stamp = time.time()
-        time_elapsed = 0
-        while not ok and time_elapsed < timeout:
-            self.buffer = self.port.read(self.buffer_size)
-            ok = len(self.buffer) > 0
-            time_elapsed = time.time() - time_stamp
-        if ok:
-            return True, self.buffer
-        else:
-            return False, bytes()
+        """
+        Receive the bytes available at the port, waiting up to `timeout` seconds for the first one.
+        :return: (True, received bytes) or (False, empty bytes) on timeout
+        """
+        t_start = time.perf_counter_ns()
+        deadline = time.monotonic() + timeout
+        remaining = timeout
+        try:
+            while True:
+                self.buffer = self.read_available(remaining)
+                if len(self.buffer) > 0:
+                    return True, self.buffer
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False, bytes()
+        finally:
+            self.metrics.recv.observe(time.perf_counter_ns() - t_start)
 
-    def send_recv(self, packet: bytearray, params: dict = {}, recv_required=True) -> Tuple[bool, bytes]:
-        send_ok = self.send(packet, params)
-        if not send_ok:
-            raise BnoException("Sending packet failed!")
-        recv_ok, recv_data = self.recv()
-        if not recv_ok and recv_required:
-            raise BnoException("Receiving packet failed!")
-        return True, recv_data
+    def read_exactly(self, num_bytes: int, timeout=0.1) -> Tuple[bool, bytes]:
+        """
+        Receive exactly `num_bytes` bytes, e.g. a response of known length.
+        :param num_bytes: number of bytes to receive
+        :param timeout: deadline for the whole response, seconds
+        :return: (True, received bytes), or (False, bytes received so far) on timeout
+        """
+        deadline = time.monotonic() + timeout
+        data = bytearray()
+        while len(data) < num_bytes:
+            remaining = deadline - time.monotonic()
+            chunk = self.read_available(remaining, num_bytes - len(data))
+            if len(chunk) == 0 and remaining <= 0:
+                break
+            data += chunk
+        self.buffer = bytes(data)
+        return len(self.buffer) == num_bytes, self.buffer
+
+    def send_recv(self, packet: bytes, params: dict = {}, recv_required=True) -> Tuple[bool, bytes]:
+        with self.lock:
+            t_start = time.perf_counter_ns()
+            send_ok = self.send(packet, params)
+            if not send_ok:
+                raise BnoException("Sending packet failed!")
+            recv_ok, recv_data = self.recv()
+            self.metrics.commands += 1
+            self.metrics.command.observe(time.perf_counter_ns() - t_start)
+            if not recv_ok and recv_required:
+                raise BnoException("Receiving packet failed!")
+            return True, recv_data
 
     def pop_bytes(self, num_bytes=2, byteorder='big', **kwargs):
         """
@@ -159,24 +408,21 @@ class BnoUsbStick:
 
     def decode_board_info(self):
         """getting board information, received buffer stored in self.buffer"""
-        self.payload = self.buffer[5:-2]
-        _cmd = self.pop_bytes(num_bytes=1, signed=False)
-        shuttle_id = self.pop_bytes(signed=False)
-        hardware_id = self.pop_bytes(signed=False)
-        software_id = self.pop_bytes(signed=False)
-        board_type = self.pop_bytes(num_bytes=1, signed=False)
+        if len(self.buffer) < BOARD_INFO_OFFSET + BOARD_INFO_STRUCT.size:
+            raise BnoException(f"Board information response too short, got {len(self.buffer)} bytes")
+        _cmd, shuttle_id, hardware_id, software_id, board_type = \
+            BOARD_INFO_STRUCT.unpack_from(self.buffer, BOARD_INFO_OFFSET)
         info_str = f"SHUTTLE_ID: {shuttle_id};\t\tHARDWARE_ID: {hardware_id};" + \
                    f"\t\tSOFTWARE_ID: {software_id};\t\tBOARD_TYPE: {board_type}"
         print(info_str)
 
     def query_board_info(self):
         """ask for board information, shuttle /hw / sw id"""
-        command = bytearray(self.bno_config['board_information']['command'])
-        params = self.bno_config['board_information']['params']
-        ok, resp = self.send_recv(command, params)
-        if not ok:
-            raise BnoException("Command sent failed!")
-        self.decode_board_info()
+        with self.lock:
+            ok, resp = self.send_recv(self.commands['board_information'].fill())
+            if not ok:
+                raise BnoException("Command sent failed!")
+            self.decode_board_info()
 
     def check_packet(self, packet: bytes) -> bool:
         """check start and stop packet bytes, error byte, and status"""
@@ -199,14 +445,16 @@ class BnoUsbStick:
 
     def read_register(self, reg_addr):
         """read single register of the BNO"""
-        command = self.bno_config['read_register']['command']
-        params = self.bno_config['read_register']['params']
-        entry_idx = self.find_entry_idx(params, 'reg_addr')
-        params[entry_idx]['val'] = reg_addr
-        ok, _ = self.send_recv(command, params)
-        if not ok:
-            raise BnoException("Command sent failed!")
-        return self.decode_register_read()
+        with self.lock:
+            reg_value = self.shadow_get(reg_addr)
+            if reg_value is not None:
+                return reg_value
+            ok, _ = self.send_recv(self.commands['read_register'].fill(reg_addr=reg_addr))
+            if not ok:
+                raise BnoException("Command sent failed!")
+            reg_value = self.decode_register_read()
+            self.shadow_update(reg_addr, reg_value)
+            return reg_value
 
     def decode_register_write(self, reg_addr, reg_value):
         """check that register response is OK"""
@@ -217,79 +465,367 @@ class BnoUsbStick:
 
     def write_register(self, reg_addr, reg_value):
         """writing single register of the BNO"""
-        command = self.bno_config['write_register']['command']
-        params = self.bno_config['write_register']['params']
-        reg_addr_entry_idx = self.find_entry_idx(params, 'reg_addr')
-        params[reg_addr_entry_idx]['val'] = reg_addr
-        reg_value_entry_idx = self.find_entry_idx(params, 'reg_val')
-        params[reg_value_entry_idx]['val'] = reg_value
-        ok, _ = self.send_recv(command, params)
-        if not ok:
-            raise BnoException("Command sent failed!")
-        return self.decode_register_write(reg_addr, reg_value)
+        with self.lock:
+            ok, _ = self.send_recv(self.commands['write_register'].fill(reg_addr=reg_addr, reg_val=reg_value))
+            if not ok:
+                raise BnoException("Command sent failed!")
+            written = self.decode_register_write(reg_addr, reg_value)
+            self.shadow_written(reg_addr, reg_value, written)
+            if written:
+                self.journal_write(reg_addr, reg_value)
+            return written
+
+    def journal_write(self, reg_addr, reg_value):
+        """track an acknowledged register write in self.register_journal"""
+        if reg_addr == self.page_id_addr:
+            self.journal_page = reg_value
+            return
+        if self.journal_paused:
+            return
+        if reg_addr == self.sys_trigger_addr and self.journal_page == 0 and reg_value & self.rst_sys_bit:
+            # system reset, nothing written before matters
+            self.register_journal.clear()
+            return
+        key = (self.journal_page, reg_addr)
+        self.journal_seq += 1
+        self.register_journal.pop(key, None)
+        self.register_journal[key] = (self.journal_seq, reg_value)
+
+    def enable_shadow_cache(self, enabled=True):
+        """
+        Keep a shadow copy of the configuration registers in `shadow_registers`,
+        which only change when written. Repeated reads of them are answered from
+        the cache without touching the wire. The cache is updated by writes and
+        cleared by a system reset (SYS_TRIGGER) and by `activate_streaming`.
+        """
+        self.shadow = {} if enabled else None
+        self.page = 0
+
+    def shadow_key(self, reg_addr):
+        if self.shadow is None or self.page is None or reg_addr not in self.shadow_addrs:
+            return None
+        return self.page, reg_addr
+
+    def shadow_get(self, reg_addr):
+        """cached value of a configuration register, None if not cached"""
+        key = self.shadow_key(reg_addr)
+        return None if key is None else self.shadow.get(key)
+
+    def shadow_update(self, reg_addr, reg_value):
+        """track a register value read from the stick in the shadow cache"""
+        if self.shadow is None:
+            return
+        if reg_addr == self.page_id_addr:
+            self.page = reg_value
+        key = self.shadow_key(reg_addr)
+        if key is not None:
+            self.shadow[key] = reg_value
+
+    def shadow_invalidate(self):
+        """forget all cached registers, e.g. after the stick was reconfigured"""
+        if self.shadow is not None:
+            self.shadow.clear()
+            self.page = None
+
+    def shadow_written(self, reg_addr, reg_value, written: bool):
+        """track a register write in the shadow cache"""
+        if self.shadow is None:
+            return
+        if reg_addr == self.page_id_addr:
+            self.page = reg_value if written else None
+        elif reg_addr == self.sys_trigger_addr and self.page == 0 and reg_value & self.rst_sys_bit:
+            # system reset, all registers are back at their defaults on page 0
+            self.shadow.clear()
+            self.page = 0
+            return
+        key = self.shadow_key(reg_addr)
+        if key is not None:
+            if written:
+                self.shadow[key] = reg_value
+            else:
+                self.shadow.pop(key, None)
+
+    def transact_registers(self, commands, decode) -> list:
+        """
+        Send register commands pipelined and check their responses, which are collected in a single drain.
+        :param commands: list of commands
+        :param decode: function (index of command, response packet) -> result
+        :return: list of results
+        """
+        responses = self.send_recv_pipelined(commands)
+        results = []
+        for idx, packet in enumerate(responses):
+            if packet is None:
+                raise BnoException("Receiving packet failed!")
+            self.check_packet(packet)
+            results.append(decode(idx, packet))
+        return results
+
+    def read_registers(self, reg_addrs: Iterable[int]) -> List[int]:
+        """
+        Read many registers at once: contiguous addresses are read by one burst read,
+        all commands are pipelined and their responses are collected in a single drain.
+        Configuration registers are answered from the shadow cache, if enabled.
+        :param reg_addrs: register addresses
+        :return: register values (single bytes), in the order of `reg_addrs`
+        """
+        reg_addrs = list(reg_addrs)
+        with self.lock:
+            values = {}
+            for reg_addr in reg_addrs:
+                reg_value = self.shadow_get(reg_addr)
+                if reg_value is not None:
+                    values[reg_addr] = reg_value
+            runs = []
+            for reg_addr in sorted(set(reg_addrs) - set(values)):
+                if runs and runs[-1][0] + runs[-1][1] == reg_addr:
+                    runs[-1][1] += 1
+                else:
+                    runs.append([reg_addr, 1])
+            commands = []
+            for start_reg_addr, num_bytes in runs:
+                if num_bytes == 1:
+                    commands.append(self.commands['read_register'].build(reg_addr=start_reg_addr))
+                else:
+                    commands.append(self.commands['burst_read'].build(start_reg_addr=start_reg_addr,
+                                                                      num_bytes_msb=(num_bytes >> 8) & 0xFF,
+                                                                      num_bytes_lsb=num_bytes & 0xFF))
+
+            def decode(idx, packet):
+                start_reg_addr, num_bytes = runs[idx]
+                content = packet[BURST_READ_DATA_OFFSET:BURST_READ_DATA_OFFSET + num_bytes]
+                if len(content) != num_bytes:
+                    raise BnoException(f"Expected {num_bytes} bytes from register 0x{start_reg_addr:02X}, "
+                                       f"got {len(content)}")
+                for offset, reg_value in enumerate(content):
+                    values[start_reg_addr + offset] = reg_value
+                    self.shadow_update(start_reg_addr + offset, reg_value)
+
+            self.transact_registers(commands, decode)
+            return [values[reg_addr] for reg_addr in reg_addrs]
+
+    def write_registers(self, reg_values: Dict[int, int]) -> bool:
+        """
+        Write many registers at once: all write commands are pipelined (in the
+        order of `reg_values`) and their responses are collected in a single drain.
+        :param reg_values: register address -> value
+        :return: True if every register write was acknowledged with the written value
+        """
+        items = list(reg_values.items())
+        with self.lock:
+            commands = [self.commands['write_register'].build(reg_addr=reg_addr, reg_val=reg_value)
+                        for reg_addr, reg_value in items]
+
+            def decode(idx, packet):
+                reg_addr, reg_value = items[idx]
+                written = packet[7] == reg_addr and packet[11] == reg_value
+                self.shadow_written(reg_addr, reg_value, written)
+                if written:
+                    self.journal_write(reg_addr, reg_value)
+                return written
+
+            return all(self.transact_registers(commands, decode))
 
     def get_addr_str(self, addr: int) -> str:
-        config_map = self.bno_config['bno055_page_0']
-        for key, val in config_map.items():
-            if val == addr:
-                return key
-        else:
-            return ''
+        return self.register_maps[0].full_name(addr)
+
+    def get_reg_addr(self, reg_name: str, page: int = None) -> Tuple[int, int]:
+        """
+        Look up a register by name, e.g. 'OPR_MODE', 'ACCEL_DATA_X' or 'ACCEL_CONFIG_ADDR'.
+        :param reg_name: register name, with or without _ADDR / _LSB_ADDR suffix
+        :param page: register page (0 or 1), if None page 0 is searched first, then page 1
+        :return: (page, register address)
+        """
+        pages = self.register_maps if page is None else [page]
+        for page_id in pages:
+            if reg_name in self.register_maps[page_id]:
+                return page_id, self.register_maps[page_id].addr(reg_name)
+        raise BnoException(f"Unknown register {reg_name}")
+
+    def select_page(self, page: int):
+        """write PAGE_ID register"""
+        self.write_register(self.page_id_addr, page)
+
+    def read_register_by_name(self, reg_name: str, page: int = None):
+        """read single register by name, registers of page 1 are read with PAGE_ID switched to 1 and back"""
+        page, reg_addr = self.get_reg_addr(reg_name, page)
+        if page == 0:
+            return self.read_register(reg_addr)
+        self.select_page(page)
+        try:
+            return self.read_register(reg_addr)
+        finally:
+            self.select_page(0)
+
+    def write_register_by_name(self, reg_name: str, reg_value, page: int = None):
+        """write single register by name, registers of page 1 are written with PAGE_ID switched to 1 and back"""
+        page, reg_addr = self.get_reg_addr(reg_name, page)
+        if page == 0:
+            return self.write_register(reg_addr, reg_value)
+        self.select_page(page)
+        try:
+            return self.write_register(reg_addr, reg_value)
+        finally:
+            self.select_page(0)
+
+    def set_operation_mode(self, opr_mode: int):
+        """write OPR_MODE and wait until the BNO switched (19 ms to CONFIG mode, 7 ms from it)"""
+        if not self.write_registers({self.opr_mode_addr: opr_mode}):
+            raise BnoException(f"Setting operation mode 0x{opr_mode:02X} failed!")
+        time.sleep(TO_CONFIG_DELAY if opr_mode & 0x0F == OPR_MODE_CONFIG else FROM_CONFIG_DELAY)
+
+    def read_calibration(self) -> CalibrationProfile:
+        """
+        Read the calibration block (offsets and radii, 0x55..0x6A) with one burst read.
+        The offsets are read in CONFIG mode, the BNO is switched back to its operation
+        mode afterwards, which restarts the fusion.
+        :return: CalibrationProfile, with the CALIB_STAT register read before switching modes
+        """
+        with self.lock:
+            calib_stat, opr_mode = self.read_registers([self.calib_stat_addr, self.opr_mode_addr])
+            self.set_operation_mode(OPR_MODE_CONFIG)
+            try:
+                data = self.read_registers(range(CALIBRATION_START, CALIBRATION_START + CALIBRATION_LEN))
+            finally:
+                self.set_operation_mode(opr_mode)
+            return CalibrationProfile(bytes(data), calib_stat)
+
+    def write_calibration(self, profile: CalibrationProfile, opr_mode: int = None):
+        """
+        Write a calibration profile: CONFIG mode, the calibration registers, then the operation mode.
+        The profile is kept in self.calibration_profile and written again after a reconnect,
+        its register writes are not journaled (only an explicit `opr_mode` is).
+        :param opr_mode: operation mode to switch to, if None the current one, NDOF if the BNO is in CONFIG mode
+        """
+        with self.lock:
+            mode_given = opr_mode is not None
+            if not mode_given:
+                opr_mode = self.read_registers([self.opr_mode_addr])[0]
+                if opr_mode & 0x0F == OPR_MODE_CONFIG:
+                    opr_mode = OPR_MODE_NDOF
+            journal_paused, self.journal_paused = self.journal_paused, True
+            try:
+                self.set_operation_mode(OPR_MODE_CONFIG)
+                try:
+                    written = self.write_registers(profile.registers())
+                finally:
+                    self.set_operation_mode(opr_mode)
+            finally:
+                self.journal_paused = journal_paused
+            if mode_given:
+                self.journal_write(self.opr_mode_addr, opr_mode)
+            if not written:
+                raise BnoException("Writing the calibration profile failed!")
+            self.calibration_profile = profile
+
+    def save_calibration(self, store: ProfileStore = None) -> CalibrationProfile:
+        """
+        Read the calibration profile and store it under the identity of the stick, see `identify`.
+        :param store: profile store, ~/.config/bno055_usb_stick_py/calibration.json if None
+        """
+        profile = self.read_calibration()
+        (store or ProfileStore()).put(self.identify(), profile)
+        return profile
+
+    def restore_calibration(self, store: ProfileStore = None) -> Optional[CalibrationProfile]:
+        """
+        Write the stored calibration profile of the stick, if there is one.
+        The fused output is valid right away instead of after a calibration motion.
+        :param store: profile store, ~/.config/bno055_usb_stick_py/calibration.json if None
+        :return: the written profile, None if no profile of this stick is stored
+        """
+        profile = (store or ProfileStore()).get(self.identify())
+        if profile is not None:
+            self.write_calibration(profile)
+        return profile
 
     def decode_burst_read(self, start_reg_addr, num_bytes):
         """
-        :param start_reg_addr:
-        :param num_bytes:
-        :return:
+        decode the burst read response stored in self.buffer with the cached plan
+        of (start_reg_addr, num_bytes)
+        :param start_reg_addr: first register read
+        :param num_bytes: number of bytes read
+        :return: list of register values, list of register names
         """
         self.check_packet(self.buffer)
-        self.payload = self.buffer[11:-2]
-        reg_name = self.get_addr_str(start_reg_addr)
-        bytes_processed = 0
-        register_content = []
-        register_names = []
-        while bytes_processed < num_bytes:
-            if 'LSB' in reg_name:
-                val = self.pop_bytes(2, byteorder='little', signed=True)
-                bytes_processed += 2
-            else:
-                val = self.pop_bytes(1)
-                bytes_processed += 1
-            reg_name_split = re.compile('((_MSB)|(_LSB))?_ADDR').split(reg_name)[0]
-            register_content.append(val)
-            register_names.append(reg_name_split)
-            reg_name = self.get_addr_str(start_reg_addr + bytes_processed)
-        return register_content, register_names
+        plan, register_names = self.register_maps[0].burst_read_plan(start_reg_addr, num_bytes)
+        expected_len = BURST_READ_DATA_OFFSET + plan.size
+        if len(self.buffer) < expected_len:
+            raise BnoException(f"Burst read response too short, expected {expected_len} bytes, "
+                               f"got {len(self.buffer)}")
+        return list(plan.unpack_from(self.buffer, BURST_READ_DATA_OFFSET)), list(register_names)
 
     def check_streaming_packet(self):
         """
-        Check that streaming packet has length 0x38, start byte 0xAA,
-        and stop bytes 0x0D,0x0A
+        Check that the streaming packet in self.buffer has the frame length of the stream layout
+        (`self.layout.frame_len`, 0x38 for all channels), start byte 0xAA, and stop bytes 0x0D,0x0A
         :return: True if everything is OK
         :raises: BnoException if packet length, start, or stop bytes are not met
         """
-        if len(self.buffer) != 0x38:
-            while len(self.buffer) != 0x38:
-                # pop all the packets from serial buffer
-                self.recv()
-        start_byte = 0xAA
-        stop_bytes = bytes([13, 10])
-        packet_start_idx = self.buffer.find(start_byte)
-        packet_stop_idx = self.buffer[packet_start_idx + 1:].find(stop_bytes)
-        if packet_start_idx == -1:
+        if len(self.buffer) != self.framer.frame_len:
+            raise BnoException(f"Invalid streaming packet length, expected {self.framer.frame_len}, "
+                               f"got {len(self.buffer)}")
+        if self.buffer[0] != START_BYTE:
             raise BnoException("Start byte of streaming packet not found")
-        if packet_stop_idx == -1:
+        if self.buffer[-2:] != STOP_BYTES:
             raise BnoException("Stop bytes of streaming packet not found")
         return True
 
+    def recv_streaming_frame(self) -> bytes:
+        """
+        Return the next complete streaming frame. Frames are cut out of the
+        received chunks by self.framer, frames which arrived together with
+        the current one are queued in self.frames and returned by the next calls.
+        :return: raw streaming frame, 0x38 bytes
+        """
+        while not self.frames:
+            try:
+                ok, chunk = self.recv()
+            except OSError as e:
+                self.reconnect(e)
+                continue
+            if ok:
+                self.frames.extend(self.timed_frames(self.framer.feed(chunk), time.monotonic_ns(),
+                                                     len(chunk) >= self.buffer_size))
+        frame, *self.frame_timing = self.frames.popleft()
+        return frame
+
+    def timed_frames(self, frames: List[bytes], timestamp_ns: int, stale: bool = False) -> List[tuple]:
+        """
+        Time the streaming frames received in one chunk by self.timing.
+        :param timestamp_ns: host arrival time of the chunk, time.monotonic_ns()
+        :param stale: the read filled the whole buffer, i.e. the host is behind and more data is waiting
+        :return: list of (frame, arrival time, sample time, flags)
+        """
+        if not frames:
+            return []
+        self.metrics.frames_arrived(len(frames), timestamp_ns)
+        timed = self.timing.update(timestamp_ns, len(frames), stale)
+        return [(frame, timestamp_ns, sample_time_ns, flags) for frame, (sample_time_ns, flags) in zip(frames, timed)]
+
+    def reset_timing(self, interval_ms: int = None):
+        """
+        Restart the timing engine for a new stream.
+        :param interval_ms: configured streaming interval, the one of bno055.json if None
+        """
+        if interval_ms is None:
+            interval_ms = next((stream_interval(command) for command in self.bno_config['start_streaming']
+                                if is_stream_config(command)), None)
+        self.timing = TimingEngine(interval_ms * 1e6 if interval_ms else None)
+
     def recv_streaming_packet(self):
         """
         Receive and decode single streaming packet.
-        :return: BNO055 dataclass
+        :return: BNO055Sample with host arrival time, recovered sample time and gap / duplicate flags
         """
-        ok, _ = self.recv()
+        self.buffer = self.recv_streaming_frame()
+        t_start = time.perf_counter_ns()
         self.check_streaming_packet()
-        return self.decode_streaming()
+        sample = BNO055Sample(self.layout.unpack(self.buffer), *self.frame_timing)
+        metrics = self.metrics
+        metrics.decode.observe(time.perf_counter_ns() - t_start)
+        metrics.frames_decoded += 1
+        return sample
 
     def recv_streaming_generator(self, num_packets=-1):
         """
@@ -303,90 +839,279 @@ class BnoUsbStick:
             yield self.recv_streaming_packet()
             packets_received += 1
 
+    def recv_streaming_batch(self, num_packets):
+        """
+        Receive `num_packets` streaming packets and decode them in one vectorized step.
+        Requires numpy.
+        :param num_packets: number of packets to receive / decode
+        :return: numpy structured array, one field per channel (a, m, g, euler,
+        quaternion, lin_a, gravity, temp and status registers), plus host arrival
+        time, recovered sample time and gap / duplicate flags of every sample
+        """
+        from bno055_usb_stick_py.batch import decode_streaming_frames
+        frames = bytearray()
+        timings = []
+        for _ in range(num_packets):
+            frames += self.recv_streaming_frame()
+            timings.append(self.frame_timing)
+        t_start = time.perf_counter_ns()
+        batch = decode_streaming_frames(frames, self.layout)
+        if num_packets:
+            self.metrics.decode.observe((time.perf_counter_ns() - t_start) // num_packets)
+            batch['timestamp_ns'], batch['sample_time_ns'], batch['flags'] = zip(*timings)
+        self.metrics.frames_decoded += num_packets
+        return batch
+
+    def recv_streaming_blocks(self, block_size, num_blocks=-1):
+        """
+        Receive and decode streaming packets in blocks of `block_size` samples.
+        :param block_size: number of packets per block
+        :param num_blocks: number of blocks to receive. If -1 (default), receive forever
+        :return: generator of numpy structured arrays, see `recv_streaming_batch`
+        """
+        blocks_received = 0
+        while num_blocks == -1 or blocks_received < num_blocks:
+            yield self.recv_streaming_batch(block_size)
+            blocks_received += 1
+
+    def start_reader(self, maxsize=1024, policy=DROP_OLDEST) -> StreamReader:
+        """
+        Start threaded acquisition: a dedicated reader thread drains the port,
+        decodes streaming packets, stamps them with their host arrival time and
+        pushes them into a bounded queue. While the reader runs, samples must be
+        consumed through `get_latest` / `iter_samples` only, and commands (register
+        access, activation) raise BnoException: the reader owns the port until `stop_reader`.
+        :param maxsize: capacity of the sample queue
+        :param policy: what to do when the queue is full: 'drop_oldest', 'drop_newest' or 'block'
+        :return: the running StreamReader, exposing the queue and its overrun counters
+        """
+        if self.reader is not None and self.reader.is_alive():
+            raise BnoException("Reader thread is already running!")
+        self.reader = StreamReader(self, maxsize, policy)
+        self.port_owner = self.reader
+        self.reader.start()
+        return self.reader
+
+    def stop_reader(self):
+        """stop the reader thread, if running"""
+        reader = getattr(self, 'reader', None)
+        if reader is not None:
+            reader.stop()
+            self.metrics.frames_dropped += reader.queue.overruns
+            self.reader = None
+            if self.port_owner is reader:
+                self.port_owner = None
+
+    def get_latest(self):
+        """
+        Newest sample received by the reader thread, does not block.
+        :return: BNO055Sample or None if nothing has been received yet
+        """
+        if self.reader is None:
+            raise BnoException("Reader thread is not running, call start_reader() first!")
+        return self.reader.get_latest()
+
+    def iter_samples(self):
+        """
+        Blocking iterator over the samples queued by the reader thread,
+        ends when the reader is stopped.
+        """
+        if self.reader is None:
+            raise BnoException("Reader thread is not running, call start_reader() first!")
+        return iter(self.reader)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the hot-path metrics: read syscalls, bytes read, frames received,
+        decoded and dropped, framer resyncs, latency histograms of recv, decoding and
+        command round trips, inter-arrival time / jitter of streaming frames, and the
+        state of the timing engine (device period, drift, gaps). See metrics.py for Prometheus export.
+        """
+        reader = self.reader
+        stats = self.metrics.snapshot(self.framer, reader.queue.overruns if reader is not None else 0)
+        stats['timing'] = self.timing.stats()
+        return stats
+
     def decode_streaming(self):
-        self.payload = self.buffer[5:-2]
-        a_x = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        a_y = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        a_z = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-
-        m_x = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        m_y = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        m_z = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-
-        g_x = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        g_y = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        g_z = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-
-        yaw = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        roll = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        pitch = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-
-        q_w = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        q_x = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        q_y = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        q_z = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-
-        lin_a_x = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        lin_a_y = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        lin_a_z = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-
-        gravity_x = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        gravity_y = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-        gravity_z = self.pop_bytes(num_bytes=2, byteorder='little', signed=True)
-
-        temp = self.pop_bytes(num_bytes=1, byteorder='little', signed=True)
-        calib_stat = self.pop_bytes(num_bytes=1, byteorder='little', signed=False)
-        st_result = self.pop_bytes(num_bytes=1, byteorder='little', signed=False)
-        int_sta = self.pop_bytes(num_bytes=1, byteorder='little', signed=False)
-        sys_clk_status = self.pop_bytes(num_bytes=1, byteorder='little', signed=False)
-        sys_status = self.pop_bytes(num_bytes=1, byteorder='little', signed=False)
-
-        bno_data = BNO055()
-        bno_data.a_raw = (a_x, a_y, a_z)
-        bno_data.g_raw = (g_x, g_y, g_z)
-        bno_data.m_raw = (m_x, m_y, m_z)
-        bno_data.euler_raw = (yaw, roll, pitch)
-        bno_data.quaternion_raw = (q_w, q_x, q_y, q_z)
-        bno_data.lin_a_raw = (lin_a_x, lin_a_y, lin_a_z)
-        bno_data.gravity_raw = (gravity_x, gravity_y, gravity_z)
-        bno_data.temp = temp
-        bno_data.calib_stat = calib_stat
-        bno_data.st_result = st_result
-        bno_data.int_sta = int_sta
-        bno_data.sys_clk_status = sys_clk_status
-        bno_data.sys_status = sys_status
-        bno_data.apply_resolution()
-        return bno_data
+        """decode the streaming packet stored in self.buffer with a single struct unpack"""
+        return BNO055Sample(self.layout.unpack(self.buffer))
 
     def burst_read(self, start_reg_addr, num_bytes):
-        num_bytes_msb = (num_bytes >> 8) & 0xFF
-        num_bytes_lsb = num_bytes & 0xFF
-        command = self.bno_config['burst_read']['command']
-        params = self.bno_config['burst_read']['params']
-        reg_addr_entry_idx = self.find_entry_idx(params, 'start_reg_addr')
-        params[reg_addr_entry_idx]['val'] = start_reg_addr
-        msb_entry_idx = self.find_entry_idx(params, 'num_bytes_msb')
-        params[msb_entry_idx]['val'] = num_bytes_msb
-        lsb_entry_idx = self.find_entry_idx(params, 'num_bytes_lsb')
-        params[lsb_entry_idx]['val'] = num_bytes_lsb
-        ok, _ = self.send_recv(command, params)
-        if not ok:
-            raise BnoException("Command sent failed!")
-        return self.decode_burst_read(start_reg_addr, num_bytes)
-
-    def activate_streaming(self):
+        with self.lock:
+            command = self.commands['burst_read'].fill(start_reg_addr=start_reg_addr,
+                                                       num_bytes_msb=(num_bytes >> 8) & 0xFF,
+                                                       num_bytes_lsb=num_bytes & 0xFF)
+            ok, _ = self.send_recv(command)
+            if not ok:
+                raise BnoException("Command sent failed!")
+            return self.decode_burst_read(start_reg_addr, num_bytes)
+
+    @staticmethod
+    def skip_repeated_commands(commands):
+        """drop commands which are identical to the command sent right before them"""
+        return [command for idx, command in enumerate(commands) if idx == 0 or command != commands[idx - 1]]
+
+    def send_recv_pipelined(self, commands, window=8, timeout=0.1, stream_completes=False) -> List[Optional[bytes]]:
+        """
+        Send `commands` keeping up to `window` of them in flight. Responses
+        are matched by count: every received response completes the oldest
+        outstanding command. A command without response within `timeout` is
+        given up on, as `send_recv(..., recv_required=False)` does.
+        Streaming frames (see framing.is_stream_frame) are not counted, they are queued in self.frames.
+        :param stream_completes: once all commands are sent, the first streaming frame
+        completes the sequence (the last command started the stream)
+        :return: response packet of every command, None where the response was lost
+        """
+        with self.lock:
+            packet_framer = PacketFramer()
+            responses = []
+            sent = 0
+            deadline = time.monotonic() + timeout
+            while len(responses) < len(commands):
+                while sent < len(commands) and sent - len(responses) < window:
+                    if not self.send(commands[sent]):
+                        raise BnoException("Sending packet failed!")
+                    sent += 1
+                remaining = deadline - time.monotonic()
+                chunk = self.read_available(remaining)
+                timestamp_ns = time.monotonic_ns()
+                frames = []
+                for packet in packet_framer.feed(chunk):
+                    if is_stream_frame(packet, self.framer.frame_len):
+                        frames.append(packet)
+                        if stream_completes and sent == len(commands):
+                            responses.extend([None] * (len(commands) - len(responses)))
+                    elif len(responses) < len(commands):
+                        responses.append(packet)
+                        deadline = time.monotonic() + timeout
+                self.frames.extend(self.timed_frames(frames, timestamp_ns, len(chunk) >= self.buffer_size))
+                if len(chunk) == 0 and remaining <= 0:
+                    # response lost, give up on the oldest command
+                    responses.append(None)
+                    deadline = time.monotonic() + timeout
+            self.frames.extend(self.timed_frames(self.framer.feed(packet_framer.buffer), time.monotonic_ns()))
+            self.metrics.commands += len(commands)
+            return responses
+
+    def send_pipelined(self, commands, window=8, timeout=0.1) -> int:
+        """
+        Send a command sequence with `send_recv_pipelined`, the first streaming
+        frame after the last command completes the sequence.
+        :return: number of acknowledged commands
+        """
+        responses = self.send_recv_pipelined(commands, window, timeout, stream_completes=True)
+        return len(responses) - responses.count(None)
+
+    def is_streaming(self, timeout=0.05) -> bool:
+        """check whether streaming packets are already arriving, received frames are kept"""
+        deadline = time.monotonic() + timeout
+        while not self.frames:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ok, chunk = self.recv(remaining)
+            if ok:
+                self.frames.extend(self.timed_frames(self.framer.feed(chunk), time.monotonic_ns(),
+                                                     len(chunk) >= self.buffer_size))
+        return True
+
+    def is_configured(self) -> bool:
+        """BNO leaves CONFIG operation mode only when it was set up, e.g. by a previous activation"""
+        # the stick may be streaming already: read through the frame aware pipelined path
+        return self.read_registers([self.opr_mode_addr])[0] & 0x0F != 0
+
+    def streaming_commands_tail(self):
+        """the commands of `start_streaming` which (re)start the data stream, without sensor setup"""
         commands_sequence = self.bno_config['start_streaming']
-        for command in commands_sequence:
-            params = {}
-            ok, _ = self.send_recv(bytearray(command), params, recv_required=False)
+        stop_commands = self.bno_config['stop_streaming']
+        tail_idx = max(idx for idx, command in enumerate(commands_sequence) if command in stop_commands)
+        return commands_sequence[tail_idx:]
+
+    def set_stream_layout(self, layout: StreamLayout):
+        """frame length and decoder of the streaming packets"""
+        if layout == self.layout:
+            return
+        self.layout = layout
+        self.framer.frame_len = layout.frame_len
+        self.framer.reset()
+        self.frames.clear()
+
+    @staticmethod
+    def stream_interval_ms(rate_hz: float) -> int:
+        interval_ms = round(1000. / rate_hz) if rate_hz > 0 else 0
+        if not 1 <= interval_ms <= 0xFFFF:
+            raise BnoException(f"Streaming rate {rate_hz} Hz out of range, expected 0.016 .. 1000 Hz")
+        return interval_ms
+
+    def streaming_sequence(self, commands_sequence, interval_ms: int = None):
+        """`commands_sequence` with the stream configuration command set to self.layout and `interval_ms`"""
+        layout = self.layout
+        return [stream_config_command(command, layout.window_start, layout.window_len, interval_ms)
+                if is_stream_config(command) else command
+                for command in commands_sequence]
+
+    def activate_streaming(self, fast=False, resume=False, window=8, rate_hz: float = None,
+                           channels: Iterable[str] = None) -> float:
+        """
+        Replay the `start_streaming` command sequence of bno055.json.
+        :param fast: pipeline the commands (up to `window` in flight) and skip repeated commands,
+        instead of waiting for the response of every single command
+        :param resume: return right away if the stick is already streaming (with the same rate and
+        channels), and only restart the stream (without sensor setup) if the stick is already configured
+        :param window: maximal number of commands in flight in fast mode
+        :param rate_hz: streaming rate, the interval of bno055.json (100 Hz) if None
+        :param channels: channels to stream, e.g. ['quaternion', 'lin_a'], see decoding.STREAMING_CHANNELS;
+        the smallest register window holding them is streamed. All channels if None
+        :return: activation time in seconds, also stored in self.activation_time
+        """
+        interval_ms = None if rate_hz is None else self.stream_interval_ms(rate_hz)
+        layout = DEFAULT_LAYOUT if channels is None else StreamLayout(channels)
+        return self.start_stream(layout, interval_ms, fast, resume, window)
+
+    def start_stream(self, layout: StreamLayout, interval_ms: Optional[int], fast=False, resume=False,
+                     window=8) -> float:
+        """`activate_streaming` with the layout and the interval in ms (None: the one of bno055.json)"""
+        time_stamp = time.monotonic()
+        stream_config = (layout, interval_ms)
+        self.set_stream_layout(layout)
+        commands_sequence = self.bno_config['start_streaming']
+        # the sequence writes registers behind the back of the shadow cache
+        page = self.page
+        self.shadow_invalidate()
+        if resume:
+            if stream_config == self.stream_config and self.is_streaming():
+                commands_sequence = []
+            elif self.is_configured():
+                commands_sequence = self.streaming_commands_tail()
+        commands_sequence = self.streaming_sequence(commands_sequence, interval_ms)
+        self.stream_config = stream_config
+        if commands_sequence:
+            self.reset_timing(interval_ms)
+        if fast:
+            self.send_pipelined(self.skip_repeated_commands(commands_sequence), window)
+        else:
+            for command in commands_sequence:
+                params = {}
+                ok, _ = self.send_recv(bytearray(command), params, recv_required=False)
+        if self.shadow is not None:
+            # the sequence (and its tail) ends on PAGE_ID 0, without a sequence nothing changed
+            self.page = 0 if commands_sequence else page
+        self.streaming = True
+        self.stream_seq = self.journal_seq
+        self.activation_time = time.monotonic() - time_stamp
+        return self.activation_time
 
     def deactivate_streaming(self):
+        self.stop_reader()
+        self.streaming = False
         commands_sequence = self.bno_config['stop_streaming']
         for command in commands_sequence:
             params = {}
             ok, _ = self.send_recv(bytearray(command), params)
         while len(self.buffer) > 0:
             self.recv()
+        self.framer.reset()
+        self.frames.clear()
 
 
 def test_register_content(bno: BnoUsbStick, reg_address: int, expected_value: int, err_message: str):
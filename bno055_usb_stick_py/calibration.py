@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import os
+import struct
+import time
+from typing import Dict, Optional
+
+# calibration block: offsets and radii, registers ACCEL_OFFSET_X_LSB (0x55) .. MAG_RADIUS_MSB (0x6A)
+CALIBRATION_START = 0x55
+CALIBRATION_LEN = 22
+# accel offset x, y, z, mag offset x, y, z, gyro offset x, y, z, accel radius, mag radius
+CALIBRATION_STRUCT = struct.Struct('<9hhh')
+OPR_MODE_CONFIG = 0x00
+OPR_MODE_NDOF = 0x0C
+# operating mode switching times of the datasheet (table 3-6), seconds
+TO_CONFIG_DELAY = 0.019
+FROM_CONFIG_DELAY = 0.007
+PROFILES_PATH = os.path.join(os.path.expanduser('~'), '.config', 'bno055_usb_stick_py', 'calibration.json')
+
+
+class CalibrationProfile:
+    """calibration offsets and radii of one stick, as read from the calibration registers"""
+
+    def __init__(self, data: bytes, calib_stat: int = None, created: float = None):
+        """
+        :param data: the 22 bytes of registers 0x55..0x6A
+        :param calib_stat: CALIB_STAT register when the profile was read
+        :param created: time.time() when the profile was read
+        """
+        if len(data) != CALIBRATION_LEN:
+            raise ValueError(f"Expected {CALIBRATION_LEN} calibration bytes, got {len(data)}")
+        self.data = bytes(data)
+        self.calib_stat = calib_stat
+        self.created = time.time() if created is None else created
+        values = CALIBRATION_STRUCT.unpack(self.data)
+        self.accel_offset = values[0:3]
+        self.mag_offset = values[3:6]
+        self.gyro_offset = values[6:9]
+        self.accel_radius = values[9]
+        self.mag_radius = values[10]
+
+    def __repr__(self):
+        return f"CalibrationProfile(accel_offset={self.accel_offset}, mag_offset={self.mag_offset}, " \
+               f"gyro_offset={self.gyro_offset}, accel_radius={self.accel_radius}, mag_radius={self.mag_radius})"
+
+    def __eq__(self, other):
+        if not isinstance(other, CalibrationProfile):
+            return NotImplemented
+        return self.data == other.data
+
+    @property
+    def fully_calibrated(self) -> bool:
+        """system, gyroscope, accelerometer and magnetometer were all at level 3 when the profile was read"""
+        return self.calib_stat == 0xFF
+
+    def registers(self) -> Dict[int, int]:
+        """register address -> value, in the order of the registers"""
+        return {CALIBRATION_START + offset: reg_value for offset, reg_value in enumerate(self.data)}
+
+    def to_dict(self) -> dict:
+        return {'registers': self.data.hex(), 'calib_stat': self.calib_stat, 'created': self.created}
+
+    @classmethod
+    def from_dict(cls, entry: dict) -> 'CalibrationProfile':
+        return cls(bytes.fromhex(entry['registers']), entry.get('calib_stat'), entry.get('created'))
+
+
+class ProfileStore:
+    """
+    Calibration profiles of several sticks in one JSON file, keyed by stick
+    identity (USB serial number, or the port name if it is unknown).
+    """
+
+    def __init__(self, path: str = PROFILES_PATH):
+        self.path = path
+
+    def load(self) -> Dict[str, CalibrationProfile]:
+        """all profiles of the file, empty if it does not exist yet"""
+        import json
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        return {device_id: CalibrationProfile.from_dict(entry) for device_id, entry in entries.items()}
+
+    def get(self, device_id: str) -> Optional[CalibrationProfile]:
+        return self.load().get(device_id)
+
+    def put(self, device_id: str, profile: CalibrationProfile):
+        """add or replace the profile of a stick, the file is replaced atomically"""
+        import json
+        profiles = self.load()
+        profiles[device_id] = profile
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({key: value.to_dict() for key, value in sorted(profiles.items())}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+"""
+Decoded samples on disk, column by column.
+
+ColumnWriter collects decoded, scaled samples into fixed-size chunks and
+writes every field of a chunk as its own compressed `.npy` member of a zip
+archive (`.npz`), named `<field>/<chunk number>`. Compression and disk I/O
+run in a background thread, the acquisition loop only copies samples into the
+current chunk. Files are rotated by size or age; a file is written as
+`<name>.npz.part` and renamed when it is complete, so only finished files are
+ever read.
+
+ColumnFile reads a file back lazily: only the members of the requested
+column are decompressed. `np.load` opens the files as well.
+"""
+
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from bno055_usb_stick_py.batch import samples_to_batch
+
+SUFFIX = '.npz'
+PART_SUFFIX = '.part'
+
+
+def numbered_files(directory: str, prefix: str = 'bno055') -> List[Tuple[int, str]]:
+    """(number, path) of the complete column files `<prefix>-<number>.npz` in `directory`, oldest first"""
+    pattern = re.compile(rf'{re.escape(prefix)}-(\d+){re.escape(SUFFIX)}')
+    files = []
+    for name in os.listdir(directory):
+        match = pattern.fullmatch(name)
+        if match is not None:
+            files.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(files)
+
+
+def column_files(directory: str, prefix: str = 'bno055') -> List[str]:
+    """complete column files of `prefix` in `directory`, oldest first"""
+    return [path for _, path in numbered_files(directory, prefix)]
+
+
+class ColumnWriter:
+    """
+    Sink for decoded samples: blocks from `recv_streaming_blocks` / Pipeline,
+    or single BNO055Sample objects, written as compressed column chunks.
+    """
+
+    def __init__(self, directory: str, prefix: str = 'bno055', chunk_size: int = 4096,
+                 rotate_bytes: int = 64 << 20, rotate_seconds: float = None,
+                 fields: Sequence[str] = None, compresslevel: int = 6, max_pending: int = 4):
+        """
+        :param directory: directory of the column files, created if missing
+        :param prefix: files are named `<prefix>-<number>.npz`, numbering continues after existing files
+        :param chunk_size: samples per chunk
+        :param rotate_bytes: start a new file once a file reaches this size, never if None
+        :param rotate_seconds: complete the current file every `rotate_seconds`, never if None;
+        the current chunk is written early if needed
+        :param fields: fields to store, all fields of the first block if None
+        :param compresslevel: zlib compression level, 0..9
+        :param max_pending: chunks waiting for compression; `write` blocks when they pile up
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.fields = tuple(fields) if fields is not None else None
+        self.compresslevel = compresslevel
+        existing = numbered_files(directory, prefix)
+        self.file_index = existing[-1][0] + 1 if existing else 0
+        self.dtype = None
+        self.chunk = None
+        self.fill = 0
+        self.pending_samples = []
+        self.rotate_at = None
+        self.paths = []
+        self.error = None
+        # state of the background thread
+        self.archive = None
+        self.part_path = None
+        self.num_chunks = 0
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bno-columns')
+
+    def write(self, sample):
+        """add a BNO055Sample; samples are converted to a block every `chunk_size` samples"""
+        self.start_rotation_timer()
+        self.pending_samples.append(sample)
+        if len(self.pending_samples) >= self.chunk_size - self.fill or self.rotation_due():
+            samples, self.pending_samples = self.pending_samples, []
+            self.write_block(samples_to_batch(samples))
+
+    def write_block(self, block: np.ndarray):
+        """add a block of decoded samples, a numpy structured array (see `decode_streaming_frames`)"""
+        if self.error is not None:
+            raise self.error
+        self.start_rotation_timer()
+        if self.chunk is None:
+            names = self.fields or block.dtype.names
+            self.dtype = np.dtype([(name, block.dtype[name]) for name in names])
+            self.chunk = np.empty(self.chunk_size, dtype=self.dtype)
+        start = 0
+        while start < len(block):
+            count = min(self.chunk_size - self.fill, len(block) - start)
+            part = block[start:start + count]
+            for name in self.dtype.names:
+                self.chunk[name][self.fill:self.fill + count] = part[name]
+            self.fill += count
+            start += count
+            if self.fill == self.chunk_size:
+                self.submit_chunk()
+        if self.rotation_due():
+            self.flush(rotate=True)
+
+    def start_rotation_timer(self):
+        if self.rotate_at is None and self.rotate_seconds is not None:
+            self.rotate_at = time.monotonic() + self.rotate_seconds
+
+    def rotation_due(self) -> bool:
+        return self.rotate_at is not None and time.monotonic() >= self.rotate_at
+
+    def submit_chunk(self):
+        """hand the current chunk over to the background thread"""
+        chunk = self.chunk[:self.fill]
+        self.chunk = np.empty(self.chunk_size, dtype=self.dtype)
+        self.fill = 0
+        self.submit(self._write_chunk, chunk)
+
+    def submit(self, task, *args):
+        self.slots.acquire()
+        self.executor.submit(self._run, task, *args)
+
+    def _run(self, task, *args):
+        try:
+            if self.error is None:
+                task(*args)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.slots.release()
+
+    def flush(self, rotate=False):
+        """
+        write the samples collected so far as a (short) chunk
+        :param rotate: also complete the current file, the next chunk starts a new one
+        """
+        if self.pending_samples:
+            samples, self.pending_samples = self.pending_samples, []
+            self.write_block(samples_to_batch(samples))
+        if self.fill:
+            self.submit_chunk()
+        if rotate:
+            self.rotate_at = None
+            self.submit(self._close_file)
+
+    def close(self):
+        """write the remaining samples, complete the current file and stop the background thread"""
+        self.flush(rotate=True)
+        self.executor.shutdown(wait=True)
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # background thread
+
+    def _write_chunk(self, chunk: np.ndarray):
+        if self.archive is None:
+            name = f"{self.prefix}-{self.file_index:05d}{SUFFIX}"
+            self.file_index += 1
+            self.part_path = os.path.join(self.directory, name + PART_SUFFIX)
+            self.archive = zipfile.ZipFile(self.part_path, 'w', zipfile.ZIP_DEFLATED,
+                                           compresslevel=self.compresslevel)
+            self.num_chunks = 0
+        for name in chunk.dtype.names:
+            with self.archive.open(f"{name}/{self.num_chunks:06d}.npy", 'w', force_zip64=True) as member:
+                np.lib.format.write_array(member, np.ascontiguousarray(chunk[name]), allow_pickle=False)
+        self.num_chunks += 1
+        if self.rotate_bytes is not None and self.archive.fp.tell() >= self.rotate_bytes:
+            self._close_file()
+
+    def _close_file(self):
+        if self.archive is None:
+            return
+        self.archive.close()
+        self.archive = None
+        path = self.part_path[:-len(PART_SUFFIX)]
+        os.replace(self.part_path, path)
+        self.paths.append(path)
+
+
+class ColumnFile:
+    """
+    Lazy reader of a column file: nothing is decompressed until a column is
+    requested, and then only the members of that column.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.archive = zipfile.ZipFile(path)
+        self.members = {}
+        for member in self.archive.namelist():
+            field, _, name = member.rpartition('/')
+            if field and name.endswith('.npy'):
+                self.members.setdefault(field, []).append(member)
+        for members in self.members.values():
+            members.sort()
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.members)
+
+    def __len__(self):
+        """number of samples"""
+        if not self.members:
+            return 0
+        field = next(iter(self.members))
+        return sum(self.chunk_shape(member)[0] for member in self.members[field])
+
+    def chunk_shape(self, member: str):
+        """shape of a chunk, from the header of its member"""
+        with self.archive.open(member) as f:
+            if np.lib.format.read_magic(f) == (1, 0):
+                return np.lib.format.read_array_header_1_0(f)[0]
+            return np.lib.format.read_array_header_2_0(f)[0]
+
+    def chunks(self, field: str) -> Iterator[np.ndarray]:
+        """the chunks of a column one by one"""
+        if field not in self.members:
+            raise KeyError(f"{self.path} has no column {field!r}, columns: {', '.join(self.fields)}")
+        for member in self.members[field]:
+            with self.archive.open(member) as f:
+                yield np.lib.format.read_array(f, allow_pickle=False)
+
+    def column(self, field: str) -> np.ndarray:
+        """a complete column"""
+        return np.concatenate(list(self.chunks(field)))
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.column(field)
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_column(directory: str, field: str, prefix: str = 'bno055') -> np.ndarray:
+    """a column over all complete files of `prefix` in `directory`"""
+    columns = []
+    for path in column_files(directory, prefix):
+        with ColumnFile(path) as column_file:
+            columns.append(column_file.column(field))
+    if not columns:
+        raise FileNotFoundError(f"No column files {prefix}-*{SUFFIX} in {directory}")
+    return np.concatenate(columns)
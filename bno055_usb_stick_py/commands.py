@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+from typing import Dict, List
+
+# stream configuration command of `start_streaming`, e.g.
+# AA 15 04 01 0E 00 00 00 28 00 0A 02 08 30 00 00 01 07 00 0D 0A: every 0x000A ms, 0x30 registers from 0x08
+STREAM_CONFIG = 0x04
+STREAM_CONFIG_CMD_IDX = 2
+STREAM_INTERVAL_IDX = 9
+STREAM_WINDOW_START_IDX = 12
+STREAM_WINDOW_LEN_IDX = 13
+
+
+def is_stream_config(command: bytes) -> bool:
+    return len(command) > STREAM_WINDOW_LEN_IDX and command[STREAM_CONFIG_CMD_IDX] == STREAM_CONFIG
+
+
+def stream_interval(command: bytes) -> int:
+    """streaming interval of a stream configuration command, milliseconds"""
+    return int.from_bytes(command[STREAM_INTERVAL_IDX:STREAM_INTERVAL_IDX + 2], 'big')
+
+
+def stream_config_command(command: bytes, window_start: int, window_len: int, interval_ms: int = None) -> bytes:
+    """
+    Stream configuration `command` with another register window and interval.
+    :param interval_ms: streaming interval in milliseconds, unchanged if None
+    """
+    command = bytearray(command)
+    command[STREAM_WINDOW_START_IDX] = window_start
+    command[STREAM_WINDOW_LEN_IDX] = window_len
+    if interval_ms is not None:
+        command[STREAM_INTERVAL_IDX:STREAM_INTERVAL_IDX + 2] = interval_ms.to_bytes(2, 'big')
+    return bytes(command)
+
+
+class CommandTemplate:
+    """
+    Command of bno055.json compiled into an immutable byte layout.
+
+    Placeholders of the command are replaced by the default values of the
+    params, the offset of every param is known by its description. `fill`
+    writes a command into a preallocated buffer without touching the shared
+    config; the buffer is reused by every call, so it must only be used
+    while holding the bus lock of the stick. `build` returns a new copy.
+    """
+
+    def __init__(self, command: List, params: List[Dict]):
+        template = bytearray(el if isinstance(el, int) else 0 for el in command)
+        self.offsets = {}
+        for param in params:
+            template[param['idx']] = param['val']
+            self.offsets[param['description']] = param['idx']
+        self.template = bytes(template)
+        self.buffer = bytearray(self.template)
+
+    def __len__(self):
+        return len(self.template)
+
+    def fill(self, **values) -> bytearray:
+        """
+        :param values: param description -> value, e.g. reg_addr=0x3D
+        :return: the preallocated buffer holding the command
+        """
+        buffer = self.buffer
+        buffer[:] = self.template
+        offsets = self.offsets
+        for description, val in values.items():
+            buffer[offsets[description]] = val
+        return buffer
+
+    def build(self, **values) -> bytes:
+        """same as `fill`, but writes into a new buffer, so no lock is needed"""
+        command = bytearray(self.template)
+        for description, val in values.items():
+            command[self.offsets[description]] = val
+        return bytes(command)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import re
+import struct
+from functools import partial
+from typing import Iterable
+
+# streaming frame: 5 header bytes, data, 2 stop bytes
+STREAMING_DATA_OFFSET = 5
+# a, m, g, euler, quaternion, lin_a, gravity as 22 little Endian int16,
+# followed by temp (int8), calib_stat, st_result, int_sta, sys_clk_status (uint8)
+STREAMING_STRUCT = struct.Struct('<22hb4B')
+# streamable channels in register order: (name, first register, struct codes)
+STREAMING_CHANNELS = (
+    ('a', 0x08, 'hhh'),
+    ('m', 0x0E, 'hhh'),
+    ('g', 0x14, 'hhh'),
+    ('euler', 0x1A, 'hhh'),
+    ('quaternion', 0x20, 'hhhh'),
+    ('lin_a', 0x28, 'hhh'),
+    ('gravity', 0x2E, 'hhh'),
+    ('temp', 0x34, 'b'),
+    ('calib_stat', 0x35, 'B'),
+    ('st_result', 0x36, 'B'),
+    ('int_sta', 0x37, 'B'),
+    ('sys_clk_status', 0x38, 'B'),
+)
+# a frame of a register window of length L carries L + 1 registers: 5 header bytes, data, 2 stop bytes
+STREAMING_FRAME_OVERHEAD = STREAMING_DATA_OFFSET + 2
+
+# board information response: command, shuttle / hardware / software id, board type
+BOARD_INFO_OFFSET = 5
+BOARD_INFO_STRUCT = struct.Struct('>B3HB')
+
+# burst read response: 11 header bytes, register content, 2 stop bytes
+BURST_READ_DATA_OFFSET = 11
+
+REG_NAME_SUFFIX = re.compile('((_MSB)|(_LSB))?_ADDR')
+
+
+def strip_reg_name(reg_name: str) -> str:
+    """register name without the _ADDR / _LSB_ADDR / _MSB_ADDR suffix"""
+    return REG_NAME_SUFFIX.split(reg_name)[0]
+
+
+def burst_read_format(reg_names) -> str:
+    """
+    struct format for the content of a burst read
+    :param reg_names: full register names (with suffix) of every byte read
+    :return: format string, `h` for every LSB/MSB register pair, `B` otherwise
+    """
+    fmt = '<'
+    idx = 0
+    while idx < len(reg_names):
+        if 'LSB' in reg_names[idx]:
+            # an LSB register cut off by the end of the burst is read as a signed byte
+            fmt += 'h' if idx + 1 < len(reg_names) else 'b'
+            idx += 2
+        else:
+            fmt += 'B'
+            idx += 1
+    return fmt
+
+
+class StreamLayout:
+    """
+    Register window streamed by the stick, the smallest one which holds the
+    requested channels, with the matching frame length and decoder.
+
+    `unpack` returns the raw values in the layout of STREAMING_STRUCT, so
+    that they can be wrapped in a BNO055Sample; channels outside of the
+    window are zero.
+    """
+
+    def __init__(self, channels: Iterable[str] = None):
+        """
+        :param channels: channel names of STREAMING_CHANNELS, e.g. ['quaternion', 'lin_a'], all if None
+        """
+        names = [name for name, _, _ in STREAMING_CHANNELS]
+        channels = names if channels is None else list(channels)
+        unknown = set(channels) - set(names)
+        if unknown or not channels:
+            raise ValueError(f"Unknown streaming channels {sorted(unknown)}, expected some of {names}")
+        first = min(names.index(name) for name in channels)
+        last = max(names.index(name) for name in channels)
+        window = STREAMING_CHANNELS[first:last + 1]
+        self.channels = tuple(name for name, _, _ in window)
+        self.struct = struct.Struct('<' + ''.join(codes for _, _, codes in window))
+        self.window_start = window[0][1]
+        self.window_len = self.struct.size - 1
+        self.frame_len = self.struct.size + STREAMING_FRAME_OVERHEAD
+        self.prefix = (0,) * sum(len(codes) for _, _, codes in STREAMING_CHANNELS[:first])
+        self.suffix = (0,) * sum(len(codes) for _, _, codes in STREAMING_CHANNELS[last + 1:])
+        if not self.prefix and not self.suffix:
+            self.unpack = partial(self.struct.unpack_from, offset=STREAMING_DATA_OFFSET)
+
+    @classmethod
+    def from_window(cls, window_start: int, window_len: int) -> 'StreamLayout':
+        """layout of a register window, e.g. of a recording"""
+        channels = [name for name, reg_addr, codes in STREAMING_CHANNELS
+                    if window_start <= reg_addr and reg_addr + len(codes) <= window_start + window_len + 1]
+        layout = cls(channels)
+        if layout.window_start != window_start or layout.window_len != window_len:
+            raise ValueError(f"Register window 0x{window_start:02X}, length {window_len} "
+                             f"does not match streaming channels")
+        return layout
+
+    def __eq__(self, other):
+        return isinstance(other, StreamLayout) and self.channels == other.channels
+
+    def __hash__(self):
+        return hash(self.channels)
+
+    def __repr__(self):
+        return f"StreamLayout({list(self.channels)})"
+
+    def unpack(self, frame) -> tuple:
+        """raw values of a streaming frame, zero for channels outside of the window"""
+        return self.prefix + self.struct.unpack_from(frame, STREAMING_DATA_OFFSET) + self.suffix
+
+
+DEFAULT_LAYOUT = StreamLayout()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import math
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+
+from bno055_usb_stick_py.bno055 import BNO055
+from bno055_usb_stick_py.bno055_usb_stick import BnoUsbStick
+from bno055_usb_stick_py.commands import is_stream_config, STREAM_INTERVAL_IDX, STREAM_WINDOW_START_IDX, \
+    STREAM_WINDOW_LEN_IDX
+from bno055_usb_stick_py.framing import START_BYTE, STOP_BYTES
+
+# command bytes of the stick protocol, see bno055.json
+I2C_TRANSACTION = 0x16
+I2C_WRITE = 0x01
+I2C_READ = 0x02
+BOARD_INFO = 0x1F
+STREAM_CONTROL = 0x06
+# response codes accepted by BnoUsbStick.check_packet
+READ_RESPONSE = 0x42
+WRITE_RESPONSE = 0x41
+# register values after power on reset
+RESET_VALUES = {0x00: 0xA0, 0x01: 0xFB, 0x02: 0x32, 0x03: 0x0F, 0x04: 0x11, 0x05: 0x03, 0x06: 0x15,
+                0x3B: 0x80, 0x41: 0x24}
+# streamed data: int16 a, m, g, euler, quaternion, lin_a, gravity, then temp
+STREAMING_DATA_STRUCT = struct.Struct('<22hb')
+
+
+class BnoEmulator:
+    """
+    Emulated BNO USB stick on a Linux pseudo-terminal.
+
+    Answers the protocol of bno055.json on `port_name`, so BnoUsbStick(port=emulator.port_name)
+    works unchanged: commands of the `start_streaming` sequence are acknowledged,
+    read_register, write_register, burst_read and board_information are answered
+    from a register model, and synthetic streaming frames (a stick rotating about
+    the vertical axis) are sent at the configured rate, optionally fragmented,
+    corrupted, or with bytes lost. With a `link` (like /dev/serial/by-id), the stick
+    can be unplugged and plugged in again on a new pseudo-terminal.
+    """
+
+    board_information = (0x0202, 0x0001, 0x0103, 0x01)
+    # maximal output kept back while the host does not read, further frames are lost
+    max_pending = 1 << 16
+
+    def __init__(self, rate_hz: float = None, fragment: int = 0, corrupt_rate: float = 0.,
+                 drop_rate: float = 0., seed: int = None, link: str = None):
+        """
+        :param rate_hz: streaming frame rate, if None the interval of the stream configuration command is used
+        :param fragment: if > 0, output is written in random chunks of 1 to `fragment` bytes
+        :param corrupt_rate: probability of a streaming frame to get one random byte flipped
+        :param drop_rate: probability of a streaming frame to lose one random byte
+        :param seed: seed of the random fault injection
+        :param link: path of a symlink to the pseudo-terminal, kept across `unplug` / `replug`
+        """
+        self.rate_hz = rate_hz
+        self.fragment = fragment
+        self.corrupt_rate = corrupt_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.registers = {0: bytearray(0x80), 1: bytearray(0x80)}
+        self.reset_registers()
+        self.window_start = 0x08
+        self.window_len = 0x30
+        self.interval_ms = 10
+        self.streaming = False
+        self.frames_sent = 0
+        self.commands_received = 0
+        self.bytes_lost = 0
+        self.link = link
+        self.open_pty()
+        self.commands = bytearray()
+        self.pending = bytearray()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def open_pty(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port_name = os.ttyname(self.slave)
+        if self.link is not None:
+            if os.path.lexists(self.link):
+                os.remove(self.link)
+            os.symlink(self.port_name, self.link)
+
+    def close_pty(self):
+        if self.link is not None and os.path.lexists(self.link):
+            os.remove(self.link)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def unplug(self):
+        """stick removed: the pseudo-terminal is closed (reads of the host fail) and the link is removed"""
+        self.stop()
+        self.close_pty()
+        self.commands.clear()
+        self.pending.clear()
+        self.streaming = False
+        self.reset_registers()
+
+    def replug(self):
+        """stick plugged in again, power on reset, on a new pseudo-terminal behind the same link"""
+        self.open_pty()
+        return self.start()
+
+    def reset_registers(self):
+        for page in self.registers.values():
+            page[:] = bytes(len(page))
+        for reg_addr, reg_value in RESET_VALUES.items():
+            self.registers[0][reg_addr] = reg_value
+        self.registers[1][0x07] = 1
+
+    @property
+    def page(self):
+        return self.registers[0][0x07]
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='BnoEmulator', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def close(self):
+        self.stop()
+        self.close_pty()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def connect(self) -> BnoUsbStick:
+        """BnoUsbStick connected to the emulator"""
+        return BnoUsbStick(port=self.link or self.port_name)
+
+    def run(self):
+        poller = select.poll()
+        next_frame = time.monotonic()
+        while not self.stopped.is_set():
+            period = 1. / self.rate_hz if self.rate_hz else self.interval_ms / 1000.
+            timeout = max(next_frame - time.monotonic(), 0.) if self.streaming else 0.05
+            poller.register(self.master, select.POLLIN | (select.POLLOUT if self.pending else 0))
+            events = poller.poll(min(timeout, 0.05) * 1000.)
+            if any(event & select.POLLIN for _, event in events):
+                self.commands += os.read(self.master, 4096)
+                self.handle_commands()
+            now = time.monotonic()
+            if not self.streaming:
+                next_frame = now
+            elif now >= next_frame:
+                num_frames = int((now - next_frame) / period) + 1
+                if num_frames * period > 0.1:
+                    # far behind (e.g. stalled host), do not send a burst of stale frames
+                    next_frame = now
+                    num_frames = 1
+                for _ in range(num_frames):
+                    self.output(self.faulty(self.streaming_frame(next_frame)))
+                    next_frame += period
+            self.flush()
+
+    def output(self, data: bytes):
+        if len(self.pending) + len(data) > self.max_pending:
+            self.bytes_lost += len(data)
+            return
+        self.pending += data
+
+    def flush(self):
+        """write pending output, in random fragments if configured"""
+        while self.pending:
+            size = len(self.pending)
+            if self.fragment > 0:
+                size = self.random.randint(1, min(self.fragment, size))
+            try:
+                written = os.write(self.master, self.pending[:size])
+            except BlockingIOError:
+                return
+            del self.pending[:written]
+
+    def faulty(self, frame: bytes) -> bytes:
+        if self.corrupt_rate and self.random.random() < self.corrupt_rate:
+            frame = bytearray(frame)
+            frame[self.random.randrange(len(frame))] ^= 1 << self.random.randrange(8)
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            idx = self.random.randrange(len(frame))
+            frame = frame[:idx] + frame[idx + 1:]
+        return bytes(frame)
+
+    def command_len(self, buf: bytearray) -> int:
+        """length of the first command in `buf`, 0 if it is incomplete"""
+        if len(buf) < 4:
+            return 0
+        if buf[3] == I2C_TRANSACTION:
+            if buf[2] == I2C_READ:
+                return 18 if len(buf) >= 18 else 0
+            if len(buf) < 19:
+                return 0
+            # burst read: stop bytes at 16 and a trailing zero; write: value at 16, stop bytes at 17
+            return 19
+        declared = buf[1]
+        if len(buf) >= declared >= 4 and buf[declared - 2:declared] == STOP_BYTES:
+            return declared
+        end = buf.find(STOP_BYTES, 2)
+        return 0 if end < 0 else end + 2
+
+    def handle_commands(self):
+        buf = self.commands
+        while buf:
+            start = buf.find(START_BYTE)
+            if start < 0:
+                buf.clear()
+                return
+            del buf[:start]
+            num_bytes = self.command_len(buf)
+            if num_bytes == 0:
+                return
+            command = bytes(buf[:num_bytes])
+            del buf[:num_bytes]
+            self.commands_received += 1
+            self.output(self.respond(command))
+
+    def respond(self, command: bytes) -> bytes:
+        if command[3] == I2C_TRANSACTION:
+            reg_addr = command[10]
+            if command[2] == I2C_READ:
+                return self.register_response(READ_RESPONSE, I2C_READ, reg_addr,
+                                              self.read(reg_addr, command[11] << 8 | command[12]))
+            if command[16:18] == STOP_BYTES:
+                return self.register_response(READ_RESPONSE, I2C_READ, reg_addr,
+                                              self.read(reg_addr, command[11] << 8 | command[12]))
+            self.write(reg_addr, command[16])
+            return self.register_response(WRITE_RESPONSE, I2C_WRITE, reg_addr, bytes([command[16]]))
+        if command[2] == I2C_READ and command[3] == BOARD_INFO:
+            return bytes([START_BYTE, 15, I2C_READ, 0, 0, BOARD_INFO]) + \
+                struct.pack('>3HB', *self.board_information) + STOP_BYTES
+        if is_stream_config(command):
+            self.interval_ms = max(int.from_bytes(command[STREAM_INTERVAL_IDX:STREAM_INTERVAL_IDX + 2], 'big'), 1)
+            self.window_start = command[STREAM_WINDOW_START_IDX]
+            self.window_len = command[STREAM_WINDOW_LEN_IDX]
+        elif command[2] == STREAM_CONTROL:
+            self.streaming = command[3] != 0
+        return bytes([START_BYTE, 6, command[2], 0]) + STOP_BYTES
+
+    def register_response(self, code: int, operation: int, reg_addr: int, data: bytes) -> bytes:
+        header = bytes([START_BYTE, 13 + len(data), operation, 0, code, 0, 1, reg_addr, 0,
+                        (len(data) >> 8) & 0xFF, len(data) & 0xFF])
+        return header + data + STOP_BYTES
+
+    def read(self, reg_addr: int, num_bytes: int) -> bytes:
+        registers = self.registers[self.page]
+        return bytes(registers[(reg_addr + idx) % len(registers)] for idx in range(num_bytes))
+
+    def write(self, reg_addr: int, reg_value: int):
+        if reg_addr == 0x07:
+            if reg_value in self.registers:
+                self.registers[0][0x07] = reg_value
+            return
+        if self.page == 0 and reg_addr == 0x3F and reg_value & BnoUsbStick.rst_sys_bit:
+            self.reset_registers()
+            return
+        if self.page == 0 and 0x55 <= reg_addr <= 0x6A and self.registers[0][0x3D] & 0x0F:
+            # calibration offsets and radii are only writable in CONFIG mode
+            return
+        self.registers[self.page][reg_addr] = reg_value
+
+    def streaming_frame(self, timestamp: float) -> bytes:
+        """streaming frame of the register window with synthetic data at time `timestamp`"""
+        self.update_data_registers(timestamp)
+        registers = self.registers[0]
+        data = registers[self.window_start:self.window_start + self.window_len + 1]
+        self.frames_sent += 1
+        return bytes([START_BYTE, len(data) + 7, STREAM_CONTROL, 0, 0]) + data + STOP_BYTES
+
+    def update_data_registers(self, timestamp: float):
+        """stick lying flat, rotating about the vertical axis at 36 deg/s"""
+        heading = math.radians(36. * timestamp) % (2 * math.pi)
+        rate = 36.
+        gravity = (0., 0., 9.81)
+        field = (25. * math.cos(heading), -25. * math.sin(heading), -40.)
+        quaternion = (math.cos(heading / 2), 0., 0., -math.sin(heading / 2))
+        raw = [round(val / BNO055.acceleration_resolution) for val in gravity] + \
+              [round(val / BNO055.magnetometer_resolution) for val in field] + \
+              [0, 0, round(rate / BNO055.gyroscope_resolution)] + \
+              [round(math.degrees(heading) / BNO055.euler_resolution), 0, 0] + \
+              [round(val / BNO055.quaternion_resolution) for val in quaternion] + \
+              [0, 0, 0] + \
+              [round(val / BNO055.gravity_resolution) for val in gravity] + [25]
+        STREAMING_DATA_STRUCT.pack_into(self.registers[0], 0x08, *raw)
+        # fully calibrated, self test passed
+        self.registers[0][0x35] = 0xFF
+        self.registers[0][0x36] = 0x0F
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+from typing import List
+
+START_BYTE = 0xAA
+STOP_BYTES = bytes([13, 10])
+STREAMING_FRAME_LEN = 0x38
+# third byte of a packet: 0x06 streaming (frames and stream control acknowledgements),
+# 0x01 / 0x02 register write / read responses
+STREAMING_PACKET_TYPE = 0x06
+
+
+def is_stream_frame(packet: bytes, frame_len: int) -> bool:
+    """
+    streaming frame of `frame_len` bytes, as opposed to a command response: a register
+    response can have the length of a frame of a channel subset, so the type byte decides
+    """
+    return len(packet) == frame_len and packet[2] == STREAMING_PACKET_TYPE
+
+
+class StreamFramer:
+    """
+    Incremental parser for fixed-length streaming frames.
+
+    Received chunks are appended to a reusable byte buffer, every complete
+    0xAA ... 0x0D 0x0A frame is cut out of it and an incomplete tail is kept
+    for the next `feed` call. On corruption the parser skips to the next
+    start byte and counts the bytes it had to throw away.
+    """
+
+    def __init__(self, frame_len: int = STREAMING_FRAME_LEN):
+        self.frame_len = frame_len
+        self.buffer = bytearray()
+        self.frames = 0
+        self.dropped_bytes = 0
+        self.resyncs = 0
+
+    def reset(self):
+        """forget a partially received frame, counters are kept"""
+        self.buffer.clear()
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """
+        Append `chunk` to the buffer and extract all complete frames.
+        :param chunk: bytes as received from the serial port
+        :return: list of complete frames (possibly empty), in arrival order
+        """
+        buf = self.buffer
+        buf += chunk
+        frame_len = self.frame_len
+        end = len(buf)
+        pos = 0
+        frames = []
+        with memoryview(buf) as view:
+            while end - pos >= frame_len:
+                stop = pos + frame_len
+                if buf[pos] == START_BYTE and buf[stop - 2] == 0x0D and buf[stop - 1] == 0x0A:
+                    frames.append(bytes(view[pos:stop]))
+                    pos = stop
+                    continue
+                # lost sync: skip to the next candidate start byte
+                next_start = buf.find(START_BYTE, pos + 1)
+                if next_start == -1:
+                    next_start = end
+                self.dropped_bytes += next_start - pos
+                self.resyncs += 1
+                pos = next_start
+        if pos:
+            del buf[:pos]
+        self.frames += len(frames)
+        return frames
+
+
+class PacketFramer:
+    """
+    Incremental parser for variable-length packets (command responses and
+    streaming frames) which carry their total length in the second byte:
+    0xAA, length, ..., 0x0D, 0x0A.
+    """
+
+    min_packet_len = 6
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.packets = 0
+        self.dropped_bytes = 0
+        self.resyncs = 0
+
+    def reset(self):
+        """forget a partially received packet, counters are kept"""
+        self.buffer.clear()
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """
+        Append `chunk` to the buffer and extract all complete packets.
+        :param chunk: bytes as received from the serial port
+        :return: list of complete packets (possibly empty), in arrival order
+        """
+        buf = self.buffer
+        buf += chunk
+        end = len(buf)
+        pos = 0
+        packets = []
+        with memoryview(buf) as view:
+            while end - pos >= 2:
+                packet_len = buf[pos + 1]
+                if buf[pos] == START_BYTE and packet_len >= self.min_packet_len:
+                    stop = pos + packet_len
+                    if stop > end:
+                        break
+                    if buf[stop - 2] == 0x0D and buf[stop - 1] == 0x0A:
+                        packets.append(bytes(view[pos:stop]))
+                        pos = stop
+                        continue
+                next_start = buf.find(START_BYTE, pos + 1)
+                if next_start == -1:
+                    next_start = end
+                self.dropped_bytes += next_start - pos
+                self.resyncs += 1
+                pos = next_start
+        if pos:
+            del buf[:pos]
+        self.packets += len(packets)
+        return packets
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import selectors
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from bno055_usb_stick_py.bno055 import BNO055Sample
+from bno055_usb_stick_py.bno055_usb_stick import BnoUsbStick, BnoException
+from bno055_usb_stick_py.hotplug import device_cache
+
+
+def detect_devices(serial_numbers: Iterable[str] = None) -> List[Tuple[str, str]]:
+    """
+    Find all connected BNO USB sticks.
+    :param serial_numbers: only return sticks with these serial numbers
+    :return: list of (device id, port name), device id is the serial number of
+    the stick if known, the port name otherwise
+    """
+    devices = []
+    if sys.platform == 'win32':
+        from serial.tools.list_ports import comports
+        for port in comports():
+            if port.vid == 5418 and port.pid == 32961:
+                devices.append((port.serial_number or port.name, port.name))
+    else:
+        devices = device_cache.list()
+    if serial_numbers is not None:
+        serial_numbers = set(serial_numbers)
+        devices = [(device_id, port_name) for device_id, port_name in devices if device_id in serial_numbers]
+    return sorted(devices)
+
+
+class BnoStickGroup:
+    """
+    Several BNO USB sticks read by a single selector loop.
+
+    All serial ports are multiplexed in one `selectors` loop in the calling
+    thread, the merged stream yields samples tagged with the device id,
+    optionally aligned across devices by host arrival time.
+    """
+
+    def __init__(self, ports: Dict[str, str] = None, serial_numbers: Iterable[str] = None):
+        """
+        :param ports: device id -> port name; if None, all connected sticks are detected
+        :param serial_numbers: when detecting, only open sticks with these serial numbers
+        """
+        if ports is None:
+            ports = dict(detect_devices(serial_numbers))
+        if not ports:
+            raise BnoException("BNO USB Stick not detected!")
+        self.sticks = {device_id: BnoUsbStick(port=port_name) for device_id, port_name in ports.items()}
+        self.selector = selectors.DefaultSelector()
+        for device_id, stick in self.sticks.items():
+            self.selector.register(stick.port, selectors.EVENT_READ, device_id)
+        self.unaligned = 0
+
+    def __len__(self):
+        return len(self.sticks)
+
+    def close(self):
+        self.selector.close()
+        for stick in self.sticks.values():
+            stick.disconnect()
+
+    def activate_streaming(self, **kwargs) -> Dict[str, float]:
+        """activate streaming on every stick, see BnoUsbStick.activate_streaming
+        :return: device id -> activation time"""
+        return {device_id: stick.activate_streaming(**kwargs) for device_id, stick in self.sticks.items()}
+
+    def deactivate_streaming(self):
+        for stick in self.sticks.values():
+            stick.deactivate_streaming()
+
+    def stats(self) -> Dict[str, dict]:
+        """device id -> metrics snapshot of the stick, see BnoUsbStick.stats"""
+        return {device_id: stick.stats() for device_id, stick in self.sticks.items()}
+
+    def stream(self, num_packets=-1, timeout=1.0):
+        """
+        Merged stream of all sticks.
+        :param num_packets: total number of packets to receive. If -1 (default), receive forever
+        :param timeout: raise BnoException if no stick sent anything for `timeout` seconds
+        :return: generator of (device id, BNO055Sample stamped with its host arrival time)
+        """
+        packets_received = 0
+        # frames received before streaming through the group, e.g. during activation
+        for device_id, stick in self.sticks.items():
+            while stick.frames and (num_packets == -1 or packets_received < num_packets):
+                frame, *timing = stick.frames.popleft()
+                yield device_id, BNO055Sample(stick.layout.unpack(frame), *timing)
+                packets_received += 1
+        while num_packets == -1 or packets_received < num_packets:
+            events = self.selector.select(timeout)
+            if not events:
+                raise BnoException("Receiving packet failed!")
+            timestamp_ns = time.monotonic_ns()
+            for key, _ in events:
+                stick = self.sticks[key.data]
+                chunk = stick.port.read(stick.buffer_size)
+                metrics = stick.metrics
+                metrics.read_calls += 1
+                metrics.bytes_read += len(chunk)
+                for frame, *timing in stick.timed_frames(stick.framer.feed(chunk), timestamp_ns,
+                                                         len(chunk) >= stick.buffer_size):
+                    metrics.frames_decoded += 1
+                    yield key.data, BNO055Sample(stick.layout.unpack(frame), *timing)
+                    packets_received += 1
+                    if packets_received == num_packets:
+                        return
+
+    def aligned_stream(self, tolerance_ns=5_000_000, num_frames=-1, timeout=1.0):
+        """
+        Stream of synchronized frames: one sample per stick, all arrived within `tolerance_ns`.
+        Samples which cannot be matched with the samples of the other sticks are
+        dropped and counted in self.unaligned.
+        :param tolerance_ns: maximal spread of the host arrival timestamps within a frame
+        :param num_frames: number of frames to produce. If -1 (default), forever
+        :param timeout: see `stream`
+        :return: generator of dicts device id -> BNO055Sample
+        """
+        pending = {device_id: deque() for device_id in self.sticks}
+        frames_produced = 0
+        for device_id, sample in self.stream(timeout=timeout):
+            if sample.timestamp_ns is None:
+                continue
+            pending[device_id].append(sample)
+            while all(pending.values()):
+                oldest = min(pending, key=lambda dev: pending[dev][0].timestamp_ns)
+                newest = max(pending, key=lambda dev: pending[dev][0].timestamp_ns)
+                spread = pending[newest][0].timestamp_ns - pending[oldest][0].timestamp_ns
+                if spread > tolerance_ns:
+                    pending[oldest].popleft()
+                    self.unaligned += 1
+                    continue
+                yield {dev: samples.popleft() for dev, samples in pending.items()}
+                frames_produced += 1
+                if frames_produced == num_frames:
+                    return
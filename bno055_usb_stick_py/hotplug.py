@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+BY_ID_DIR = '/dev/serial/by-id/'
+
+
+def by_id_path(device) -> Optional[str]:
+    """stable /dev/serial/by-id link of a pyudev tty device, None if udev did not create one"""
+    for link in (device.properties.get('DEVLINKS') or '').split():
+        if link.startswith(BY_ID_DIR):
+            return link
+    return None
+
+
+class DeviceCache:
+    """
+    Connected BNO USB sticks: serial number -> (by-id path, device node).
+
+    Filled by a single udev scan on first use and reused by every later lookup
+    as long as the cached device nodes exist. A running HotplugWatcher keeps
+    the cache up to date and wakes up threads waiting for a stick to come back.
+    """
+
+    def __init__(self, udev_config: Dict[str, str] = None):
+        """:param udev_config: udev properties of a stick, the `udev` section of bno055.json if None"""
+        self._udev_config = udev_config
+        self.devices = {}
+        self.scanned = False
+        self.watcher = None
+        self.cond = threading.Condition()
+
+    @property
+    def udev_config(self) -> Dict[str, str]:
+        if self._udev_config is None:
+            from bno055_usb_stick_py.bno055_usb_stick import BnoUsbStick
+            self._udev_config = BnoUsbStick.read_bno_json_config('bno055.json')['udev']
+        return self._udev_config
+
+    def matches(self, device) -> bool:
+        return all(device.properties.get(key) == val for key, val in self.udev_config.items())
+
+    @staticmethod
+    def entry(device) -> Tuple[str, Tuple[str, str]]:
+        """serial number (device node if unknown) -> (by-id path or device node, device node)"""
+        node = device.device_node
+        return device.properties.get('ID_SERIAL_SHORT') or node, (by_id_path(device) or node, node)
+
+    def scan(self) -> Dict[str, Tuple[str, str]]:
+        """enumerate the tty devices through udev (Linux only) and refill the cache"""
+        import pyudev
+        context = pyudev.Context()
+        devices = dict(self.entry(device) for device in context.list_devices(subsystem='tty')
+                       if self.matches(device))
+        with self.cond:
+            self.devices = devices
+            self.scanned = True
+            self.cond.notify_all()
+        return devices
+
+    def find(self, serial_number: str = None) -> Optional[Tuple[str, str, str]]:
+        """
+        Look up a stick, scanning only if the cache is empty or outdated.
+        :param serial_number: serial number of the stick, any stick if None
+        :return: (serial number, by-id path, device node) or None if not connected
+        """
+        for rescan in (False, True):
+            if rescan or not self.scanned:
+                self.scan()
+            with self.cond:
+                candidates = sorted(item for item in self.devices.items()
+                                    if serial_number is None or item[0] == serial_number)
+            for found_serial, (path, node) in candidates:
+                if os.path.exists(node):
+                    return found_serial, path, node
+            if self.watcher is not None and self.watcher.is_alive():
+                # the watcher keeps the cache up to date, no need to rescan
+                return None
+        return None
+
+    def identify(self, port: str) -> Optional[Tuple[str, str, str]]:
+        """(serial number, by-id path, device node) of the stick at `port` (by-id path or node), None if unknown"""
+        port = os.path.realpath(port)
+        for serial_number, _ in self.list():
+            with self.cond:
+                path, node = self.devices[serial_number]
+            if os.path.realpath(node) == port:
+                return serial_number, path, node
+        return None
+
+    def list(self) -> List[Tuple[str, str]]:
+        """(serial number, device node) of all connected sticks"""
+        if not self.scanned or not all(os.path.exists(node) for _, node in self.devices.values()):
+            self.scan()
+        with self.cond:
+            return sorted((serial_number, node) for serial_number, (_, node) in self.devices.items())
+
+    def wait_for(self, serial_number: Optional[str], path: str, timeout: float) -> Optional[str]:
+        """
+        Wait until a stick is connected.
+        :param serial_number: serial number of the stick, if None only `path` is watched
+        :param path: port path used so far, by-id path or device node
+        :param timeout: seconds
+        :return: port path to open, None on timeout
+        """
+        deadline = time.monotonic() + timeout
+        watched = self.watcher is not None and self.watcher.is_alive()
+        while True:
+            if serial_number is not None:
+                with self.cond:
+                    entry = self.devices.get(serial_number)
+                if entry is not None and os.path.exists(entry[1]):
+                    return entry[0]
+            elif os.path.exists(path):
+                return path
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if watched:
+                with self.cond:
+                    self.cond.wait(remaining)
+            else:
+                time.sleep(min(remaining, 0.1))
+                if serial_number is not None and sys.platform.startswith('linux'):
+                    self.scan()
+
+    def on_event(self, device):
+        """udev event of a tty device, see HotplugWatcher"""
+        if not self.matches(device):
+            return
+        serial_number, entry = self.entry(device)
+        with self.cond:
+            if device.action == 'remove':
+                self.devices.pop(serial_number, None)
+            elif device.action == 'add':
+                self.devices[serial_number] = entry
+            self.cond.notify_all()
+
+
+# sticks of this process, shared by autodetect, detect_devices and the reconnect logic
+device_cache = DeviceCache()
+
+
+class HotplugWatcher:
+    """
+    pyudev.Monitor on tty devices in a daemon thread: sticks plugged in or
+    removed update the DeviceCache, which wakes up waiting reconnects.
+    """
+
+    def __init__(self, cache: DeviceCache = device_cache, callback=None):
+        """
+        :param cache: cache to keep up to date
+        :param callback: optional function (action, serial number, port path) called for every stick event
+        """
+        import pyudev
+        self.cache = cache
+        self.callback = callback
+        monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+        monitor.filter_by(subsystem='tty')
+        self.observer = pyudev.MonitorObserver(monitor, callback=self.on_event, name='bno-hotplug')
+
+    def on_event(self, device):
+        self.cache.on_event(device)
+        if self.callback is not None and self.cache.matches(device):
+            serial_number, (path, _) = self.cache.entry(device)
+            self.callback(device.action, serial_number, path)
+
+    def is_alive(self) -> bool:
+        return self.observer.is_alive()
+
+    def start(self):
+        self.observer.start()
+        self.cache.watcher = self
+        if not self.cache.scanned:
+            self.cache.scan()
+        return self
+
+    def stop(self):
+        if self.cache.watcher is self:
+            self.cache.watcher = None
+        self.observer.stop()
+
+
+_watcher_lock = threading.Lock()
+
+
+def start_hotplug_watcher() -> Optional[HotplugWatcher]:
+    """process wide watcher of `device_cache`, started once; None where udev is not available"""
+    with _watcher_lock:
+        if device_cache.watcher is None:
+            try:
+                HotplugWatcher().start()
+            except (ImportError, OSError):
+                return None
+        return device_cache.watcher
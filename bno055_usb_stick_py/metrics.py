@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import os
+import threading
+from typing import Dict, Iterable
+
+# histogram buckets are powers of two nanoseconds: < 1.024 us, < 2.048 us, ... < 1.07 s, +Inf
+MIN_BUCKET_BITS = 10
+NUM_BUCKETS = 21
+
+
+class Histogram:
+    """
+    Latency histogram with power-of-two buckets, `observe` is a bit_length
+    and two additions, cheap enough for every frame.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (NUM_BUCKETS + 1)
+        self.count = 0
+        self.sum_ns = 0
+
+    @staticmethod
+    def bounds_ns():
+        return [1 << (MIN_BUCKET_BITS + idx) for idx in range(NUM_BUCKETS)]
+
+    def observe(self, value_ns: int):
+        idx = value_ns.bit_length() - MIN_BUCKET_BITS
+        self.counts[0 if idx < 0 else (idx if idx < NUM_BUCKETS else NUM_BUCKETS)] += 1
+        self.count += 1
+        self.sum_ns += value_ns
+
+    def quantile(self, q: float) -> float:
+        """upper bound of the bucket holding quantile `q`, nanoseconds (inf if beyond the last bucket)"""
+        if self.count == 0:
+            return 0.
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds_ns(), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return float(bound)
+        return float('inf')
+
+    def snapshot(self) -> Dict:
+        return {'count': self.count, 'sum_ns': self.sum_ns,
+                'mean_ns': self.sum_ns / self.count if self.count else 0.,
+                'p50_ns': self.quantile(0.5), 'p99_ns': self.quantile(0.99),
+                'buckets': list(self.counts)}
+
+
+class StickMetrics:
+    """
+    Hot-path counters and latency histograms of one stick.
+
+    Counters are plain integers updated without locks: readers may see a
+    snapshot which is a few increments old, but nothing is ever lost on
+    CPython, since every counter is only updated by the thread which owns
+    the port at that time.
+    """
+
+    counter_help = {
+        'read_calls': 'Read syscalls on the serial port',
+        'bytes_read': 'Bytes read from the serial port',
+        'frames_received': 'Streaming frames cut out of the received bytes',
+        'frames_decoded': 'Streaming frames decoded into samples',
+        'frames_dropped': 'Decoded samples dropped by full sample queues (slow consumer)',
+        'commands': 'Command round trips',
+        'reconnects': 'Automatic reconnects after the stick dropped off USB',
+        'resyncs': 'Framer resynchronizations on corrupted data (bad frames)',
+        'dropped_bytes': 'Bytes thrown away by the framer while resynchronizing',
+    }
+    histogram_help = {
+        'recv': 'Duration of recv calls',
+        'decode': 'Decoding time of a streaming frame',
+        'command': 'Command round trip time',
+        'interarrival': 'Time between arrivals of consecutive streaming frames',
+    }
+
+    def __init__(self):
+        self.read_calls = 0
+        self.bytes_read = 0
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.commands = 0
+        self.reconnects = 0
+        self.recv = Histogram()
+        self.decode = Histogram()
+        self.command = Histogram()
+        self.interarrival = Histogram()
+        # smoothed mean deviation of the inter-arrival time, as RFC 3550 interarrival jitter
+        self.jitter_ns = 0.
+        self.last_arrival_ns = None
+        self.last_interarrival_ns = None
+
+    def frames_arrived(self, num_frames: int, timestamp_ns: int):
+        """`num_frames` streaming frames arrived in a chunk received at `timestamp_ns`"""
+        if num_frames == 0:
+            return
+        self.frames_received += num_frames
+        if self.last_arrival_ns is not None:
+            interarrival = timestamp_ns - self.last_arrival_ns
+            self.interarrival.observe(interarrival)
+            if self.last_interarrival_ns is not None:
+                self.jitter_ns += (abs(interarrival - self.last_interarrival_ns) - self.jitter_ns) / 16.
+            self.last_interarrival_ns = interarrival
+        # frames of the same chunk arrived together
+        for _ in range(num_frames - 1):
+            self.interarrival.observe(0)
+        self.last_arrival_ns = timestamp_ns
+
+    def snapshot(self, framer=None, queue_overruns: int = 0) -> Dict:
+        """
+        :param framer: StreamFramer of the stick, its resync counters are included
+        :param queue_overruns: samples dropped by a running reader, not yet added to frames_dropped
+        :return: dict of all counters and histogram summaries
+        """
+        stats = {
+            'read_calls': self.read_calls,
+            'bytes_read': self.bytes_read,
+            'frames_received': self.frames_received,
+            'frames_decoded': self.frames_decoded,
+            'frames_dropped': self.frames_dropped + queue_overruns,
+            'commands': self.commands,
+            'reconnects': self.reconnects,
+            'resyncs': framer.resyncs if framer is not None else 0,
+            'dropped_bytes': framer.dropped_bytes if framer is not None else 0,
+            'jitter_ns': self.jitter_ns,
+        }
+        for name in self.histogram_help:
+            stats[name] = getattr(self, name).snapshot()
+        return stats
+
+
+def prometheus_text(snapshots: Dict[str, Dict], prefix='bno055') -> str:
+    """
+    Prometheus text exposition of stats snapshots.
+    :param snapshots: port name -> StickMetrics snapshot, the port becomes the `port` label
+    """
+    lines = []
+    for name, help_text in StickMetrics.counter_help.items():
+        lines.append(f"# HELP {prefix}_{name}_total {help_text}")
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for port, stats in snapshots.items():
+            lines.append(f'{prefix}_{name}_total{{port="{port}"}} {stats[name]}')
+    lines.append(f"# HELP {prefix}_jitter_seconds Smoothed inter-arrival jitter of streaming frames")
+    lines.append(f"# TYPE {prefix}_jitter_seconds gauge")
+    for port, stats in snapshots.items():
+        lines.append(f'{prefix}_jitter_seconds{{port="{port}"}} {stats["jitter_ns"] / 1e9}')
+    bounds = Histogram.bounds_ns()
+    for name, help_text in StickMetrics.histogram_help.items():
+        lines.append(f"# HELP {prefix}_{name}_seconds {help_text}")
+        lines.append(f"# TYPE {prefix}_{name}_seconds histogram")
+        for port, stats in snapshots.items():
+            histogram = stats[name]
+            cumulative = 0
+            for bound, count in zip(bounds + [None], histogram['buckets']):
+                cumulative += count
+                le = '+Inf' if bound is None else repr(bound / 1e9)
+                lines.append(f'{prefix}_{name}_seconds_bucket{{port="{port}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_{name}_seconds_sum{{port="{port}"}} {histogram["sum_ns"] / 1e9}')
+            lines.append(f'{prefix}_{name}_seconds_count{{port="{port}"}} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def sticks_text(sticks: Iterable) -> str:
+    """Prometheus text of BnoUsbStick objects"""
+    return prometheus_text({stick.port_name: stick.stats() for stick in sticks})
+
+
+def write_metrics_file(path: str, sticks: Iterable):
+    """
+    Write the Prometheus text of `sticks` to `path` atomically,
+    e.g. for the textfile collector of node_exporter.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(sticks_text(sticks))
+    os.replace(tmp_path, path)
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint serving the Prometheus text of the sticks at /metrics,
+    from a daemon thread.
+    """
+
+    def __init__(self, sticks: Iterable, port: int = 9105, host: str = '127.0.0.1'):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        sticks = list(sticks)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = sticks_text(sticks).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='bno-metrics', daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
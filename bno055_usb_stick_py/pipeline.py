@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+"""
+Vectorized processing of streamed samples, block by block.
+
+Every stage is a generator over blocks (numpy structured arrays with
+SAMPLE_DTYPE, see `BnoUsbStick.recv_streaming_blocks`) and yields blocks,
+adding fields where it computes new values. Stages keep their state across
+block boundaries, so the result does not depend on the block size. Chain them
+directly or through Pipeline:
+
+    blocks = Pipeline.from_stick(bno_usb_stick, block_size=100) \\
+        .calibrated(sys=3).normalized().euler().decimate(4).rolling(25, fields=('lin_a',))
+    for block in blocks:
+        print(block['euler_q'][-1], block['lin_a_rms'][-1])
+"""
+
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+STANDARD_GRAVITY = 9.80665
+# fields filtered by `decimate`, orientation (euler, quaternion) is sampled, not averaged
+FILTERED_FIELDS = ('a', 'm', 'g', 'lin_a', 'gravity')
+# calib_stat: 2 bit calibration levels of system, gyroscope, accelerometer and magnetometer
+CALIB_SHIFTS = {'sys': 6, 'gyr': 4, 'acc': 2, 'mag': 0}
+
+
+def with_fields(block: np.ndarray, fields) -> np.ndarray:
+    """
+    copy of `block` with additional fields
+    :param fields: list of (name, dtype, shape)
+    """
+    dtype = np.dtype(block.dtype.descr + [field for field in fields if field[0] not in block.dtype.names])
+    out = np.empty(len(block), dtype=dtype)
+    for name in block.dtype.names:
+        out[name] = block[name]
+    return out
+
+
+def lowpass_taps(factor: int, num_taps: int = None) -> np.ndarray:
+    """
+    linear phase FIR low-pass for decimation by `factor`: Hamming windowed sinc,
+    cutoff at the new Nyquist frequency, unity gain at DC
+    :param num_taps: odd number of taps, 8 * factor + 1 if None
+    """
+    num_taps = num_taps or 8 * factor + 1
+    if num_taps % 2 == 0:
+        raise ValueError(f"Expected an odd number of taps, got {num_taps}")
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = np.sinc(n / factor) * np.hamming(num_taps)
+    return taps / taps.sum()
+
+
+def calibrated(blocks: Iterable[np.ndarray], sys=0, gyr=0, acc=0, mag=0) -> Iterator[np.ndarray]:
+    """
+    Pass only samples whose calibration status reaches the given levels (0..3), empty blocks are dropped.
+    """
+    for block in blocks:
+        calib_stat = block['calib_stat']
+        mask = np.ones(len(block), dtype=bool)
+        for name, level in (('sys', sys), ('gyr', gyr), ('acc', acc), ('mag', mag)):
+            if level:
+                mask &= ((calib_stat >> CALIB_SHIFTS[name]) & 3) >= level
+        if mask.all():
+            yield block
+        elif mask.any():
+            yield block[mask]
+
+
+def normalized(blocks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+    """
+    Normalize `quaternion` to unit length with w >= 0 (q and -q are the same rotation),
+    all-zero quaternions (fusion not running) become the identity.
+    """
+    for block in blocks:
+        block = block.copy()
+        q = block['quaternion'].astype(np.float64)
+        norm = np.linalg.norm(q, axis=1, keepdims=True)
+        q = np.where(norm > 0, q / np.where(norm > 0, norm, 1.), [1., 0., 0., 0.])
+        q *= np.where(q[:, :1] < 0, -1., 1.)
+        block['quaternion'] = q
+        yield block
+
+
+def quaternion_to_euler(q: np.ndarray) -> np.ndarray:
+    """
+    :param q: (N, 4) unit quaternions w, x, y, z
+    :return: (N, 3) heading (clockwise, 0..360), roll and pitch in degrees, like the `euler` channel
+    """
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    roll = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    pitch = np.arcsin(np.clip(2 * (w * y - z * x), -1., 1.))
+    yaw = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return np.degrees(np.stack([np.mod(-yaw, 2 * np.pi), roll, pitch], axis=1))
+
+
+def quaternion_to_matrix(q: np.ndarray) -> np.ndarray:
+    """
+    :param q: (N, 4) unit quaternions w, x, y, z
+    :return: (N, 3, 3) rotation matrices from the sensor frame to the world frame
+    """
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    return np.stack([
+        1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y),
+        2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x),
+        2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y),
+    ], axis=1).reshape(-1, 3, 3)
+
+
+def euler(blocks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+    """
+    Add `euler_q`: heading, roll, pitch in degrees computed from the quaternion,
+    without the wrapping and gimbal lock artifacts of the device's euler output.
+    """
+    for block in blocks:
+        out = with_fields(block, [('euler_q', '<f4', (3,))])
+        out['euler_q'] = quaternion_to_euler(block['quaternion'].astype(np.float64))
+        yield out
+
+
+def rotation(blocks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+    """Add `rotation`: sensor to world rotation matrix of the quaternion"""
+    for block in blocks:
+        out = with_fields(block, [('rotation', '<f4', (3, 3))])
+        out['rotation'] = quaternion_to_matrix(block['quaternion'].astype(np.float64))
+        yield out
+
+
+def remove_gravity(blocks: Iterable[np.ndarray], world=False, gravity=STANDARD_GRAVITY) -> Iterator[np.ndarray]:
+    """
+    Add `lin_acc`: acceleration `a` without gravity, which is rotated into the sensor frame
+    by the quaternion (the stick's `lin_a` is computed on the device at a lower rate).
+    :param world: express `lin_acc` in the world frame instead of the sensor frame
+    :param gravity: magnitude of gravity, m/s^2
+    """
+    for block in blocks:
+        out = with_fields(block, [('lin_acc', '<f4', (3,))])
+        matrix = quaternion_to_matrix(block['quaternion'].astype(np.float64))
+        a = block['a'].astype(np.float64)
+        if world:
+            lin_acc = np.einsum('nij,nj->ni', matrix, a) - [0., 0., gravity]
+        else:
+            # world z axis in the sensor frame: last row of the sensor to world matrix
+            lin_acc = a - gravity * matrix[:, 2, :]
+        out['lin_acc'] = lin_acc
+        yield out
+
+
+def decimate(blocks: Iterable[np.ndarray], factor: int, num_taps: int = None,
+             fields: Sequence[str] = FILTERED_FIELDS) -> Iterator[np.ndarray]:
+    """
+    Keep every `factor`-th sample, the vector `fields` are low-pass filtered first (see `lowpass_taps`).
+    Output samples are aligned with the filter delay: timestamps, status and orientation
+    are those of the sample at the center of the filter.
+    """
+    taps = lowpass_taps(factor, num_taps)
+    num_taps = len(taps)
+    delay = (num_taps - 1) // 2
+    reversed_taps = taps[::-1].copy()
+    history = None
+    # index of the next output sample in history + block
+    next_idx = num_taps - 1
+    for block in blocks:
+        samples = block if history is None else np.concatenate([history, block])
+        positions = np.arange(next_idx, len(samples), factor)
+        if len(positions):
+            out = samples[positions - delay]
+            for name in fields:
+                if name not in samples.dtype.names:
+                    continue
+                column = samples[name].reshape(len(samples), -1).astype(np.float64)
+                windows = sliding_window_view(column, num_taps, axis=0)
+                out[name] = (windows[positions - num_taps + 1] @ reversed_taps).reshape(out[name].shape)
+            yield out
+            next_idx = positions[-1] + factor
+        keep = min(num_taps - 1, len(samples))
+        history = samples[len(samples) - keep:]
+        next_idx -= len(samples) - keep
+
+
+def rolling(blocks: Iterable[np.ndarray], window: int, fields: Sequence[str] = ('a', 'g', 'lin_a')
+            ) -> Iterator[np.ndarray]:
+    """
+    Add `<field>_mean` and `<field>_rms` of every field: mean and RMS over the last `window`
+    samples (fewer at the start of the stream), per axis.
+    """
+    tails = {}
+    for block in blocks:
+        names = [name for name in fields if name in block.dtype.names]
+        out = with_fields(block, [(f"{name}{suffix}", '<f4', block.dtype[name].shape)
+                                  for name in names for suffix in ('_mean', '_rms')])
+        for name in names:
+            values = block[name].reshape(len(block), -1).astype(np.float64)
+            tail = tails.get(name, values[:0])
+            samples = np.concatenate([tail, values])
+            zero = np.zeros((1, samples.shape[1]))
+            sums = np.concatenate([zero, np.cumsum(samples, axis=0)])
+            squares = np.concatenate([zero, np.cumsum(samples * samples, axis=0)])
+            end = np.arange(len(tail) + 1, len(samples) + 1)
+            start = np.maximum(end - window, 0)
+            count = (end - start)[:, None]
+            shape = out[f"{name}_mean"].shape
+            out[f"{name}_mean"] = ((sums[end] - sums[start]) / count).reshape(shape)
+            out[f"{name}_rms"] = np.sqrt(np.maximum(squares[end] - squares[start], 0.) / count).reshape(shape)
+            tails[name] = samples[len(samples) - min(window - 1, len(samples)):]
+        yield out
+
+
+class Pipeline:
+    """chain of processing stages over a stream of blocks, evaluated lazily when iterated"""
+
+    def __init__(self, blocks: Iterable[np.ndarray]):
+        self.blocks = blocks
+
+    @classmethod
+    def from_stick(cls, bno_usb_stick, block_size: int = 100, num_blocks=-1) -> 'Pipeline':
+        """blocks of `bno_usb_stick.recv_streaming_blocks`, streaming must be activated"""
+        return cls(bno_usb_stick.recv_streaming_blocks(block_size, num_blocks))
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self.blocks)
+
+    def then(self, stage, *args, **kwargs) -> 'Pipeline':
+        """append a stage: function (blocks, *args, **kwargs) -> generator of blocks"""
+        return Pipeline(stage(self.blocks, *args, **kwargs))
+
+    def calibrated(self, sys=0, gyr=0, acc=0, mag=0) -> 'Pipeline':
+        return self.then(calibrated, sys, gyr, acc, mag)
+
+    def normalized(self) -> 'Pipeline':
+        return self.then(normalized)
+
+    def euler(self) -> 'Pipeline':
+        return self.then(euler)
+
+    def rotation(self) -> 'Pipeline':
+        return self.then(rotation)
+
+    def remove_gravity(self, world=False, gravity=STANDARD_GRAVITY) -> 'Pipeline':
+        return self.then(remove_gravity, world, gravity)
+
+    def decimate(self, factor: int, num_taps: int = None, fields: Sequence[str] = FILTERED_FIELDS) -> 'Pipeline':
+        return self.then(decimate, factor, num_taps, fields)
+
+    def rolling(self, window: int, fields: Sequence[str] = ('a', 'g', 'lin_a')) -> 'Pipeline':
+        return self.then(rolling, window, fields)
+
+    def samples(self) -> Iterator[np.void]:
+        """the processed samples one by one"""
+        for block in self.blocks:
+            yield from block
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import struct
+import time
+from typing import Dict, Iterator
+
+from bno055_usb_stick_py.bno055 import BNO055Sample
+from bno055_usb_stick_py.bno055_usb_stick import BnoException
+from bno055_usb_stick_py.decoding import BURST_READ_DATA_OFFSET
+from bno055_usb_stick_py.framing import START_BYTE, STOP_BYTES
+from bno055_usb_stick_py.stats import percentiles
+
+# data block of a polled sample: ACCEL_DATA_X_LSB (0x08) .. SYS_STATUS (0x39)
+POLL_START = 0x08
+POLL_LEN = 0x39 - POLL_START + 1
+# the streamed values (see decoding.STREAMING_STRUCT), followed by sys_status
+POLL_STRUCT = struct.Struct('<22hb5B')
+POLL_RESPONSE_LEN = BURST_READ_DATA_OFFSET + POLL_LEN + len(STOP_BYTES)
+
+
+class SamplePoller:
+    """
+    Polled acquisition: the newest sample on request instead of a free-running stream.
+
+    Every sample is one burst read of the data registers 0x08..0x39, the command
+    is built once and the response of known length is read with `read_exactly`
+    and decoded with a single struct unpack into a BNO055Sample. At most one
+    request is in flight: `request` sends it, `receive` waits for its response,
+    so a control loop can send the next request before it processes the current
+    sample. The poller needs the port for itself, streaming must be deactivated.
+    The bus lock of the stick is held from `request` to `receive`: commands of other
+    threads wait while a request is in flight, both must be called by the same thread.
+    """
+
+    def __init__(self, bno_usb_stick, timeout: float = 0.1):
+        """:param timeout: maximal round trip of a request, seconds"""
+        if bno_usb_stick.streaming:
+            raise BnoException("Polling requires streaming to be deactivated!")
+        self.bno_usb_stick = bno_usb_stick
+        self.timeout = timeout
+        self.command = bno_usb_stick.commands['burst_read'].build(start_reg_addr=POLL_START,
+                                                                  num_bytes_msb=(POLL_LEN >> 8) & 0xFF,
+                                                                  num_bytes_lsb=POLL_LEN & 0xFF)
+        # time.monotonic_ns() when the request in flight was sent, None if there is none
+        self.sent_ns = None
+        self.failures = 0
+
+    @property
+    def in_flight(self) -> bool:
+        return self.sent_ns is not None
+
+    def request(self):
+        """send a poll request, its response is collected by `receive`"""
+        if self.sent_ns is not None:
+            raise BnoException("A poll request is already in flight!")
+        stick = self.bno_usb_stick
+        stick.check_port_access()
+        # released by `receive`
+        stick.lock.acquire()
+        try:
+            if stick.port.write(self.command) != len(self.command):
+                raise BnoException("Sending packet failed!")
+        except BaseException:
+            stick.lock.release()
+            raise
+        self.sent_ns = time.monotonic_ns()
+
+    def receive(self) -> BNO055Sample:
+        """
+        wait for the response of the request in flight
+        :return: BNO055Sample stamped with its arrival time, its sample time is the middle of the round trip
+        :raises: BnoException if the response is late or invalid, pending bytes are discarded
+        """
+        if self.sent_ns is None:
+            raise BnoException("No poll request in flight!")
+        sent_ns, self.sent_ns = self.sent_ns, None
+        stick = self.bno_usb_stick
+        try:
+            ok, response = stick.read_exactly(POLL_RESPONSE_LEN, self.timeout)
+            arrival_ns = time.monotonic_ns()
+            stick.metrics.commands += 1
+            stick.metrics.command.observe(arrival_ns - sent_ns)
+            if not ok or response[0] != START_BYTE or response[-2:] != STOP_BYTES or \
+                    response[3] not in (0, 2) or response[7] != POLL_START:
+                self.resync()
+                raise BnoException(f"Invalid poll response, expected {POLL_RESPONSE_LEN} bytes, "
+                                   f"got {len(response)}")
+        finally:
+            stick.lock.release()
+        return BNO055Sample(POLL_STRUCT.unpack_from(response, BURST_READ_DATA_OFFSET),
+                            arrival_ns, (sent_ns + arrival_ns) // 2)
+
+    def resync(self):
+        """throw away the remains of a broken response"""
+        self.failures += 1
+        while self.bno_usb_stick.read_available(0.01):
+            pass
+
+    def poll(self) -> BNO055Sample:
+        """one round trip: the newest sample"""
+        self.request()
+        return self.receive()
+
+    def cancel(self):
+        """collect and discard the response of the request in flight, if any"""
+        if self.sent_ns is not None:
+            try:
+                self.receive()
+            except BnoException:
+                pass
+
+    def samples(self, num_samples=-1) -> Iterator[BNO055Sample]:
+        """
+        Poll back to back: the next request is sent before a sample is yielded,
+        so its round trip overlaps with the processing of the sample.
+        :param num_samples: number of samples, if -1 (default), forever
+        """
+        received = 0
+        try:
+            if num_samples != 0 and self.sent_ns is None:
+                self.request()
+            while num_samples == -1 or received < num_samples:
+                sample = self.receive()
+                received += 1
+                if num_samples == -1 or received < num_samples:
+                    self.request()
+                yield sample
+        finally:
+            self.cancel()
+
+    def __iter__(self) -> Iterator[BNO055Sample]:
+        return self.samples()
+
+    def latency_probe(self, num_polls=1000) -> Dict:
+        """
+        Round trip time of `num_polls` polls and the poll rates it allows.
+        :return: round_trip_us percentiles, mean_rate_hz (back to back polling) and
+        p99_rate_hz (the rate at which 99% of the polls complete within their period)
+        """
+        round_trips = []
+        for _ in range(num_polls):
+            t_start = time.perf_counter_ns()
+            self.poll()
+            round_trips.append((time.perf_counter_ns() - t_start) / 1e3)
+        round_trip_us = percentiles(round_trips)
+        return {'round_trip_us': round_trip_us,
+                'mean_rate_hz': num_polls / sum(round_trips) * 1e6,
+                'p99_rate_hz': 1e6 / round_trip_us['p99']}
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import threading
+import time
+from collections import deque
+
+from bno055_usb_stick_py.bno055 import BNO055Sample
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+BLOCK = 'block'
+OVERRUN_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class SampleQueue:
+    """
+    Bounded FIFO of samples shared between the reader thread and consumers.
+
+    When the queue is full, `policy` decides what happens to a new sample:
+    DROP_OLDEST discards the oldest queued sample, DROP_NEWEST discards the new
+    one and BLOCK makes the producer wait until a consumer makes room.
+    """
+
+    def __init__(self, maxsize: int = 1024, policy: str = DROP_OLDEST):
+        if policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy {policy}, expected one of {OVERRUN_POLICIES}")
+        if maxsize < 1:
+            raise ValueError("Queue size must be positive")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.samples = deque()
+        self.latest = None
+        self.closed = False
+        self.put_count = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.blocked = 0
+        self._cond = threading.Condition()
+
+    @property
+    def overruns(self) -> int:
+        """number of samples lost because the queue was full"""
+        return self.dropped_oldest + self.dropped_newest
+
+    def __len__(self):
+        return len(self.samples)
+
+    def put(self, sample) -> bool:
+        """
+        Enqueue `sample` according to the overrun policy.
+        :return: False if the sample was dropped or the queue is closed
+        """
+        with self._cond:
+            self.latest = sample
+            if len(self.samples) >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    self.samples.popleft()
+                    self.dropped_oldest += 1
+                elif self.policy == DROP_NEWEST:
+                    self.dropped_newest += 1
+                    return False
+                else:
+                    self.blocked += 1
+                    while len(self.samples) >= self.maxsize and not self.closed:
+                        self._cond.wait(0.1)
+            if self.closed:
+                return False
+            self.samples.append(sample)
+            self.put_count += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Dequeue the oldest sample, waiting up to `timeout` seconds (forever if None).
+        :return: sample, or None on timeout / when the queue is closed and empty
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.samples or self.closed, timeout):
+                return None
+            if not self.samples:
+                return None
+            sample = self.samples.popleft()
+            self._cond.notify_all()
+            return sample
+
+    def get_latest(self):
+        """most recently received sample (or None), does not consume the queue"""
+        return self.latest
+
+    def close(self):
+        """wake up all waiting producers and consumers, further puts are rejected"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            'queued': len(self.samples),
+            'put_count': self.put_count,
+            'overruns': self.overruns,
+            'dropped_oldest': self.dropped_oldest,
+            'dropped_newest': self.dropped_newest,
+            'blocked': self.blocked,
+        }
+
+
+class StreamReader(threading.Thread):
+    """
+    Reader thread draining the serial port of a BnoUsbStick.
+
+    Received chunks are framed and decoded in the thread, every sample is
+    stamped with `time.monotonic_ns()` of the chunk it arrived in, timed by
+    the timing engine of the stick and pushed into a SampleQueue.
+    """
+
+    def __init__(self, bno_usb_stick, maxsize: int = 1024, policy: str = DROP_OLDEST):
+        super().__init__(name=f"bno-reader-{bno_usb_stick.port_name}", daemon=True)
+        self.bno_usb_stick = bno_usb_stick
+        self.queue = SampleQueue(maxsize, policy)
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        stick = self.bno_usb_stick
+        framer = stick.framer
+        queue = self.queue
+        metrics = stick.metrics
+        unpack = stick.layout.unpack
+
+        def drain_frames():
+            # frames received outside of the loop: by the consumer thread, or while reconnecting
+            while stick.frames:
+                frame, *timing = stick.frames.popleft()
+                queue.put(BNO055Sample(unpack(frame), *timing))
+                metrics.frames_decoded += 1
+
+        try:
+            drain_frames()
+            while not self._stop_event.is_set():
+                try:
+                    ok, chunk = stick.recv()
+                except OSError as e:
+                    stick.reconnect(e)
+                    drain_frames()
+                    continue
+                if not ok:
+                    continue
+                timestamp_ns = time.monotonic_ns()
+                for frame, *timing in stick.timed_frames(framer.feed(chunk), timestamp_ns,
+                                                         len(chunk) >= stick.buffer_size):
+                    t_start = time.perf_counter_ns()
+                    sample = BNO055Sample(unpack(frame), *timing)
+                    metrics.decode.observe(time.perf_counter_ns() - t_start)
+                    metrics.frames_decoded += 1
+                    queue.put(sample)
+        except Exception as e:
+            self.error = e
+        finally:
+            queue.close()
+
+    def stop(self, timeout=1.0):
+        """ask the thread to finish and wait for it"""
+        self._stop_event.set()
+        self.queue.close()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def get_latest(self):
+        return self.queue.get_latest()
+
+    def __iter__(self):
+        """blocking iterator over queued samples, ends when the reader stops"""
+        while True:
+            sample = self.queue.get()
+            if sample is None:
+                break
+            yield sample
+        if self.error is not None:
+            raise self.error
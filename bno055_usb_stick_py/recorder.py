@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import bisect
+import mmap
+import os
+import struct
+import time
+
+from bno055_usb_stick_py.bno055 import BNO055Sample
+from bno055_usb_stick_py.bno055_usb_stick import BnoException
+from bno055_usb_stick_py.decoding import DEFAULT_LAYOUT, StreamLayout
+
+# recording file: header, then fixed-size records (timestamp_ns, raw streaming frame)
+MAGIC = b'BNO055RC'
+VERSION = 1
+# magic, version, frame length, register window start and length (zero: default window)
+HEADER = struct.Struct('<8sHHBB2x')
+TIMESTAMP = struct.Struct('<q')
+# seek index file (<recording>.idx): (timestamp_ns, record number) every `index_interval` records
+INDEX_ENTRY = struct.Struct('<qQ')
+
+
+def index_path(path: str) -> str:
+    return path + '.idx'
+
+
+def header_layout(path: str, window_start: int, window_len: int) -> StreamLayout:
+    """stream layout of the register window stored in the header of recording `path`"""
+    if not window_start:
+        return DEFAULT_LAYOUT
+    try:
+        return StreamLayout.from_window(window_start, window_len)
+    except ValueError as e:
+        raise BnoException(f"{path}: {e}")
+
+
+class StreamRecorder:
+    """
+    Append-only recorder of raw streaming frames with host timestamps.
+
+    Every frame is stored as it was received (0x38 bytes for the default
+    layout) together with its `time.monotonic_ns()` timestamp in fixed-size
+    records, the stream layout is kept in the file header. Every
+    `index_interval` records an entry is appended to the seek index file,
+    so replay can seek by time without scanning the recording.
+    An existing recording is continued.
+    """
+
+    def __init__(self, path: str, layout: StreamLayout = DEFAULT_LAYOUT, index_interval: int = 1000):
+        """
+        :param layout: stream layout of the recorded frames, `bno_usb_stick.layout`
+        """
+        self.path = path
+        self.layout = layout
+        self.frame_len = layout.frame_len
+        self.record_size = TIMESTAMP.size + self.frame_len
+        self.index_interval = index_interval
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, self.frame_len, layout.window_start, layout.window_len))
+            self.num_records = 0
+        else:
+            with open(path, 'rb') as f:
+                magic, version, frame_len, window_start, window_len = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise BnoException(f"{path} is not a BNO055 recording")
+            # layouts of different channels may have the same frame length, e.g. ['a'] and ['m']
+            recorded_layout = header_layout(path, window_start, window_len)
+            if frame_len != self.frame_len or recorded_layout != layout:
+                raise BnoException(f"{path} is a recording of {recorded_layout}, not of {layout}")
+            self.num_records = (self.file.tell() - HEADER.size) // self.record_size
+            # drop a partial trailing record (e.g. a crash mid-write), later records would be misaligned
+            self.file.truncate(HEADER.size + self.num_records * self.record_size)
+        self.index_file = open(index_path(path), 'ab')
+        self.truncate_index()
+
+    def truncate_index(self):
+        """drop a partial trailing index entry and entries of records which were not written"""
+        self.index_file.seek(0, os.SEEK_END)
+        num_entries = self.index_file.tell() // INDEX_ENTRY.size
+        with open(index_path(self.path), 'rb') as f:
+            while num_entries:
+                f.seek((num_entries - 1) * INDEX_ENTRY.size)
+                _, record = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+                if record < self.num_records:
+                    break
+                num_entries -= 1
+        self.index_file.truncate(num_entries * INDEX_ENTRY.size)
+
+    def write(self, frame: bytes, timestamp_ns: int = None):
+        """append one raw streaming frame"""
+        if len(frame) != self.frame_len:
+            raise BnoException(f"Invalid streaming packet length, expected {self.frame_len}, got {len(frame)}")
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        if self.num_records % self.index_interval == 0:
+            self.index_file.write(INDEX_ENTRY.pack(timestamp_ns, self.num_records))
+        self.file.write(TIMESTAMP.pack(timestamp_ns))
+        self.file.write(frame)
+        self.num_records += 1
+
+    def record(self, bno_usb_stick, num_packets=-1):
+        """
+        Record `num_packets` streaming frames of an activated stick.
+        :param num_packets: number of packets to record. If -1 (default), record forever
+        """
+        if bno_usb_stick.layout != self.layout:
+            raise BnoException(f"Stick streams {bno_usb_stick.layout}, recording holds {self.layout}")
+        packets_recorded = 0
+        while num_packets == -1 or packets_recorded < num_packets:
+            frame = bno_usb_stick.recv_streaming_frame()
+            self.write(frame, bno_usb_stick.frame_timing[0])
+            packets_recorded += 1
+
+    def flush(self):
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(self):
+        self.file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ReplayStick:
+    """
+    Replay of a recording with the streaming interface of BnoUsbStick.
+
+    The recording is memory-mapped, frames are returned in real time, at a
+    multiple of real time (`speed`), or as fast as possible (`speed=None`).
+    """
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.frame_len, window_start, window_len = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            raise BnoException(f"{path} is not a BNO055 recording")
+        self.layout = header_layout(path, window_start, window_len)
+        self.record_size = TIMESTAMP.size + self.frame_len
+        self.num_records = (len(self.mmap) - HEADER.size) // self.record_size
+        self.index_timestamps = []
+        self.index_records = []
+        if os.path.exists(index_path(path)):
+            with open(index_path(path), 'rb') as f:
+                for timestamp_ns, record in INDEX_ENTRY.iter_unpack(f.read()):
+                    self.index_timestamps.append(timestamp_ns)
+                    self.index_records.append(record)
+        self.position = 0
+        self.buffer = None
+        self._pace_origin = None
+
+    def close(self):
+        self.mmap.close()
+
+    def __len__(self):
+        return self.num_records
+
+    def timestamp(self, record: int) -> int:
+        return TIMESTAMP.unpack_from(self.mmap, HEADER.size + record * self.record_size)[0]
+
+    def frame(self, record: int) -> bytes:
+        offset = HEADER.size + record * self.record_size + TIMESTAMP.size
+        return self.mmap[offset:offset + self.frame_len]
+
+    def seek(self, timestamp_ns: int):
+        """position the replay at the first frame recorded at or after `timestamp_ns`"""
+        idx = bisect.bisect_right(self.index_timestamps, timestamp_ns) - 1
+        record = self.index_records[idx] if idx >= 0 else 0
+        while record < self.num_records and self.timestamp(record) < timestamp_ns:
+            record += 1
+        self.position = record
+        self._pace_origin = None
+
+    def _pace(self, timestamp_ns: int):
+        """sleep until the frame recorded at `timestamp_ns` is due"""
+        if not self.speed:
+            return
+        now = time.monotonic_ns()
+        if self._pace_origin is None:
+            self._pace_origin = (now, timestamp_ns)
+            return
+        wall_origin, recording_origin = self._pace_origin
+        due = wall_origin + (timestamp_ns - recording_origin) / self.speed
+        if due > now:
+            time.sleep((due - now) / 1e9)
+
+    def recv_streaming_frame(self) -> bytes:
+        """next raw streaming frame, paced according to `speed`"""
+        if self.position >= self.num_records:
+            raise BnoException("End of recording reached")
+        timestamp_ns = self.timestamp(self.position)
+        self._pace(timestamp_ns)
+        self.buffer = self.frame(self.position)
+        self.frame_timestamp_ns = timestamp_ns
+        self.position += 1
+        return self.buffer
+
+    def recv_streaming_packet(self) -> BNO055Sample:
+        """
+        Replay and decode single streaming packet.
+        :return: BNO055Sample stamped with its recorded timestamp
+        """
+        frame = self.recv_streaming_frame()
+        return BNO055Sample(self.layout.unpack(frame), self.frame_timestamp_ns, self.frame_timestamp_ns)
+
+    def recv_streaming_generator(self, num_packets=-1):
+        """
+        Replay and decode `num_packets` streaming packets.
+        :param num_packets: number of packets to replay. If -1 (default), until the end of the recording
+        """
+        packets_received = 0
+        while (num_packets == -1 or packets_received < num_packets) and self.position < self.num_records:
+            yield self.recv_streaming_packet()
+            packets_received += 1
+
+    def recv_time_range(self, start_ns: int, stop_ns: int):
+        """replay the packets recorded in [start_ns, stop_ns)"""
+        self.seek(start_ns)
+        while self.position < self.num_records and self.timestamp(self.position) < stop_ns:
+            yield self.recv_streaming_packet()
+
+    def recv_streaming_batch(self, num_packets):
+        """
+        replay `num_packets` packets decoded into a numpy structured array, see BnoUsbStick.
+        Recorded arrival times are used as both timestamp_ns and sample_time_ns.
+        """
+        from bno055_usb_stick_py.batch import decode_streaming_frames
+        frames = bytearray()
+        timestamps = []
+        for _ in range(min(num_packets, self.num_records - self.position)):
+            frames += self.recv_streaming_frame()
+            timestamps.append(self.frame_timestamp_ns)
+        batch = decode_streaming_frames(frames, self.layout)
+        batch['timestamp_ns'] = batch['sample_time_ns'] = timestamps
+        return batch
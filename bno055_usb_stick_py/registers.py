@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import struct
+from typing import Dict, List, Tuple
+
+from bno055_usb_stick_py.decoding import burst_read_format, strip_reg_name
+
+
+class RegisterMap:
+    """
+    Indexes of one register page of bno055.json, built once:
+    address -> full name, address -> name without _ADDR / _LSB / _MSB suffix,
+    and name (with or without suffix) -> address.
+    Decode plans of burst reads are cached per (start address, number of bytes).
+    """
+
+    def __init__(self, page_map: Dict[str, int]):
+        self.full_names = {}
+        self.names = {}
+        self.addrs = {}
+        for reg_name, reg_addr in page_map.items():
+            self.full_names.setdefault(reg_addr, reg_name)
+            name = strip_reg_name(reg_name)
+            self.names.setdefault(reg_addr, name)
+            self.addrs.setdefault(reg_name, reg_addr)
+            # a 16 bit register is addressed by its LSB
+            self.addrs[name] = min(reg_addr, self.addrs.get(name, reg_addr))
+        self.plans = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.addrs
+
+    def addr(self, name: str) -> int:
+        """address of register `name`, e.g. 'OPR_MODE' or 'OPR_MODE_ADDR'"""
+        return self.addrs[name]
+
+    def full_name(self, addr: int) -> str:
+        """full register name at `addr`, empty string for unknown addresses"""
+        return self.full_names.get(addr, '')
+
+    def burst_read_plan(self, start_reg_addr: int, num_bytes: int) -> Tuple[struct.Struct, List[str]]:
+        """
+        struct and register names to decode `num_bytes` read from `start_reg_addr` in one pass
+        """
+        key = (start_reg_addr, num_bytes)
+        plan = self.plans.get(key)
+        if plan is None:
+            reg_names = [self.full_name(start_reg_addr + idx) for idx in range(num_bytes)]
+            fmt = burst_read_format(reg_names)
+            names = []
+            idx = 0
+            for code in fmt[1:]:
+                names.append(strip_reg_name(reg_names[idx]))
+                idx += 2 if code == 'h' else 1
+            plan = struct.Struct(fmt), names
+            self.plans[key] = plan
+        return plan
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+"""
+Fan-out of one stick to many local processes through a shared memory ring buffer.
+
+The publisher process owns the stick and writes every streaming frame, with
+its timing, into a `multiprocessing.shared_memory` segment. Subscribers attach
+to the segment by name and read the latest sample or iterate new ones. The read
+path takes no locks: every slot carries the sequence number of its sample, it
+is set to WRITING before the slot is overwritten and to the new number once the
+slot is complete (a seqlock per slot). A reader decodes straight out of the
+segment and checks the sequence number before and after, a mismatch means the
+writer overtook it.
+"""
+
+import multiprocessing
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Iterator, Optional
+
+from bno055_usb_stick_py.bno055 import BNO055Sample
+from bno055_usb_stick_py.decoding import StreamLayout
+from bno055_usb_stick_py.timing import SAMPLE_GAP
+
+MAGIC = b'BNO055SM'
+VERSION = 1
+# magic, version, window start, window length, slot size, capacity, sequence number of the newest sample
+HEADER = struct.Struct('<8sHBBII')
+WRITE_SEQ = struct.Struct('<Q')
+WRITE_SEQ_OFFSET = 24
+SLOTS_OFFSET = 32
+# slot: sequence number, arrival time, sample time, flags, then the streaming frame
+SLOT_HEADER = struct.Struct('<QqqB')
+SLOT_SEQ = struct.Struct('<Q')
+# sequence number of a slot which is being written
+WRITING = (1 << 64) - 1
+
+
+# names of the segments created by the publishers of this process
+_published = set()
+
+
+def slot_size(frame_len: int) -> int:
+    """slot of a frame, 8 byte aligned"""
+    return (SLOT_HEADER.size + frame_len + 7) & ~7
+
+
+class SharedRing:
+    """ring buffer of streaming frames in a shared memory segment"""
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.buf = shm.buf
+        magic, version, window_start, window_len, self.slot_size, self.capacity = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{shm.name} is not a BNO055 shared memory ring (version {VERSION})")
+        self.layout = StreamLayout.from_window(window_start, window_len)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write_seq(self) -> int:
+        """sequence number of the newest complete sample, 0 if none was published yet"""
+        return WRITE_SEQ.unpack_from(self.buf, WRITE_SEQ_OFFSET)[0]
+
+    def slot_offset(self, seq: int) -> int:
+        return SLOTS_OFFSET + ((seq - 1) % self.capacity) * self.slot_size
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+class SamplePublisher(SharedRing):
+    """
+    Owner of the stick: streams it into a new shared memory ring buffer.
+    Frames are published by `publish`, or by a thread started with `start`,
+    which owns the port until `stop`: commands of other threads raise BnoException.
+    """
+
+    def __init__(self, bno_usb_stick, name: str = None, capacity: int = 4096):
+        """
+        :param bno_usb_stick: BnoUsbStick with streaming activated (its layout is written into the segment)
+        :param name: name of the segment, random if None; subscribers attach by `self.name`
+        :param capacity: number of samples kept
+        """
+        layout = bno_usb_stick.layout
+        size = slot_size(layout.frame_len)
+        shm = shared_memory.SharedMemory(name, create=True, size=SLOTS_OFFSET + capacity * size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, layout.window_start, layout.window_len, size, capacity)
+        WRITE_SEQ.pack_into(shm.buf, WRITE_SEQ_OFFSET, 0)
+        super().__init__(shm)
+        _published.add(shm.name)
+        self.bno_usb_stick = bno_usb_stick
+        self.frame_len = layout.frame_len
+        self.seq = 0
+        self.thread = None
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def publish(self, frame: bytes, timestamp_ns: int = None, sample_time_ns: int = None, flags: int = 0):
+        """write the next sample: mark the slot, fill it, then release it with its sequence number"""
+        if len(frame) != self.frame_len:
+            raise ValueError(f"Expected a streaming frame of {self.frame_len} bytes, got {len(frame)}")
+        buf = self.buf
+        seq = self.seq + 1
+        offset = self.slot_offset(seq)
+        SLOT_HEADER.pack_into(buf, offset, WRITING, timestamp_ns or 0,
+                              sample_time_ns if sample_time_ns is not None else (timestamp_ns or 0), flags)
+        buf[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(frame)] = frame
+        SLOT_SEQ.pack_into(buf, offset, seq)
+        WRITE_SEQ.pack_into(buf, WRITE_SEQ_OFFSET, seq)
+        self.seq = seq
+
+    def run(self):
+        stick = self.bno_usb_stick
+        try:
+            while stick.frames:
+                self.publish(*stick.frames.popleft())
+            while not self._stop_event.is_set():
+                try:
+                    ok, chunk = stick.recv()
+                except OSError as e:
+                    stick.reconnect(e)
+                    continue
+                if ok:
+                    for timed_frame in stick.timed_frames(stick.framer.feed(chunk), time.monotonic_ns(),
+                                                          len(chunk) >= stick.buffer_size):
+                        self.publish(*timed_frame)
+                while stick.frames:
+                    # frames received while reconnecting
+                    self.publish(*stick.frames.popleft())
+        except Exception as e:
+            self.error = e
+
+    def start(self):
+        """publish the stream of the stick from a daemon thread"""
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name=f"bno-publisher-{self.name}", daemon=True)
+        self.bno_usb_stick.port_owner = self.thread
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            if self.bno_usb_stick.port_owner is self.thread:
+                self.bno_usb_stick.port_owner = None
+            self.thread = None
+
+    def close(self):
+        """stop publishing and remove the segment, attached subscribers keep their mapping"""
+        self.stop()
+        super().close()
+        self.shm.unlink()
+        _published.discard(self.shm.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    """attach to an existing segment without handing it to the resource tracker of this process"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    # before Python 3.13 every attached segment is registered with the resource tracker (POSIX), which
+    # unlinks it when the tracker exits. The registration of the creator must stay: processes started
+    # by multiprocessing share the tracker of their parent, and a subscriber in the publisher's own
+    # process shares its tracker. An independent process has its own tracker, which must forget the segment
+    shm = shared_memory.SharedMemory(name)
+    if sys.platform != 'win32' and shm.name not in _published and multiprocessing.parent_process() is None:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister('/' + shm.name, 'shared_memory')
+    return shm
+
+
+class SampleSubscriber(SharedRing):
+    """
+    Reader of a SamplePublisher, in any local process.
+
+    Samples are decoded straight out of the segment, nothing is locked or
+    copied on the way. A subscriber which falls more than `capacity` samples
+    behind is lapped: the overwritten samples are skipped, counted in
+    `self.lapped` and `self.missed`, and the next sample is flagged as
+    SAMPLE_GAP.
+    """
+
+    def __init__(self, name: str, poll_interval: float = 0.0005):
+        """
+        :param name: name of the publisher's segment
+        :param poll_interval: sleep between checks for new samples, seconds
+        """
+        super().__init__(attach(name))
+        self.poll_interval = poll_interval
+        self.next_seq = self.write_seq() + 1
+        self.lapped = 0
+        self.missed = 0
+
+    def read(self, seq: int, flags: int = 0) -> Optional[BNO055Sample]:
+        """
+        sample number `seq`, None if it was not published yet or was overwritten
+        :param flags: flags added to the ones of the sample
+        """
+        buf = self.buf
+        offset = self.slot_offset(seq)
+        slot_seq, timestamp_ns, sample_time_ns, sample_flags = SLOT_HEADER.unpack_from(buf, offset)
+        if slot_seq != seq:
+            return None
+        frame_offset = offset + SLOT_HEADER.size
+        raw = self.layout.unpack(buf[frame_offset:frame_offset + self.layout.frame_len])
+        if SLOT_SEQ.unpack_from(buf, offset)[0] != seq:
+            return None
+        return BNO055Sample(raw, timestamp_ns, sample_time_ns, sample_flags | flags)
+
+    def latest(self) -> Optional[BNO055Sample]:
+        """newest sample, None if nothing was published yet; does not block"""
+        while True:
+            seq = self.write_seq()
+            if seq == 0:
+                return None
+            sample = self.read(seq)
+            if sample is not None:
+                return sample
+
+    def poll(self) -> Optional[BNO055Sample]:
+        """next sample of the iteration, None if there is no new one; does not block"""
+        flags = 0
+        while True:
+            write_seq = self.write_seq()
+            if self.next_seq > write_seq:
+                return None
+            if write_seq - self.next_seq < self.capacity:
+                sample = self.read(self.next_seq, flags)
+                if sample is not None:
+                    self.next_seq += 1
+                    return sample
+            # lapped (or overwritten while reading): the oldest samples kept are overwritten next,
+            # continue half a ring behind the writer
+            skip_to = write_seq - self.capacity // 2 + 1
+            self.missed += skip_to - self.next_seq
+            self.lapped += 1
+            self.next_seq = skip_to
+            flags = SAMPLE_GAP
+
+    def __iter__(self) -> Iterator[BNO055Sample]:
+        """blocking iterator over new samples, starting at the newest one at attach time"""
+        return self.samples()
+
+    def samples(self, num_samples=-1, timeout: float = None) -> Iterator[BNO055Sample]:
+        """
+        :param num_samples: number of samples to yield, if -1 (default), forever
+        :param timeout: stop when no sample arrived for `timeout` seconds, never if None
+        """
+        received = 0
+        last_sample = time.monotonic()
+        while num_samples == -1 or received < num_samples:
+            sample = self.poll()
+            if sample is None:
+                if timeout is not None and time.monotonic() - last_sample > timeout:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+            last_sample = time.monotonic()
+            received += 1
+            yield sample
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+from typing import Dict, List
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50 / p90 / p99 / max of `values`"""
+    values = sorted(values)
+
+    def pick(q):
+        return values[min(int(q * len(values)), len(values) - 1)]
+    return {'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99), 'max': values[-1]}
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+from collections import deque
+from typing import List, Tuple
+
+# flags of a timed sample
+SAMPLE_GAP = 1  # samples were lost right before this one
+SAMPLE_DUPLICATE = 2  # more samples arrived than the device can produce, this one is surplus
+
+
+class TimingEngine:
+    """
+    Recovers the sampling times of streamed samples from their host arrival times.
+
+    Frames arrive in USB chunks: all frames of a chunk share one arrival time,
+    the last of them is the freshest. The engine keeps (sample index, arrival
+    time) of the last frame of the recent chunks in a sliding window and fits
+    arrival = offset + period * index robustly: the period is the median of
+    the slopes between points half a window apart (Theil-Sen with a fixed
+    lag), the offset the median of the residuals. Batching jitter therefore
+    neither bends the period nor shifts the timestamps.
+
+    The residuals of the window span the latency envelope of the link. A
+    chunk whose last frame arrives later than any chunk of the window (by
+    more than half a period) means samples were lost: the sample index jumps
+    and the first sample of the chunk is flagged as SAMPLE_GAP. A chunk
+    arriving earlier than any chunk of the window holds surplus samples,
+    which are flagged as SAMPLE_DUPLICATE and do not advance the index.
+    Losses smaller than the latency envelope cannot be told from jitter and
+    go unnoticed.
+
+    Chunks read from a backlog (the host fell behind, the read filled the
+    whole buffer) and the chunk draining the rest of it are stale: their
+    arrival says nothing about the device clock, so they are neither fitted
+    nor checked for gaps.
+    """
+
+    def __init__(self, nominal_period_ns: float = None, window: int = 1024, min_points: int = 16,
+                 refit_interval: int = 32):
+        """
+        :param nominal_period_ns: configured sample period, used until enough arrivals were seen
+        and as the reference of the drift
+        :param window: number of chunks in the regression window
+        :param min_points: chunks needed before the fit is trusted and gaps are detected
+        :param refit_interval: the period is refitted every `refit_interval` chunks
+        """
+        self.nominal_period_ns = nominal_period_ns
+        self.window = window
+        self.min_points = min_points
+        self.refit_interval = refit_interval
+        self.reset()
+
+    def reset(self):
+        """start over, e.g. when streaming is (re)activated"""
+        self.chunks = 0
+        self.gaps = 0
+        self.lost_samples = 0
+        self.duplicates = 0
+        self.interruption = None
+        self.clear_fit()
+
+    def restart(self):
+        """
+        The stream was interrupted, e.g. the stick was reconnected: the fit starts over,
+        the next sample is flagged as SAMPLE_GAP and the samples lost meanwhile are estimated.
+        """
+        self.interruption = (self.sample_time(self.index) if self.locked else None, self.period_ns)
+        self.clear_fit()
+
+    def clear_fit(self):
+        self.points = deque(maxlen=self.window)
+        self.index = -1
+        self.period_ns = self.nominal_period_ns
+        self.offset_ns = None
+        self.spread_ns = 0.
+        self.floor_ns = None
+        self.ceiling_ns = None
+        self.draining = False
+
+    @property
+    def locked(self) -> bool:
+        """True once the fit is established"""
+        return self.offset_ns is not None and self.period_ns is not None
+
+    @property
+    def drift_ppm(self) -> float:
+        """deviation of the device period from the nominal one, parts per million"""
+        if not self.nominal_period_ns or not self.period_ns:
+            return 0.
+        return (self.period_ns / self.nominal_period_ns - 1.) * 1e6
+
+    @property
+    def rate_hz(self) -> float:
+        return 1e9 / self.period_ns if self.period_ns else 0.
+
+    def sample_time(self, index: int) -> int:
+        return round(self.offset_ns + self.period_ns * index)
+
+    def update(self, arrival_ns: int, num_samples: int, stale: bool = False) -> List[Tuple[int, int]]:
+        """
+        :param arrival_ns: host arrival time of a chunk, time.monotonic_ns()
+        :param num_samples: number of samples in the chunk
+        :param stale: the chunk was read from a backlog, more data was already waiting
+        :return: (sample time in ns, flags) of every sample of the chunk
+        """
+        if num_samples == 0:
+            return []
+        stale, self.draining = stale or self.draining, stale
+        flags = [0] * num_samples
+        surplus = 0
+        if self.interruption is not None:
+            last_ns, period_ns = self.interruption
+            self.interruption = None
+            flags[0] |= SAMPLE_GAP
+            self.gaps += 1
+            if last_ns is not None and period_ns:
+                self.lost_samples += max(round((arrival_ns - last_ns) / period_ns) - num_samples, 0)
+        if self.locked:
+            half_period = 0.5 * self.period_ns
+            residual = arrival_ns - self.sample_time(self.index + num_samples)
+            floor, ceiling = self.floor_ns - self.offset_ns, self.ceiling_ns - self.offset_ns
+            if residual > ceiling + half_period and not stale:
+                lost = round((residual - ceiling) / self.period_ns) or 1
+                self.index += lost
+                self.gaps += 1
+                self.lost_samples += lost
+                flags[0] |= SAMPLE_GAP
+            elif residual < floor - half_period:
+                surplus = min(max(round((floor - residual) / self.period_ns), 1), num_samples)
+                self.duplicates += surplus
+                for idx in range(surplus):
+                    flags[num_samples - 1 - idx] |= SAMPLE_DUPLICATE
+        first = self.index + 1
+        self.index += num_samples - surplus
+        if not stale:
+            self.points.append((self.index, arrival_ns))
+            self.chunks += 1
+            if len(self.points) >= 2 and (not self.locked or self.chunks % self.refit_interval == 0):
+                self.fit()
+            elif self.locked:
+                residual = arrival_ns - self.period_ns * self.index
+                self.floor_ns = min(self.floor_ns, residual)
+                self.ceiling_ns = max(self.ceiling_ns, residual)
+        timed = []
+        index = first
+        for flag in flags:
+            if self.locked:
+                timed.append((self.sample_time(index), flag))
+            else:
+                timed.append((arrival_ns, flag))
+            if not flag & SAMPLE_DUPLICATE:
+                index += 1
+        return timed
+
+    def fit(self):
+        from statistics import median
+        points = list(self.points)
+        if len(points) >= self.min_points:
+            lag = len(points) // 2
+            slopes = [(points[idx + lag][1] - points[idx][1]) / (points[idx + lag][0] - points[idx][0])
+                      for idx in range(len(points) - lag) if points[idx + lag][0] != points[idx][0]]
+            if slopes:
+                self.period_ns = median(slopes)
+        elif self.period_ns is None:
+            (first_index, first_arrival), (last_index, last_arrival) = points[0], points[-1]
+            if last_index != first_index:
+                self.period_ns = (last_arrival - first_arrival) / (last_index - first_index)
+        if self.period_ns is None or len(points) < self.min_points:
+            return
+        residuals = [arrival - self.period_ns * index for index, arrival in points]
+        self.offset_ns = median(residuals)
+        self.spread_ns = median(abs(residual - self.offset_ns) for residual in residuals)
+        self.floor_ns = min(residuals)
+        self.ceiling_ns = max(residuals)
+
+    def stats(self) -> dict:
+        return {
+            'locked': self.locked,
+            'period_ns': self.period_ns,
+            'rate_hz': self.rate_hz,
+            'drift_ppm': self.drift_ppm,
+            'spread_ns': self.spread_ns,
+            'gaps': self.gaps,
+            'lost_samples': self.lost_samples,
+            'duplicates': self.duplicates,
+        }
@@ -16,6 +16,7 @@ setuptools.setup(
     packages=["bno055_usb_stick_py"],
     requires=["pyudev", "pyserial", "dataclasses"],
     install_requires=["pyserial", "pyudev", "dataclasses"],
+    extras_require={"numpy": ["numpy"]},
     package_dir={'bno055_usb_stick_py': 'bno055_usb_stick_py'},
     package_data={"bno055_usb_stick_py": ['97-ttyacm.rules', 'bno055.json']},
     classifiers=[
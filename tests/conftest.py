@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import os
+
+import pytest
+
+from bno055_usb_stick_py.emulator import BnoEmulator
+
+
+@pytest.fixture
+def emulator():
+    """emulated stick streaming at 200 Hz once activated"""
+    if not hasattr(os, 'openpty'):
+        pytest.skip("the emulator needs pseudo-terminals")
+    emulator = BnoEmulator(rate_hz=200, seed=0).start()
+    yield emulator
+    emulator.close()
+
+
+@pytest.fixture
+def stick(emulator):
+    """BnoUsbStick connected to `emulator`"""
+    stick = emulator.connect()
+    yield stick
+    stick.stop_reader()
+    if stick.streaming:
+        stick.deactivate_streaming()
+    stick.disconnect()
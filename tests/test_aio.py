@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import asyncio
+
+import pytest
+
+from bno055_usb_stick_py.aio import AsyncBnoUsbStick
+
+
+@pytest.mark.parametrize('channels', [None, ['gravity', 'temp']])
+def test_register_read_while_streaming(emulator, channels):
+    async def run():
+        async with AsyncBnoUsbStick(port=emulator.port_name) as stick:
+            await stick.activate_streaming(channels=channels)
+            # the response of a single register read has the length of a gravity + temp frame
+            assert await stick.read_register(0x00) == 0xA0
+            samples = [sample async for sample in stick.stream(20)]
+            assert all(sample.gravity[2] == pytest.approx(9.81) for sample in samples)
+    asyncio.run(run())
+
+
+def test_reopen(emulator):
+    stick = AsyncBnoUsbStick(port=emulator.port_name)
+
+    async def run():
+        for _ in range(2):
+            async with stick:
+                await stick.activate_streaming()
+                assert len([sample async for sample in stick.stream(5)]) == 5
+                assert await stick.write_register(0x3B, 0x81)
+    asyncio.run(run())
+    asyncio.run(run())
+    assert not stick.port.is_open
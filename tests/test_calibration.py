@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import threading
+
+import pytest
+
+from bno055_usb_stick_py.calibration import CALIBRATION_LEN, CALIBRATION_START, CalibrationProfile, ProfileStore
+from bno055_usb_stick_py.emulator import BnoEmulator
+
+PROFILE = CalibrationProfile(bytes(range(1, CALIBRATION_LEN + 1)), 0xFF)
+CALIBRATION_ADDRS = range(CALIBRATION_START, CALIBRATION_START + CALIBRATION_LEN)
+
+
+def test_profile_values():
+    assert PROFILE.accel_offset == (0x0201, 0x0403, 0x0605)
+    assert PROFILE.mag_radius == 0x1615
+    assert PROFILE.fully_calibrated
+    assert CalibrationProfile.from_dict(PROFILE.to_dict()) == PROFILE
+    with pytest.raises(ValueError):
+        CalibrationProfile(bytes(3))
+
+
+def test_profile_store(tmp_path):
+    store = ProfileStore(str(tmp_path / 'config' / 'calibration.json'))
+    assert store.get('A1') is None
+    store.put('A1', PROFILE)
+    store.put('B2', CalibrationProfile(bytes(CALIBRATION_LEN)))
+    assert store.get('A1') == PROFILE
+    assert sorted(store.load()) == ['A1', 'B2']
+
+
+def test_calibration_round_trip(stick, tmp_path):
+    store = ProfileStore(str(tmp_path / 'calibration.json'))
+    stick.write_calibration(PROFILE)
+    assert stick.read_registers([stick.opr_mode_addr]) == [0x0C]
+    assert stick.save_calibration(store) == PROFILE
+    stick.write_calibration(CalibrationProfile(bytes(CALIBRATION_LEN)))
+    assert stick.restore_calibration(store) == PROFILE
+    assert bytes(stick.read_registers(CALIBRATION_ADDRS)) == PROFILE.data
+
+
+def test_calibration_is_not_journaled(stick):
+    stick.activate_streaming(fast=True)
+    stick.write_calibration(PROFILE)
+    assert not [reg_addr for _, reg_addr in stick.register_journal if reg_addr in CALIBRATION_ADDRS]
+    assert (0, stick.opr_mode_addr) not in stick.register_journal
+    stick.write_calibration(PROFILE, opr_mode=0x08)
+    assert stick.register_journal[(0, stick.opr_mode_addr)][1] == 0x08
+
+
+def test_calibration_is_written_once_after_reconnect(tmp_path):
+    emulator = BnoEmulator(rate_hz=200, seed=0, link=str(tmp_path / 'bno_usb_stick')).start()
+    stick = emulator.connect()
+    writes = []
+    write = emulator.write
+    emulator.write = lambda reg_addr, reg_value: (writes.append(reg_addr), write(reg_addr, reg_value))
+    try:
+        stick.enable_auto_reconnect(timeout=5.0, watch=False)
+        stick.activate_streaming(fast=True)
+        stick.write_calibration(PROFILE)
+        list(stick.recv_streaming_generator(num_packets=5))
+        emulator.unplug()
+        writes.clear()
+        threading.Timer(0.2, emulator.replug).start()
+        samples = list(stick.recv_streaming_generator(num_packets=20))
+        assert sum(sample.gap for sample in samples) == 1
+        assert writes.count(CALIBRATION_START) == 1
+        assert bytes(emulator.registers[0][CALIBRATION_START:CALIBRATION_START + CALIBRATION_LEN]) == PROFILE.data
+    finally:
+        stick.deactivate_streaming()
+        stick.disconnect()
+        emulator.close()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bno055_usb_stick_py.batch import decode_streaming_frames  # noqa: E402
+from bno055_usb_stick_py.benchmark import synthetic_frames  # noqa: E402
+from bno055_usb_stick_py.columnar import ColumnFile, ColumnWriter, column_files, read_column  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def samples():
+    samples = decode_streaming_frames(b''.join(synthetic_frames(1000)))
+    samples['timestamp_ns'] = np.arange(len(samples)) * 10_000_000
+    return samples
+
+
+def test_round_trip(tmp_path, samples):
+    with ColumnWriter(str(tmp_path), chunk_size=128) as writer:
+        for start in range(0, len(samples), 300):
+            writer.write_block(samples[start:start + 300])
+    paths = column_files(str(tmp_path))
+    assert len(paths) == 1
+    with ColumnFile(paths[0]) as column_file:
+        assert len(column_file) == len(samples)
+        assert set(column_file.fields) == set(samples.dtype.names)
+        assert len(list(column_file.chunks('a'))) == 8
+        for name in samples.dtype.names:
+            assert np.array_equal(column_file[name], samples[name]), name
+    with np.load(paths[0]) as npz:
+        assert np.array_equal(npz['quaternion/000000'], samples['quaternion'][:128])
+
+
+def test_single_samples_and_selected_fields(tmp_path, stick):
+    stick.activate_streaming(fast=True)
+    packets = list(stick.recv_streaming_generator(num_packets=50))
+    with ColumnWriter(str(tmp_path), chunk_size=16, fields=('gravity', 'timestamp_ns')) as writer:
+        for packet in packets:
+            writer.write(packet)
+    with ColumnFile(column_files(str(tmp_path))[0]) as column_file:
+        assert sorted(column_file.fields) == ['gravity', 'timestamp_ns']
+        assert np.allclose(column_file['gravity'][:, 2], 9.81)
+        assert list(column_file['timestamp_ns']) == [packet.timestamp_ns for packet in packets]
+
+
+def test_rotation_and_numbering(tmp_path, samples):
+    (tmp_path / 'bno055-extra-0.npz').write_bytes(b'')
+    (tmp_path / 'bno055-00007.npz.part').write_bytes(b'')
+    with ColumnWriter(str(tmp_path), chunk_size=100, rotate_bytes=1) as writer:
+        writer.write_block(samples[:300])
+    assert [os.path.basename(path) for path in column_files(str(tmp_path))] == \
+        ['bno055-00000.npz', 'bno055-00001.npz', 'bno055-00002.npz']
+    with ColumnWriter(str(tmp_path), chunk_size=100) as writer:
+        writer.write_block(samples[300:400])
+    assert column_files(str(tmp_path))[-1].endswith('bno055-00003.npz')
+    assert np.array_equal(read_column(str(tmp_path), 'timestamp_ns'), samples['timestamp_ns'][:400])
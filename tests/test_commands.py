@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import threading
+
+from bno055_usb_stick_py.commands import CommandTemplate
+
+
+def test_template_leaves_the_config_untouched(stick):
+    config = stick.bno_config['read_register']
+    command = list(config['command'])
+    template = CommandTemplate(config['command'], config['params'])
+    built = template.build(reg_addr=0x3D)
+    filled = template.fill(reg_addr=0x3D)
+    assert bytes(filled) == built
+    assert template.fill(reg_addr=0x00) is filled
+    assert template.build(reg_addr=0x3D) == built
+    assert config['command'] == command
+
+
+def test_bus_lock_serializes_threads(stick):
+    # every thread owns one register: writes and reads of all threads interleave on the bus
+    reg_addrs = [0x3B, 0x40, 0x41, 0x42]
+    errors = []
+
+    def worker(reg_addr):
+        try:
+            for reg_value in range(50):
+                assert stick.write_register(reg_addr, reg_value)
+                assert stick.read_register(reg_addr) == reg_value
+                values, _ = stick.burst_read(0x00, 4)
+                assert values == [0xA0, 0xFB, 0x32, 0x0F]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(reg_addr,)) for reg_addr in reg_addrs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert stick.read_registers(reg_addrs) == [49] * len(reg_addrs)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import pytest
+
+from bno055_usb_stick_py.bno055 import BNO055Sample
+from bno055_usb_stick_py.decoding import DEFAULT_LAYOUT, StreamLayout
+from bno055_usb_stick_py.emulator import BnoEmulator
+
+SUBSETS = (['quaternion', 'lin_a'], ['gravity', 'temp'], ['a'], ['euler', 'calib_stat'])
+
+
+def emulated_frame(layout, timestamp=1.25):
+    emulator = BnoEmulator()
+    try:
+        full = emulator.streaming_frame(timestamp)
+        emulator.window_start, emulator.window_len = layout.window_start, layout.window_len
+        return full, emulator.streaming_frame(timestamp)
+    finally:
+        emulator.close()
+
+
+@pytest.mark.parametrize('channels', SUBSETS)
+def test_subset_decodes_like_full_frame(channels):
+    layout = StreamLayout(channels)
+    full, frame = emulated_frame(layout)
+    assert len(frame) == layout.frame_len
+    expected = BNO055Sample(DEFAULT_LAYOUT.unpack(full))
+    sample = BNO055Sample(layout.unpack(frame))
+    assert len(sample.raw) == len(expected.raw)
+    for name in layout.channels:
+        assert getattr(sample, name) == getattr(expected, name), name
+
+
+def test_channels_outside_of_window_are_zero():
+    layout = StreamLayout(['gravity', 'temp'])
+    _, frame = emulated_frame(layout)
+    sample = BNO055Sample(layout.unpack(frame))
+    assert sample.a == (0., 0., 0.)
+    assert sample.quaternion == (0., 0., 0., 0.)
+    assert sample.gravity[2] == pytest.approx(9.81)
+
+
+def test_layout_from_window_round_trips():
+    for channels in SUBSETS:
+        layout = StreamLayout(channels)
+        assert StreamLayout.from_window(layout.window_start, layout.window_len) == layout
+
+
+def test_unknown_channel_is_rejected():
+    with pytest.raises(ValueError):
+        StreamLayout(['acceleration'])
+
+
+def test_batch_decode_of_subset_matches_samples():
+    np = pytest.importorskip('numpy')
+    from bno055_usb_stick_py.batch import decode_streaming_frames
+    layout = StreamLayout(['quaternion', 'lin_a'])
+    _, frame = emulated_frame(layout)
+    batch = decode_streaming_frames(frame * 3, layout)
+    sample = BNO055Sample(layout.unpack(frame))
+    assert len(batch) == 3
+    assert np.allclose(batch['quaternion'][2], sample.quaternion)
+    assert not batch['a'].any()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import os
+
+import pytest
+
+CHIP_ID_BLOCK = [0xA0, 0xFB, 0x32, 0x0F, 0x11, 0x03, 0x15, 0x00]
+
+
+def test_register_model(stick, emulator):
+    assert stick.read_register(0x00) == 0xA0
+    assert stick.write_register(0x3B, 0x81)
+    assert stick.read_register(0x3B) == 0x81
+    assert emulator.registers[0][0x3B] == 0x81
+    assert emulator.commands_received == 3
+
+
+def test_page_1_registers(stick, emulator):
+    assert stick.read_register_by_name('ACCEL_CONFIG', page=1) == 0
+    assert stick.write_register_by_name('ACCEL_CONFIG', 0x0D, page=1)
+    assert emulator.registers[1][0x08] == 0x0D
+    assert emulator.page == 0
+
+
+def test_system_reset_restores_defaults(stick, emulator):
+    assert stick.write_register(0x3B, 0x81)
+    stick.write_register(stick.sys_trigger_addr, stick.rst_sys_bit)
+    assert stick.read_register(0x3B) == 0x80
+
+
+def test_streaming(stick, emulator):
+    stick.activate_streaming(fast=True)
+    samples = list(stick.recv_streaming_generator(num_packets=20))
+    assert len(samples) == 20
+    assert emulator.streaming
+    assert all(sample.gravity[2] == pytest.approx(9.81) for sample in samples)
+    stick.deactivate_streaming()
+    assert not emulator.streaming
+
+
+def test_frames_losing_bytes_are_dropped(emulator):
+    emulator.drop_rate = 0.2
+    stick = emulator.connect()
+    try:
+        stick.activate_streaming(fast=True)
+        samples = list(stick.recv_streaming_generator(num_packets=50))
+        assert all(sample.gravity[2] == pytest.approx(9.81) for sample in samples)
+        assert stick.framer.dropped_bytes > 0
+    finally:
+        stick.deactivate_streaming()
+        stick.disconnect()
+
+
+def test_unplug_and_replug_behind_link(tmp_path):
+    from bno055_usb_stick_py.emulator import BnoEmulator
+    link = str(tmp_path / 'bno_usb_stick')
+    emulator = BnoEmulator(rate_hz=200, link=link).start()
+    try:
+        emulator.unplug()
+        assert not os.path.lexists(link)
+        emulator.replug()
+        assert os.path.realpath(link) == emulator.port_name
+        stick = emulator.connect()
+        try:
+            assert stick.read_registers(range(0, 8)) == CHIP_ID_BLOCK
+        finally:
+            stick.disconnect()
+    finally:
+        emulator.close()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+from bno055_usb_stick_py.decoding import StreamLayout
+from bno055_usb_stick_py.emulator import BnoEmulator
+from bno055_usb_stick_py.framing import PacketFramer, StreamFramer, is_stream_frame
+
+
+def frames(num_frames, layout=None):
+    emulator = BnoEmulator()
+    try:
+        if layout is not None:
+            emulator.window_start, emulator.window_len = layout.window_start, layout.window_len
+        return [emulator.streaming_frame(idx * 0.01) for idx in range(num_frames)]
+    finally:
+        emulator.close()
+
+
+def test_stream_framer_reassembles_fragments():
+    data = b''.join(frames(10))
+    framer = StreamFramer()
+    received = []
+    for pos in range(0, len(data), 7):
+        received += framer.feed(data[pos:pos + 7])
+    assert b''.join(received) == data
+    assert framer.resyncs == 0 and framer.dropped_bytes == 0
+
+
+def test_stream_framer_resyncs_on_garbage():
+    good = frames(4)
+    corrupted = bytearray(good[1])
+    corrupted[-1] = 0x00
+    framer = StreamFramer()
+    received = framer.feed(b'\x01\x02' + good[0] + bytes(corrupted) + b'\xAA\x00' + good[2] + good[3])
+    assert received == [good[0], good[2], good[3]]
+    assert framer.resyncs > 0
+    assert framer.dropped_bytes == 2 + len(corrupted) + 2
+
+
+def test_packet_framer_splits_responses_and_frames():
+    response = bytes([0xAA, 13 + 2, 0x02, 0, 0x42, 0, 1, 0x00, 0, 0, 2, 0xA0, 0xFB, 0x0D, 0x0A])
+    frame = frames(1)[0]
+    framer = PacketFramer()
+    assert framer.feed(b'\x00' + response + frame[:10]) == [response]
+    assert framer.feed(frame[10:]) == [frame]
+
+
+def test_stream_frame_is_told_from_response_of_same_length():
+    layout = StreamLayout(['quaternion', 'lin_a'])
+    frame = frames(1, layout)[0]
+    # response of an 8 byte burst read: 11 header bytes, data, stop bytes
+    response = bytes([0xAA, 21, 0x02, 0, 0x42, 0, 1, 0x00, 0, 0, 8]) + bytes(8) + b'\r\n'
+    assert len(frame) == len(response) == layout.frame_len
+    assert is_stream_frame(frame, layout.frame_len)
+    assert not is_stream_frame(response, layout.frame_len)
+    # acknowledgement of a stream control command
+    assert not is_stream_frame(bytes([0xAA, 6, 0x06, 0, 0x0D, 0x0A]), layout.frame_len)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import pytest
+
+from bno055_usb_stick_py.emulator import BnoEmulator
+from bno055_usb_stick_py.group import BnoStickGroup
+
+
+@pytest.fixture
+def group(emulator):
+    # second stick at half the rate of the first
+    slow = BnoEmulator(rate_hz=100, seed=1).start()
+    group = BnoStickGroup({'fast': emulator.port_name, 'slow': slow.port_name})
+    group.activate_streaming(fast=True)
+    yield group
+    group.deactivate_streaming()
+    group.close()
+    slow.close()
+
+
+def test_merged_stream_of_all_sticks(group):
+    device_ids = [device_id for device_id, _ in group.stream(num_packets=60)]
+    assert len(device_ids) == 60
+    assert set(device_ids) == {'fast', 'slow'}
+    assert device_ids.count('fast') > device_ids.count('slow')
+
+
+def test_aligned_stream(group):
+    tolerance_ns = 5_000_000
+    frames = list(group.aligned_stream(tolerance_ns, num_frames=20))
+    assert len(frames) == 20
+    for frame in frames:
+        assert set(frame) == {'fast', 'slow'}
+        timestamps = [sample.timestamp_ns for sample in frame.values()]
+        assert max(timestamps) - min(timestamps) <= tolerance_ns
+    # the fast stick sent about twice as many samples, the surplus cannot be matched
+    assert group.unaligned > 0
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import sys
+import threading
+import time
+
+import pytest
+
+from bno055_usb_stick_py.bno055_usb_stick import BnoException
+from bno055_usb_stick_py.emulator import BnoEmulator
+from bno055_usb_stick_py.hotplug import DeviceCache
+
+UDEV_CONFIG = {'ID_MODEL': 'Bosch_Sensortec_BNO_stick', 'ID_VENDOR': 'Bosch_Sensortec'}
+
+
+class FakeDevice:
+    """pyudev.Device of a tty: udev properties, device node and action"""
+
+    def __init__(self, action, node, serial_number, **properties):
+        self.properties = dict(UDEV_CONFIG, ID_SERIAL_SHORT=serial_number,
+                               DEVLINKS=f'/dev/serial/by-id/usb-bno-{serial_number} /dev/other', **properties)
+        self.action = action
+        self.device_node = node
+
+
+def test_cache_follows_udev_events(tmp_path):
+    node = tmp_path / 'ttyACM0'
+    node.touch()
+    cache = DeviceCache(UDEV_CONFIG)
+    cache.scanned = True
+    cache.on_event(FakeDevice('add', str(node), 'A1'))
+    cache.on_event(FakeDevice('add', '/dev/ttyS0', 'B2', ID_VENDOR='other'))
+    assert cache.devices == {'A1': ('/dev/serial/by-id/usb-bno-A1', str(node))}
+    assert cache.find('A1') == ('A1', '/dev/serial/by-id/usb-bno-A1', str(node))
+    cache.on_event(FakeDevice('remove', str(node), 'A1'))
+    assert cache.devices == {}
+
+
+def test_wait_for_wakes_up_on_add(tmp_path):
+    node = tmp_path / 'ttyACM1'
+    node.touch()
+    cache = DeviceCache(UDEV_CONFIG)
+    cache.scanned = True
+    # a running watcher: waiting threads are woken up by events instead of polling
+    cache.watcher = threading.current_thread()
+    timer = threading.Timer(0.1, cache.on_event, [FakeDevice('add', str(node), 'A1')])
+    timer.start()
+    t_start = time.monotonic()
+    assert cache.wait_for('A1', str(node), 5.0) == '/dev/serial/by-id/usb-bno-A1'
+    assert time.monotonic() - t_start < 1.0
+    assert cache.wait_for('B2', str(node), 0.05) is None
+
+
+def test_reconnect_restores_stream_and_registers(tmp_path):
+    link = str(tmp_path / 'bno_usb_stick')
+    emulator = BnoEmulator(rate_hz=200, seed=0, link=link).start()
+    stick = emulator.connect()
+    try:
+        stick.enable_auto_reconnect(timeout=5.0, watch=False)
+        # TEMP_SOURCE written before, AXIS_MAP_CONFIG after the activation
+        assert stick.write_register(0x40, 0x01)
+        stick.activate_streaming(fast=True)
+        assert stick.write_registers({0x41: 0x21})
+        list(stick.recv_streaming_generator(num_packets=10))
+        emulator.unplug()
+        threading.Timer(0.3, emulator.replug).start()
+        samples = list(stick.recv_streaming_generator(num_packets=50))
+        assert sum(sample.gap for sample in samples) == 1
+        assert stick.metrics.reconnects == 1
+        assert stick.outage_time >= 0.2
+        assert emulator.registers[0][0x40] == 0x01
+        assert emulator.registers[0][0x41] == 0x21
+        assert emulator.streaming
+    finally:
+        stick.deactivate_streaming()
+        stick.disconnect()
+        emulator.close()
+
+
+def test_reconnect_gives_up_after_timeout(tmp_path):
+    link = str(tmp_path / 'bno_usb_stick')
+    emulator = BnoEmulator(rate_hz=200, seed=0, link=link).start()
+    stick = emulator.connect()
+    try:
+        stick.enable_auto_reconnect(timeout=0.2, watch=False)
+        stick.activate_streaming(fast=True)
+        emulator.unplug()
+        with pytest.raises(BnoException, match="did not come back"):
+            list(stick.recv_streaming_generator(num_packets=100))
+    finally:
+        stick.disconnect()
+        emulator.replug()
+        emulator.close()
+
+
+def test_auto_reconnect_is_rejected_on_windows(stick, monkeypatch):
+    monkeypatch.setattr(sys, 'platform', 'win32')
+    with pytest.raises(BnoException, match="not supported on Windows"):
+        stick.enable_auto_reconnect(timeout=5.0)
+    assert stick.reconnect_timeout is None
+    stick.enable_auto_reconnect(timeout=None)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+from urllib.request import urlopen
+
+from bno055_usb_stick_py.metrics import Histogram, MetricsServer, StickMetrics, prometheus_text, \
+    write_metrics_file
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    for value_ns in (500, 1500, 1500, 3000, 10 ** 10):
+        histogram.observe(value_ns)
+    assert histogram.counts[:3] == [1, 2, 1]
+    assert histogram.counts[-1] == 1
+    assert histogram.quantile(0.5) == 2048.
+    assert histogram.quantile(1.0) == float('inf')
+    assert histogram.snapshot()['count'] == 5
+
+
+def test_interarrival_and_jitter():
+    metrics = StickMetrics()
+    for timestamp_ns in range(0, 100_000_000, 10_000_000):
+        metrics.frames_arrived(1, timestamp_ns)
+    assert metrics.frames_received == 10
+    assert metrics.interarrival.count == 9
+    assert metrics.jitter_ns == 0.
+    # three frames in one chunk: two arrived together with the first
+    metrics.frames_arrived(3, 130_000_000)
+    assert metrics.interarrival.count == 12
+    assert metrics.jitter_ns > 0.
+
+
+def test_stats_of_streaming_stick(stick):
+    stick.activate_streaming(fast=True)
+    list(stick.recv_streaming_generator(num_packets=20))
+    stats = stick.stats()
+    assert stats['frames_decoded'] == 20
+    assert stats['frames_received'] >= 20
+    assert stats['bytes_read'] >= 20 * stick.layout.frame_len
+    assert stats['decode']['count'] == 20
+    assert stats['commands'] > 0
+    assert 'timing' in stats
+
+
+def test_prometheus_text(stick, tmp_path):
+    stick.read_register(0x00)
+    text = prometheus_text({'ttyACM0': stick.stats()})
+    assert '# TYPE bno055_commands_total counter' in text
+    assert 'bno055_commands_total{port="ttyACM0"} 1' in text
+    assert 'bno055_command_seconds_count{port="ttyACM0"} 1' in text
+    assert 'bno055_command_seconds_bucket{port="ttyACM0",le="+Inf"} 1' in text
+    path = tmp_path / 'bno055.prom'
+    write_metrics_file(str(path), [stick])
+    assert path.read_text().startswith('# HELP bno055_read_calls_total')
+
+
+def test_metrics_server(stick):
+    server = MetricsServer([stick], port=0)
+    try:
+        with urlopen(f'http://127.0.0.1:{server.port}/metrics', timeout=5) as response:
+            body = response.read().decode()
+        assert f'bno055_commands_total{{port="{stick.port_name}"}} 0' in body
+    finally:
+        server.close()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bno055_usb_stick_py.batch import decode_streaming_frames  # noqa: E402
+from bno055_usb_stick_py.benchmark import synthetic_frames  # noqa: E402
+from bno055_usb_stick_py.pipeline import Pipeline, decimate, lowpass_taps, rolling  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def samples():
+    """1000 samples of the emulated stick, with noise on the accelerometer"""
+    samples = decode_streaming_frames(b''.join(synthetic_frames(1000)))
+    samples['a'] += np.random.default_rng(0).normal(0., 0.5, (len(samples), 3)).astype(np.float32)
+    samples['timestamp_ns'] = np.arange(len(samples)) * 10_000_000
+    return samples
+
+
+def blocks_of(samples, block_size):
+    return [samples[start:start + block_size] for start in range(0, len(samples), block_size)]
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 64, 1000])
+def test_decimate_does_not_depend_on_block_size(samples, block_size):
+    factor = 4
+    out = np.concatenate(list(decimate(blocks_of(samples, block_size), factor)))
+    taps = lowpass_taps(factor)
+    delay = (len(taps) - 1) // 2
+    expected = np.stack([np.convolve(samples['a'][:, axis].astype(np.float64), taps, 'valid')[::factor]
+                         for axis in range(3)], axis=1)
+    assert len(out) == len(expected)
+    assert np.allclose(out['a'], expected, atol=1e-4)
+    # aligned with the filter delay: the timestamps of the samples at the center of the filter
+    assert np.array_equal(out['timestamp_ns'], samples['timestamp_ns'][delay::factor][:len(out)])
+
+
+def test_lowpass_has_unity_gain():
+    taps = lowpass_taps(4)
+    assert len(taps) == 33
+    assert taps.sum() == pytest.approx(1.)
+    with pytest.raises(ValueError):
+        lowpass_taps(4, 32)
+
+
+@pytest.mark.parametrize('block_size', [1, 10, 1000])
+def test_rolling_does_not_depend_on_block_size(samples, block_size):
+    window = 25
+    out = np.concatenate(list(rolling(blocks_of(samples, block_size), window, fields=('a',))))
+    a = samples['a'].astype(np.float64)
+    for idx in (0, 10, 24, 25, 500, 999):
+        tail = a[max(idx - window + 1, 0):idx + 1]
+        assert np.allclose(out['a_mean'][idx], tail.mean(axis=0), atol=1e-4)
+        assert np.allclose(out['a_rms'][idx], np.sqrt((tail * tail).mean(axis=0)), atol=1e-4)
+
+
+def test_euler_from_quaternion_matches_device_euler(samples):
+    out = np.concatenate(list(Pipeline(blocks_of(samples, 100)).normalized().euler()))
+    heading_error = (out['euler_q'][:, 0] - samples['euler'][:, 0] + 180.) % 360. - 180.
+    assert np.abs(heading_error).max() < 0.1
+    assert np.abs(out['euler_q'][:, 1:]).max() < 0.1
+
+
+def test_remove_gravity_of_flat_stick(samples):
+    quiet = samples.copy()
+    quiet['a'] = samples['gravity']
+    out = np.concatenate(list(Pipeline(blocks_of(quiet, 100)).normalized().remove_gravity()))
+    assert np.abs(out['lin_acc']).max() < 0.05
+
+
+def test_calibrated_drops_uncalibrated_samples(samples):
+    partly = samples.copy()
+    partly['calib_stat'][::2] = 0x3F
+    out = list(Pipeline(blocks_of(partly, 100)).calibrated(sys=3))
+    assert sum(len(block) for block in out) == 500
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from bno055_usb_stick_py.bno055_usb_stick import BnoException
+from bno055_usb_stick_py.polling import SamplePoller
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def poller(stick, emulator):
+    # data registers of a stick lying flat, as streamed at t = 1 s
+    emulator.update_data_registers(1.)
+    return SamplePoller(stick)
+
+
+def test_poll(poller):
+    sample = poller.poll()
+    assert sample.gravity[2] == pytest.approx(9.81)
+    assert sample.timestamp_ns >= sample.sample_time_ns
+    samples = list(poller.samples(10))
+    assert len(samples) == 10
+    assert not poller.in_flight
+
+
+def test_polling_requires_streaming_to_be_off(stick):
+    stick.activate_streaming(fast=True)
+    with pytest.raises(BnoException, match="deactivated"):
+        SamplePoller(stick)
+
+
+def test_request_in_flight(stick, poller):
+    with pytest.raises(BnoException, match="No poll request"):
+        poller.receive()
+    poller.request()
+    with pytest.raises(BnoException, match="already in flight"):
+        poller.request()
+    poller.cancel()
+    assert not poller.in_flight
+    assert stick.read_register(0x00) == 0xA0
+
+
+def test_invalid_response_releases_the_bus(stick, poller):
+    # the response of another command gets in the way
+    stick.port.write(stick.commands['read_register'].build(reg_addr=0x00))
+    poller.request()
+    with pytest.raises(BnoException, match="Invalid poll response"):
+        poller.receive()
+    assert poller.failures == 1
+    assert stick.read_register(0x00) == 0xA0
+    assert poller.poll().gravity[2] == pytest.approx(9.81)
+
+
+def test_register_access_of_other_thread_waits_for_the_poll(stick, poller):
+    errors = []
+
+    def worker():
+        try:
+            for reg_value in range(30):
+                assert stick.write_register(0x3B, reg_value)
+                assert stick.read_register(0x3B) == reg_value
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    samples = list(poller.samples(50))
+    thread.join()
+    assert errors == []
+    assert all(sample.gravity[2] == pytest.approx(9.81) for sample in samples)
+    assert poller.failures == 0
+
+
+def test_latency_probe_leaves_the_benchmark_unloaded(emulator):
+    code = (f"import sys\n"
+            f"from bno055_usb_stick_py.bno055_usb_stick import BnoUsbStick\n"
+            f"from bno055_usb_stick_py.polling import SamplePoller\n"
+            f"stick = BnoUsbStick(port={emulator.port_name!r})\n"
+            f"probe = SamplePoller(stick).latency_probe(20)\n"
+            f"assert probe['round_trip_us']['p50'] > 0 and probe['mean_rate_hz'] > 0\n"
+            f"assert 'bno055_usb_stick_py.benchmark' not in sys.modules\n"
+            f"stick.disconnect()\n")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
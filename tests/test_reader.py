@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import pytest
+
+from bno055_usb_stick_py.bno055_usb_stick import BnoException
+from bno055_usb_stick_py.reader import DROP_NEWEST, DROP_OLDEST, SampleQueue
+
+
+@pytest.mark.parametrize('policy, expected', [(DROP_OLDEST, [2, 3, 4]), (DROP_NEWEST, [0, 1, 2])])
+def test_queue_overrun_policy(policy, expected):
+    queue = SampleQueue(3, policy)
+    for sample in range(5):
+        queue.put(sample)
+    assert [queue.get(0) for _ in range(3)] == expected
+    assert queue.overruns == 2
+    assert queue.get_latest() == 4
+
+
+def test_reader_owns_the_port(stick):
+    stick.activate_streaming(fast=True)
+    reader = stick.start_reader()
+    with pytest.raises(BnoException, match="stop it before sending commands"):
+        stick.read_register(0x00)
+    sample = reader.queue.get(timeout=1.0)
+    assert sample is not None and sample.timestamp_ns is not None
+    stick.stop_reader()
+    assert reader.error is None
+    assert stick.read_registers([0x00]) == [0xA0]
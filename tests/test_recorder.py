@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import pytest
+
+from bno055_usb_stick_py.benchmark import synthetic_frames
+from bno055_usb_stick_py.bno055_usb_stick import BnoException
+from bno055_usb_stick_py.decoding import StreamLayout
+from bno055_usb_stick_py.emulator import BnoEmulator
+from bno055_usb_stick_py.recorder import ReplayStick, StreamRecorder, index_path
+
+
+@pytest.fixture
+def replay():
+    replays = []
+
+    def open_replay(path):
+        replays.append(ReplayStick(path, speed=None))
+        return replays[-1]
+    yield open_replay
+    for replay_stick in replays:
+        replay_stick.close()
+
+
+def record(path, frames, start=0, index_interval=10):
+    with StreamRecorder(path, index_interval=index_interval) as recorder:
+        for idx, frame in enumerate(frames, start):
+            recorder.write(frame, idx * 1000)
+
+
+def test_replay_returns_recorded_frames(tmp_path, replay):
+    path = str(tmp_path / 'stream.rec')
+    frames = synthetic_frames(25)
+    record(path, frames)
+    replay_stick = replay(path)
+    assert len(replay_stick) == 25
+    assert [replay_stick.recv_streaming_frame() for _ in range(25)] == frames
+
+
+def test_time_range(tmp_path, replay):
+    path = str(tmp_path / 'stream.rec')
+    record(path, synthetic_frames(50))
+    replay_stick = replay(path)
+    samples = list(replay_stick.recv_time_range(12500, 31000))
+    assert [sample.timestamp_ns for sample in samples] == list(range(13000, 31000, 1000))
+
+
+def test_recording_is_continued(tmp_path, replay):
+    path = str(tmp_path / 'stream.rec')
+    frames = synthetic_frames(30)
+    record(path, frames[:15])
+    record(path, frames[15:], start=15)
+    replay_stick = replay(path)
+    assert [replay_stick.recv_streaming_frame() for _ in range(len(replay_stick))] == frames
+    assert replay_stick.index_records == [0, 10, 20]
+
+
+def test_partial_trailing_record_is_dropped(tmp_path, replay):
+    path = str(tmp_path / 'stream.rec')
+    frames = synthetic_frames(30)
+    record(path, frames[:21])
+    # crash while writing record 20: its index entry is complete, the record is not
+    with open(path, 'rb+') as f:
+        f.truncate(f.seek(0, 2) - 10)
+    with open(index_path(path), 'ab') as f:
+        f.write(b'\x05')
+    with StreamRecorder(path, index_interval=10) as recorder:
+        assert recorder.num_records == 20
+        for idx, frame in enumerate(frames[20:], 20):
+            recorder.write(frame, idx * 1000)
+    replay_stick = replay(path)
+    assert [replay_stick.recv_streaming_frame() for _ in range(len(replay_stick))] == frames
+    assert replay_stick.index_records == [0, 10, 20]
+    assert replay_stick.index_timestamps == [0, 10000, 20000]
+
+
+def test_record_from_stick(stick, tmp_path, replay):
+    path = str(tmp_path / 'stream.rec')
+    stick.activate_streaming(fast=True)
+    with StreamRecorder(path, stick.layout) as recorder:
+        recorder.record(stick, num_packets=10)
+    samples = list(replay(path).recv_streaming_generator())
+    assert len(samples) == 10
+    assert all(sample.gravity[2] == pytest.approx(9.81) for sample in samples)
+
+
+def test_recording_of_other_channels_is_not_continued(tmp_path, replay):
+    path = str(tmp_path / 'stream.rec')
+    accelerometer, magnetometer = StreamLayout(['a']), StreamLayout(['m'])
+    assert accelerometer.frame_len == magnetometer.frame_len
+    emulator = BnoEmulator()
+    try:
+        emulator.window_start, emulator.window_len = accelerometer.window_start, accelerometer.window_len
+        frame = emulator.streaming_frame(0.)
+    finally:
+        emulator.close()
+    with StreamRecorder(path, accelerometer) as recorder:
+        recorder.write(frame, 0)
+    with pytest.raises(BnoException, match="recording of"):
+        StreamRecorder(path, magnetometer)
+    with StreamRecorder(path, StreamLayout(['a'])) as recorder:
+        recorder.write(frame, 1000)
+    replay_stick = replay(path)
+    assert replay_stick.layout == accelerometer
+    assert len(list(replay_stick.recv_streaming_generator())) == 2
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import pytest
+
+from bno055_usb_stick_py.bno055_usb_stick import BnoException
+
+
+def test_register_lookup(stick):
+    assert stick.get_reg_addr('OPR_MODE') == (0, 0x3D)
+    assert stick.get_reg_addr('OPR_MODE_ADDR') == (0, 0x3D)
+    assert stick.get_reg_addr('ACCEL_DATA_X') == (0, 0x08)
+    assert stick.get_reg_addr('ACCEL_CONFIG') == (1, 0x08)
+    with pytest.raises(BnoException):
+        stick.get_reg_addr('NO_SUCH_REGISTER')
+
+
+def test_burst_read_plan_is_cached(stick):
+    register_map = stick.register_maps[0]
+    plan, names = register_map.burst_read_plan(0x08, 6)
+    assert register_map.burst_read_plan(0x08, 6)[0] is plan
+    assert plan.size == 6 and len(names) == 3
+
+
+def test_burst_read(stick):
+    values, names = stick.burst_read(0x00, 4)
+    assert values == [0xA0, 0xFB, 0x32, 0x0F]
+    assert names == ['CHIP_ID', 'ACCEL_REV_ID', 'MAG_REV_ID', 'GYRO_REV_ID']
+
+
+def test_short_burst_read_response_raises(stick):
+    stick.burst_read(0x00, 4)
+    stick.buffer = stick.buffer[:12] + stick.buffer[-2:]
+    with pytest.raises(BnoException, match="too short"):
+        stick.decode_burst_read(0x00, 4)
+
+
+def test_batched_reads_and_writes(stick, emulator):
+    commands = emulator.commands_received
+    assert stick.write_registers({0x3B: 0x81, 0x40: 0x12, 0x41: 0x21})
+    # 0x3B alone, 0x40..0x41 by one burst read
+    assert stick.read_registers([0x41, 0x3B, 0x40]) == [0x21, 0x81, 0x12]
+    assert emulator.commands_received - commands == 3 + 2
+
+
+def test_shadow_cache(stick, emulator):
+    stick.enable_shadow_cache()
+    assert stick.write_registers({0x3B: 0x81})
+    commands = emulator.commands_received
+    assert stick.read_registers([0x3B, stick.opr_mode_addr]) == [0x81, 0x00]
+    assert stick.read_register(stick.opr_mode_addr) == 0x00
+    assert emulator.commands_received - commands == 1
+    stick.write_register(stick.sys_trigger_addr, stick.rst_sys_bit)
+    assert stick.read_register(0x3B) == 0x80
+
+
+def test_shadow_cache_after_activation(stick):
+    stick.enable_shadow_cache()
+    stick.activate_streaming(fast=True)
+    assert stick.page == 0
+    commands = stick.metrics.commands
+    for _ in range(5):
+        stick.read_registers([stick.opr_mode_addr])
+    assert stick.metrics.commands - commands == 1
+    assert (0, stick.opr_mode_addr) in stick.shadow
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bno055_usb_stick_py.benchmark import synthetic_frames
+from bno055_usb_stick_py.decoding import DEFAULT_LAYOUT
+from bno055_usb_stick_py.sharedmem import SLOT_SEQ, WRITING, SamplePublisher, SampleSubscriber
+from bno055_usb_stick_py.timing import SAMPLE_GAP
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LayoutOnly:
+    """stand-in for a BnoUsbStick which is published from, see SamplePublisher.publish"""
+    layout = DEFAULT_LAYOUT
+
+
+@pytest.fixture
+def publisher():
+    publisher = SamplePublisher(LayoutOnly(), capacity=16)
+    yield publisher
+    publisher.close()
+
+
+def test_subscriber_reads_published_samples(publisher):
+    frames = synthetic_frames(10)
+    with SampleSubscriber(publisher.name) as subscriber:
+        assert subscriber.poll() is None and subscriber.latest() is None
+        for idx, frame in enumerate(frames):
+            publisher.publish(frame, idx * 1000)
+        samples = list(subscriber.samples(10))
+        assert [sample.timestamp_ns for sample in samples] == list(range(0, 10000, 1000))
+        assert subscriber.latest().timestamp_ns == 9000
+        assert subscriber.poll() is None
+        assert subscriber.lapped == 0
+
+
+def test_lapped_subscriber_skips_to_half_a_ring_behind(publisher):
+    frames = synthetic_frames(40)
+    with SampleSubscriber(publisher.name) as subscriber:
+        for idx, frame in enumerate(frames):
+            publisher.publish(frame, idx * 1000)
+        first = subscriber.poll()
+        # 40 published into 16 slots: continue at sample 40 - 16 / 2 + 1
+        assert first.timestamp_ns == 32 * 1000
+        assert first.flags & SAMPLE_GAP
+        assert subscriber.lapped == 1 and subscriber.missed == 32
+        rest = list(subscriber.samples(7))
+        assert [sample.timestamp_ns for sample in rest] == list(range(33000, 40000, 1000))
+        assert not any(sample.flags & SAMPLE_GAP for sample in rest)
+
+
+def test_slot_being_written_is_not_read(publisher):
+    for idx, frame in enumerate(synthetic_frames(3)):
+        publisher.publish(frame, idx * 1000)
+    with SampleSubscriber(publisher.name) as subscriber:
+        SLOT_SEQ.pack_into(publisher.buf, publisher.slot_offset(3), WRITING)
+        assert subscriber.read(3) is None
+        assert subscriber.read(2).timestamp_ns == 1000
+
+
+def run_python(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=30)
+
+
+def test_subscriber_of_other_process_leaves_the_segment(publisher):
+    publisher.publish(synthetic_frames(1)[0], 1000)
+    result = run_python(f"from bno055_usb_stick_py.sharedmem import SampleSubscriber\n"
+                        f"with SampleSubscriber({publisher.name!r}) as subscriber:\n"
+                        f"    print(subscriber.latest().timestamp_ns)\n")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '1000'
+    assert 'leaked' not in result.stderr
+    # the resource tracker of the subscriber process did not unlink the segment
+    with SampleSubscriber(publisher.name) as subscriber:
+        assert subscriber.latest().timestamp_ns == 1000
+
+
+def test_subscriber_in_publisher_process_keeps_its_registration():
+    result = run_python("from bno055_usb_stick_py.decoding import DEFAULT_LAYOUT\n"
+                        "from bno055_usb_stick_py.sharedmem import SamplePublisher, SampleSubscriber\n"
+                        "class Stick:\n"
+                        "    layout = DEFAULT_LAYOUT\n"
+                        "publisher = SamplePublisher(Stick())\n"
+                        "SampleSubscriber(publisher.name).close()\n"
+                        "publisher.close()\n")
+    assert result.returncode == 0, result.stderr
+    assert 'KeyError' not in result.stderr
+    assert 'leaked' not in result.stderr
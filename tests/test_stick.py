@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import time
+
+import pytest
+
+CHIP_ID_BLOCK = [0xA0, 0xFB, 0x32, 0x0F, 0x11, 0x03, 0x15, 0x00]
+
+
+def test_recv_waits_until_deadline(stick):
+    t_start = time.monotonic()
+    assert stick.recv(timeout=0.05) == (False, bytes())
+    assert 0.05 <= time.monotonic() - t_start < 0.5
+
+
+def test_read_exactly_collects_a_response(stick):
+    stick.send(stick.commands['read_register'].build(reg_addr=0x00))
+    ok, response = stick.read_exactly(14)
+    assert ok and response[11] == 0xA0
+
+
+def test_poller_survives_the_reader(stick):
+    stick.activate_streaming(fast=True)
+    stick.start_reader()
+    stick.stop_reader()
+    assert stick.poller is not None
+    assert len(list(stick.recv_streaming_generator(num_packets=5))) == 5
+
+
+def test_fast_activation_streams(stick, emulator):
+    activation_time = stick.activate_streaming(fast=True)
+    assert stick.is_configured()
+    assert activation_time == stick.activation_time
+    samples = list(stick.recv_streaming_generator(num_packets=20))
+    assert len(samples) == 20
+    assert all(sample.gravity[2] == pytest.approx(9.81) for sample in samples)
+
+
+def test_register_reads_while_streaming(stick):
+    stick.activate_streaming(fast=True)
+    assert stick.read_registers(range(0, 8)) == CHIP_ID_BLOCK
+    assert stick.write_registers({0x3B: 0x80})
+    assert stick.read_registers([0x00, 0x3B]) == [0xA0, 0x80]
+    assert len(list(stick.recv_streaming_generator(num_packets=10))) == 10
+
+
+def test_resume_keeps_running_stream(stick, emulator):
+    stick.activate_streaming(fast=True)
+    commands = emulator.commands_received
+    stick.activate_streaming(fast=True, resume=True)
+    assert emulator.commands_received == commands
+    assert len(list(stick.recv_streaming_generator(num_packets=5))) == 5
+
+
+def test_resume_with_new_rate_sends_tail_only(stick, emulator):
+    stick.activate_streaming(fast=True)
+    # frames wait in front of the OPR_MODE response read by resume
+    time.sleep(0.05)
+    commands = emulator.commands_received
+    stick.activate_streaming(fast=True, resume=True, rate_hz=50)
+    assert emulator.interval_ms == 20
+    assert emulator.commands_received - commands == len(stick.streaming_commands_tail()) + 1
+    assert len(list(stick.recv_streaming_generator(num_packets=5))) == 5
+
+
+@pytest.mark.parametrize('channels', [['quaternion', 'lin_a'], ['gravity', 'temp']])
+def test_register_reads_while_streaming_channel_subset(stick, emulator, channels):
+    stick.activate_streaming(fast=True, rate_hz=200, channels=channels)
+    assert emulator.interval_ms == 5
+    assert emulator.window_start == stick.layout.window_start
+    # the response of an 8 byte burst read has the length of a quaternion + lin_a frame,
+    # the one of a 2 register read the length of a gravity + temp frame
+    assert stick.read_registers(range(0, 8)) == CHIP_ID_BLOCK
+    assert stick.read_registers([0x00, 0x3B]) == [0xA0, 0x80]
+    assert len(list(stick.recv_streaming_generator(num_packets=10))) == 10
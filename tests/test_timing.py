@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+# Author: Dr. Konstantin Selyunin
+# License: MIT
+
+import random
+
+import pytest
+
+from bno055_usb_stick_py.timing import SAMPLE_DUPLICATE, SAMPLE_GAP, TimingEngine
+
+NOMINAL_PERIOD_NS = 10_000_000
+# device clock 100 ppm slow
+DEVICE_PERIOD_NS = 10_001_000
+
+
+def chunks(first_sample, num_samples, seed=0):
+    """(arrival time, number of samples) of USB chunks of 1..3 samples with 0.2..1 ms latency"""
+    rand = random.Random(seed)
+    sample = first_sample
+    while sample < first_sample + num_samples:
+        size = rand.randint(1, 3)
+        sample += size
+        yield 1_000_000_000 + (sample - 1) * DEVICE_PERIOD_NS + rand.randint(200_000, 1_000_000), size
+
+
+def feed(engine, chunk_list):
+    timed = []
+    for arrival_ns, size in chunk_list:
+        timed += engine.update(arrival_ns, size)
+    return timed
+
+
+def test_period_and_drift_are_recovered():
+    engine = TimingEngine(NOMINAL_PERIOD_NS)
+    timed = feed(engine, chunks(0, 3000))
+    assert engine.locked
+    assert engine.period_ns == pytest.approx(DEVICE_PERIOD_NS, rel=2e-5)
+    assert engine.drift_ppm == pytest.approx(100., abs=20.)
+    assert engine.gaps == 0 and engine.duplicates == 0
+    # once locked, sample times are evenly spaced despite the batching jitter
+    sample_times = [sample_time for sample_time, _ in timed[1000:]]
+    steps = [later - earlier for earlier, later in zip(sample_times, sample_times[1:])]
+    assert max(steps) - min(steps) < 0.01 * DEVICE_PERIOD_NS
+
+
+def test_lost_samples_are_flagged():
+    engine = TimingEngine(NOMINAL_PERIOD_NS)
+    feed(engine, chunks(0, 500))
+    # samples 500..519 never arrive
+    timed = feed(engine, chunks(520, 100, seed=1))
+    assert engine.gaps == 1
+    assert engine.lost_samples == pytest.approx(20, abs=2)
+    assert timed[0][1] & SAMPLE_GAP
+    assert not any(flags for _, flags in timed[1:])
+
+
+def test_surplus_samples_are_flagged_as_duplicates():
+    engine = TimingEngine(NOMINAL_PERIOD_NS)
+    feed(engine, chunks(0, 500))
+    last_arrival = engine.sample_time(engine.index)
+    # three samples more than the device can have produced by now
+    timed = engine.update(last_arrival + DEVICE_PERIOD_NS, 4)
+    assert engine.duplicates == 3
+    assert [flags for _, flags in timed] == [0] + [SAMPLE_DUPLICATE] * 3
+
+
+def test_stale_chunks_are_not_flagged():
+    engine = TimingEngine(NOMINAL_PERIOD_NS)
+    feed(engine, chunks(0, 500))
+    # the host stalled for 250 ms: a full buffer of 20 samples, then the rest of the backlog
+    arrival_ns = engine.sample_time(engine.index) + 250_000_000
+    timed = engine.update(arrival_ns, 20, stale=True) + engine.update(arrival_ns + 100_000, 5)
+    assert engine.gaps == 0
+    assert not any(flags for _, flags in timed)
+
+
+def test_restart_flags_the_next_sample():
+    engine = TimingEngine(NOMINAL_PERIOD_NS)
+    feed(engine, chunks(0, 500))
+    engine.restart()
+    assert not engine.locked
+    # reconnected after one second
+    timed = feed(engine, chunks(600, 50))
+    assert timed[0][1] & SAMPLE_GAP
+    assert engine.gaps == 1
+    assert engine.lost_samples == pytest.approx(100, abs=3)